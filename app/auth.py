@@ -0,0 +1,174 @@
+"""
+Bearer tokens: "<user_id>.<role>.<expires>.<signature>", where the
+signature is a base64url HMAC-SHA256 of the first three fields. The token
+carries the caller's role, so checking one needs no storage lookup.
+
+    python -m app.auth <user_id> <role> [ttl_seconds]    # mint a token (e.g. the first admin's)
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+TOKEN_TTL = 24 * 60 * 60
+CACHE_TTL = 5 * 60
+MAX_CACHED = 100_000
+ROLES = ("student", "admin")
+
+
+class Identity:
+    """Who's calling. `user_id` is None only for header-trusted callers that didn't send X-User-Id."""
+
+    __slots__ = ("user_id", "role")
+
+    def __init__(self, user_id, role):
+        self.user_id = user_id
+        self.role = role
+
+    def __eq__(self, other):
+        return isinstance(other, Identity) and (self.user_id, self.role) == (other.user_id, other.role)
+
+    def __repr__(self):
+        return f"Identity(user_id={self.user_id!r}, role={self.role!r})"
+
+
+class _Verified:
+    __slots__ = ("identity", "expires")
+
+    def __init__(self, identity, expires):
+        self.identity = identity
+        self.expires = expires
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class Authenticator:
+    """
+    Mints and verifies bearer tokens.
+
+    The HMAC key schedule (the keyed inner and outer hash states) is built
+    once; each signature starts from a copy of it. Verified tokens are kept
+    in an LRU of at most `max_cached` entries, each good for `cache_ttl`
+    seconds or until the token expires, whichever is sooner, so a repeat
+    caller costs one dict lookup. Failures aren't cached, so garbage tokens
+    can't push out real ones.
+
+    With `trust_headers` a request without a token is identified by its
+    X-User-Role and X-User-Id headers, as before tokens existed. That's
+    for development and tests only: anyone can send those headers.
+    """
+
+    def __init__(self, secret, token_ttl=TOKEN_TTL, cache_ttl=CACHE_TTL, max_cached=MAX_CACHED,
+                 trust_headers=False, clock=time.time):
+        self.token_ttl = token_ttl
+        self.cache_ttl = cache_ttl
+        self.max_cached = max_cached
+        self.trust_headers = trust_headers
+        self.clock = clock
+        self._mac = hmac.new(secret, digestmod=hashlib.sha256)
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        secret = os.environ.get("AUTH_SECRET")
+        return cls(
+            # without a configured secret, tokens only last as long as the process
+            secret.encode() if secret else secrets.token_bytes(32),
+            token_ttl=int(os.environ.get("AUTH_TOKEN_TTL", str(TOKEN_TTL))),
+            cache_ttl=float(os.environ.get("AUTH_CACHE_TTL", str(CACHE_TTL))),
+            max_cached=int(os.environ.get("AUTH_MAX_CACHED", str(MAX_CACHED))),
+            trust_headers=os.environ.get("AUTH_TRUST_HEADERS", "0") not in ("0", "false"),
+        )
+
+    def _sign(self, payload):
+        mac = self._mac.copy()
+        mac.update(payload)
+        return _b64(mac.digest())
+
+    def mint(self, user_id, role, ttl=None):
+        """A token for `user_id` acting as `role`; returns (token, expires_at in epoch seconds)."""
+        if role not in ROLES:
+            raise ValueError(f"Unknown role: {role!r}")
+        expires = int(self.clock()) + (self.token_ttl if ttl is None else ttl)
+        payload = f"{int(user_id)}.{role}.{expires}"
+        return f"{payload}.{self._sign(payload.encode())}", expires
+
+    def _check(self, token, now):
+        payload, _, signature = token.rpartition(".")
+        parts = payload.split(".")
+        # compared as bytes: compare_digest raises TypeError on non-ASCII str
+        if len(parts) != 3 or not hmac.compare_digest(self._sign(payload.encode()).encode(), signature.encode()):
+            return None
+        user_id, role, expires = parts
+        if int(expires) <= now:
+            return None
+        return _Verified(Identity(int(user_id), role), int(expires))
+
+    def verify(self, token):
+        """The Identity a token was minted for, or None if it's forged, malformed or expired."""
+        now = self.clock()
+        with self._lock:
+            entry = self._verified.get(token)
+            if entry is not None:
+                if entry.expires > now:
+                    self._verified.move_to_end(token)
+                    return entry.identity
+                del self._verified[token]
+        try:
+            entry = self._check(token, now)
+        except (ValueError, UnicodeEncodeError):
+            return None
+        if entry is None:
+            return None
+        entry.expires = min(entry.expires, now + self.cache_ttl)
+        with self._lock:
+            self._verified[token] = entry
+            if len(self._verified) > self.max_cached:
+                self._verified.popitem(last=False)
+        return entry.identity
+
+    def identify(self, scope):
+        """The caller of an ASGI request, or None if it isn't authenticated."""
+        authorization = role = user_id = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+            elif name == b"x-user-role":
+                role = value
+            elif name == b"x-user-id":
+                user_id = value
+        if authorization is not None:
+            scheme, _, token = authorization.decode("latin-1").partition(" ")
+            return self.verify(token.strip()) if scheme.lower() == "bearer" else None
+        if self.trust_headers and role is not None:
+            if user_id is not None and not user_id.isdigit():
+                return None
+            return Identity(None if user_id is None else int(user_id), role.decode("latin-1"))
+        return None
+
+    def __len__(self):
+        return len(self._verified)
+
+    def clear(self):
+        with self._lock:
+            self._verified.clear()
+
+
+authenticator = Authenticator.from_env()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4) or not sys.argv[1].isdigit():
+        sys.exit(__doc__)
+    if not os.environ.get("AUTH_SECRET"):
+        sys.exit("Set AUTH_SECRET to the server's secret")
+    token, _ = authenticator.mint(int(sys.argv[1]), sys.argv[2], *(int(a) for a in sys.argv[3:]))
+    print(token)
@@ -0,0 +1,142 @@
+import csv
+import json
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pydantic_core import PydanticCustomError
+
+BATCH_SIZE = 1000
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+
+
+class BulkResponse(StreamingResponse):
+    """
+    NDJSON stream of per-row results. Unlike StreamingResponse it doesn't
+    listen for http.disconnect while streaming: the body generator is still
+    reading the request through receive(), and a competing listener would
+    swallow those messages. A client that goes away surfaces as
+    ClientDisconnect from request.stream() instead.
+    """
+
+    media_type = NDJSON
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def body_format(request: Request):
+    """NDJSON (the default) or CSV, picked from the request Content-Type."""
+    content_type = request.headers.get("content-type", NDJSON).split(";")[0].strip().lower()
+    if content_type in (NDJSON, "application/jsonl", "application/json"):
+        return NDJSON
+    if content_type == CSV:
+        return CSV
+    raise HTTPException(status_code=415, detail=f"Unsupported content type '{content_type}'")
+
+
+async def iter_lines(request: Request):
+    """Yield the non-blank lines of the request body, still undecoded, as it streams in."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def decode_error(error: UnicodeDecodeError):
+    """A line that isn't valid UTF-8, as the ValidationError its row reports."""
+    return ValidationError.from_exception_data("utf-8", [{
+        "type": PydanticCustomError("utf8_invalid", "Invalid UTF-8 at byte {position}", {"position": error.start}),
+        "loc": (),
+        "input": error.object[error.start:error.end],
+    }])
+
+
+async def iter_rows(request: Request, fmt, schema):
+    """
+    Yield (row number, validated model or ValidationError) for every record.
+    CSV bodies need a header line naming the schema's fields and must keep
+    each record on a single line. A blank cell counts as a missing field,
+    so optional columns (a course's capacity) can be left empty.
+
+    Lines are decoded strictly, so a row that isn't valid UTF-8 fails with
+    a 422 rather than importing replacement characters. A CSV header that
+    doesn't decode is reported as row 0 and ends the body, since no row
+    after it can be mapped to fields.
+    """
+    header = None
+    row = 0
+    async for line in iter_lines(request):
+        try:
+            line = line.decode("utf-8-sig").rstrip("\r")
+        except UnicodeDecodeError as e:
+            line = decode_error(e)
+        if fmt == CSV and header is None:
+            if isinstance(line, ValidationError):
+                yield 0, line
+                return
+            header = [name.strip() for name in next(csv.reader([line]))]
+            continue
+        row += 1
+        if isinstance(line, ValidationError):
+            yield row, line
+            continue
+        try:
+            if fmt == CSV:
+                values = next(csv.reader([line]))
+                yield row, schema.model_validate({name: value for name, value in zip(header, values) if value})
+            else:
+                yield row, schema.model_validate_json(line)
+        except ValidationError as e:
+            yield row, e
+
+
+async def bulk_results(request: Request, fmt, schema, apply_batch, describe, batch_size=BATCH_SIZE):
+    """
+    Validate streamed rows against `schema`, apply them `batch_size` at a
+    time through `apply_batch` (an async repository bulk method) and yield
+    one NDJSON result line per row, then a summary line.
+
+    `describe` maps a storage error to the (status, detail) the single-row
+    endpoint would have answered with.
+    """
+    created = failed = 0
+    batch = []
+
+    async def flush():
+        nonlocal created, failed
+        valid = [(row, item) for row, item in batch if not isinstance(item, ValidationError)]
+        outcomes = iter(await apply_batch([item.model_dump() for _, item in valid]))
+        lines = []
+        for row, item in batch:
+            if isinstance(item, ValidationError):
+                failed += 1
+                result = {"row": row, "status": 422, "detail": item.errors(include_url=False, include_context=False, include_input=False)}
+            else:
+                outcome = next(outcomes)
+                if isinstance(outcome, Exception):
+                    failed += 1
+                    status, detail = describe(outcome)
+                    result = {"row": row, "status": status, "detail": detail}
+                else:
+                    created += 1
+                    result = {"row": row, "status": 201, "id": outcome["id"]}
+            lines.append(json.dumps(result))
+        batch.clear()
+        return ("\n".join(lines) + "\n").encode()
+
+    async for row, item in iter_rows(request, fmt, schema):
+        batch.append((row, item))
+        if len(batch) >= batch_size:
+            yield await flush()
+    if batch:
+        yield await flush()
+    yield (json.dumps({"summary": {"created": created, "failed": failed}}) + "\n").encode()
@@ -0,0 +1,76 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+MAX_ENTRIES = 1024
+
+
+class _Entry:
+    __slots__ = ("source", "version", "body", "etag", "headers")
+
+    def __init__(self, source, version, body, headers):
+        self.source = source
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.headers = {**headers, "ETag": self.etag, "Cache-Control": "no-cache"}
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    Serialized JSON bodies keyed by request URL, each tagged with the data
+    version it was rendered from. A hit is a byte copy; a client sending the
+    current ETag in If-None-Match gets a bodyless 304.
+
+    The version is read *before* rendering, so a write racing with a render
+    can only leave an entry that's already stale, never a stale entry filed
+    under the new version. Entries are LRU-bounded since the key includes the
+    query string (cursors, projections).
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def respond(self, request: Request, repo, version, render):
+        """
+        `await render()` gives (body bytes, extra headers); it only runs on
+        a miss. `repo` is part of the key so swapping repositories can't
+        serve another store's entries.
+        """
+        key = request.url.path + "?" + request.url.query
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None or entry.version != version or entry.source() is not repo:
+            body, headers = await render()
+            entry = _Entry(weakref.ref(repo), version, body, headers)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=entry.headers)
+        return Response(entry.body, media_type="application/json", headers=entry.headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_cache = ResponseCache()
@@ -0,0 +1,21 @@
+from fastapi import HTTPException, Request
+
+from app.auth import Identity, authenticator
+from app.storage import AsyncRepository, get_repository
+
+
+async def get_repo() -> AsyncRepository:
+    """FastAPI dependency: the configured storage backend, awaitable."""
+    return get_repository().aio
+
+
+async def get_identity(request: Request) -> Identity:
+    """FastAPI dependency: the authenticated caller; 401 without valid credentials."""
+    identity = authenticator.identify(request.scope)
+    if identity is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing or invalid bearer token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return identity
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+from fastapi import HTTPException
+
+BATCH_SIZE = 1000
+JOINS = {
+    "user": ("user_name", "user_email"),
+    "course": ("course_code",),
+}
+BASE_COLUMNS = ("id", "user_id", "course_id")
+
+
+def parse_include(include):
+    """`include=user,course` -> ("user", "course"), rejecting unknown joins."""
+    if include is None:
+        return ()
+    selected = tuple(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in JOINS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(unknown)}")
+    return selected
+
+
+def export_columns(include):
+    columns = list(BASE_COLUMNS)
+    for name in include:
+        columns.extend(JOINS[name])
+    return columns
+
+
+async def iter_export_rows(repo, include, batch_size=None):
+    """
+    Yield pages of flat export rows from an AsyncRepository. Only one page
+    of enrollments (plus the users/courses it references) is in memory at a
+    time.
+    """
+    async for page in repo.iter_enrollments(batch_size or BATCH_SIZE):
+        users = await repo.get_users_by_id({e["user_id"] for e in page}) if "user" in include else {}
+        courses = await repo.get_courses_by_id({e["course_id"] for e in page}) if "course" in include else {}
+        rows = []
+        for e in page:
+            row = {"id": e["id"], "user_id": e["user_id"], "course_id": e["course_id"]}
+            if "user" in include:
+                user = users.get(e["user_id"], {})
+                row["user_name"] = user.get("name")
+                row["user_email"] = user.get("email")
+            if "course" in include:
+                row["course_code"] = courses.get(e["course_id"], {}).get("code")
+            rows.append(row)
+        yield rows
+
+
+async def ndjson_chunks(pages):
+    async for rows in pages:
+        yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+async def csv_chunks(pages, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    async for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
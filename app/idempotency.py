@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from fastapi.responses import JSONResponse
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+MAX_ENTRIES = 10_000
+TTL = 24 * 60 * 60
+# Responses bigger than this are sent but not kept
+MAX_BODY = 64 * 1024
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "headers", "body", "route", "expires")
+
+    def __init__(self, fingerprint, status, headers, body, route):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.route = route
+        self.expires = None
+
+
+class IdempotencyCache:
+    """
+    Responses to requests that carried an Idempotency-Key, so a client
+    retrying after a timeout gets the original answer back instead of
+    running the write a second time.
+
+    Entries live for `ttl` seconds. Every entry gets the same TTL, so
+    insertion order is expiry order: expired entries are dropped from the
+    front of the OrderedDict on each insert, along with the oldest ones
+    once there are more than `max_entries`.
+
+    While a request holds a key, later requests with the same key wait on
+    its Future instead of running too. It's a concurrent.futures.Future so
+    waiters on any thread or event loop can await it.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", str(MAX_ENTRIES))),
+            ttl=float(os.environ.get("IDEMPOTENCY_TTL", str(TTL))),
+        )
+
+    def begin(self, key):
+        """
+        The StoredResponse for `key`; or a Future that resolves once the
+        request holding `key` finishes; or None, meaning the caller now
+        holds `key` and must call finish().
+        """
+        now = self.clock()
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is not None:
+                if stored.expires > now:
+                    return stored
+                del self._entries[key]
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending
+            self._pending[key] = Future()
+            return None
+
+    def finish(self, key, stored):
+        """Release `key`, keeping `stored` (None: nothing to replay) for the TTL."""
+        now = self.clock()
+        with self._lock:
+            if stored is not None:
+                stored.expires = now + self.ttl
+                self._entries[key] = stored
+                while self._entries:
+                    oldest = next(iter(self._entries.values()))
+                    if len(self._entries) <= self.max_entries and oldest.expires > now:
+                        break
+                    self._entries.popitem(last=False)
+            pending = self._pending.pop(key)
+        pending.set_result(stored)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+idempotency_cache = IdempotencyCache.from_env()
+
+
+def _cacheable(status):
+    # server errors and rate limiting are worth retrying for real
+    return status < 500 and status != 429
+
+
+def _caller(scope, headers):
+    """Whose key it is: the bearer token, else X-User-Id, else the client address."""
+    for name in (b"authorization", b"x-user-id"):
+        value = headers.get(name)
+        if value:
+            return name, value
+    client = scope.get("client")
+    return b"client", client[0] if client else None
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware for POSTs to `paths`. A request without an
+    Idempotency-Key passes straight through. With one, the first request
+    runs and its status, headers and body are kept; a retry with the same
+    key (per path and caller: bearer token, else X-User-Id, else the client
+    address) gets those bytes back with an `Idempotent-Replayed: true`
+    header, and the same key sent with a different body or role gets a 422.
+
+    The cache lives in this process, so with several workers a retry that
+    lands on another worker runs again.
+    """
+
+    def __init__(self, app, cache, paths):
+        self.app = app
+        self.cache = cache
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        token = headers.get(HEADER)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        if not token or len(token) > MAX_KEY_LENGTH:
+            detail = f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+            await JSONResponse({"detail": detail}, status_code=400)(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        if body is None:
+            return
+        fingerprint = hashlib.blake2b(digest_size=16)
+        for part in (scope["query_string"], headers.get(b"x-user-role", b""), body):
+            fingerprint.update(len(part).to_bytes(8, "little"))
+            fingerprint.update(part)
+        fingerprint = fingerprint.digest()
+        key = (scope["path"], _caller(scope, headers), token)
+
+        while (found := self.cache.begin(key)) is not None:
+            if isinstance(found, Future):
+                await asyncio.wrap_future(found)
+                continue
+            if found.fingerprint != fingerprint:
+                detail = "Idempotency-Key was already used for a different request"
+                await JSONResponse({"detail": detail}, status_code=422)(scope, receive, send)
+                return
+            # so the metrics middleware labels the replay with its route
+            scope["route"] = found.route
+            await send({"type": "http.response.start", "status": found.status,
+                        "headers": [*found.headers, (REPLAYED_HEADER, b"true")]})
+            await send({"type": "http.response.body", "body": found.body})
+            return
+
+        sent = False
+
+        async def replay_receive():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status, response_headers, chunks, size = 500, [], [], 0
+
+        async def recording_send(message):
+            nonlocal status, response_headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_BODY:
+                    chunks.append(chunk)
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, replay_receive, recording_send)
+            if _cacheable(status) and size <= MAX_BODY:
+                stored = StoredResponse(fingerprint, status, response_headers, b"".join(chunks), scope.get("route"))
+        finally:
+            self.cache.finish(key, stored)
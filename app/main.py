@@ -1,26 +1,49 @@
-from fastapi import FastAPI
-from app.routers import users, courses, enrollments
-from pydantic import BaseModel
-
-# API VERSION PREFIX
-API_PREFIX = "/api/v1"
-
-app = FastAPI(
-    title="Course Enrollment Management API",
-    version="1.0.0",
-    docs_url=f"{API_PREFIX}/docs",      # optional: versioned docs
-    openapi_url=f"{API_PREFIX}/openapi.json",
-)
-
-# I then APPLY VERSIONING HERE
-app.include_router(users.router, prefix=API_PREFIX)
-app.include_router(courses.router, prefix=API_PREFIX)
-app.include_router(enrollments.router, prefix=API_PREFIX)
-
-
-@app.get("/")
-def root():
-    return {
-        "message": "Course Enrollment API is running",
-        "docs": f"{API_PREFIX}/docs"
-    }
+from fastapi import FastAPI
+from app.routers import users, courses, enrollments, metrics, profiles, stats, auth
+from app.metrics import MetricsMiddleware, registry
+from app.profiling import ProfilingMiddleware, profiler
+from app.idempotency import IdempotencyMiddleware, idempotency_cache
+from pydantic import BaseModel
+
+# API VERSION PREFIX
+API_PREFIX = "/api/v1"
+
+app = FastAPI(
+    title="Course Enrollment Management API",
+    version="1.0.0",
+    docs_url=f"{API_PREFIX}/docs",      # optional: versioned docs
+    openapi_url=f"{API_PREFIX}/openapi.json",
+)
+
+# I then APPLY VERSIONING HERE
+app.include_router(users.router, prefix=API_PREFIX)
+app.include_router(courses.router, prefix=API_PREFIX)
+app.include_router(enrollments.router, prefix=API_PREFIX)
+app.include_router(metrics.router, prefix=API_PREFIX)
+app.include_router(profiles.router, prefix=API_PREFIX)
+app.include_router(stats.router, prefix=API_PREFIX)
+app.include_router(auth.router, prefix=API_PREFIX)
+
+# clients retrying a POST send the same `Idempotency-Key` and get the first
+# attempt's response replayed instead of a second write (IDEMPOTENCY_TTL)
+app.add_middleware(
+    IdempotencyMiddleware,
+    cache=idempotency_cache,
+    paths=[f"{API_PREFIX}/users/", f"{API_PREFIX}/courses/", f"{API_PREFIX}/enrollments/", f"{API_PREFIX}/enrollments/batch"],
+)
+
+# per-route latency/size histograms, scraped at /api/v1/metrics
+# (METRICS_SAMPLE_RATE=0.1 records one request in ten)
+app.add_middleware(MetricsMiddleware, metrics=registry)
+
+# opt-in request profiling: admins send `X-Profile: 1` (or `?profile=1`), or
+# set PROFILE_SAMPLE_RATE; fetch the result from /api/v1/profiles/{id}
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+
+@app.get("/")
+async def root():
+    return {
+        "message": "Course Enrollment API is running",
+        "docs": f"{API_PREFIX}/docs"
+    }
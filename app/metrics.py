@@ -0,0 +1,227 @@
+import os
+import random
+import threading
+import weakref
+from bisect import bisect_left
+from time import perf_counter
+
+# Upper bounds of the histogram buckets (Prometheus `le`); a final +Inf
+# bucket is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UNMATCHED_ROUTE = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Non-cumulative bucket counts plus a running sum; cumulated at render time."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+
+
+class Series:
+    """Everything recorded for one (method, route, status)."""
+
+    __slots__ = ("latency", "request_size", "response_size")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_size = Histogram(SIZE_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.request_size.merge(other.request_size)
+        self.response_size.merge(other.response_size)
+
+
+class Shard:
+    """One thread's counters. Only its own thread writes to it, so no locks."""
+
+    __slots__ = ("series", "in_flight")
+
+    def __init__(self):
+        self.series = {}
+        self.in_flight = 0
+
+
+class Metrics:
+    """
+    Per-route request metrics. Each thread records into its own Shard
+    without locking; a scrape merges the shards. A shard whose thread has
+    exited is folded into a retired total so short-lived threads don't pile
+    up.
+
+    Only a `sample_rate` fraction of requests is recorded (1.0 = all, 0 =
+    off); unsampled requests skip the instrumentation entirely. The rate is
+    exported so totals can be scaled back up.
+    """
+
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self._local = threading.local()
+        self._shards = []
+        self._retired = Shard()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(sample_rate=float(os.environ.get("METRICS_SAMPLE_RATE", "1.0")))
+
+    def sampled(self):
+        rate = self.sample_rate
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = Shard()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(threading.current_thread(), self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            if shard in self._shards:
+                self._shards.remove(shard)
+                _merge_shard(self._retired, shard)
+
+    def observe(self, shard, method, route, status, seconds, request_bytes, response_bytes):
+        key = (method, route, status)
+        series = shard.series.get(key)
+        if series is None:
+            series = shard.series[key] = Series()
+        series.latency.observe(seconds)
+        series.request_size.observe(request_bytes)
+        series.response_size.observe(response_bytes)
+
+    def snapshot(self):
+        """Merge every shard into one Shard (a copy; safe while requests are running)."""
+        total = Shard()
+        with self._lock:
+            shards = [self._retired, *self._shards]
+            for shard in shards:
+                _merge_shard(total, shard)
+        return total
+
+    def render(self):
+        """Prometheus text exposition format."""
+        total = self.snapshot()
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served (sampled requests only).",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {total.in_flight}",
+            "# HELP http_metrics_sample_rate Fraction of requests recorded in the http_* histograms.",
+            "# TYPE http_metrics_sample_rate gauge",
+            f"http_metrics_sample_rate {self.sample_rate}",
+        ]
+        histograms = (
+            ("http_request_duration_seconds", "Request latency by method, route and status.", "latency"),
+            ("http_request_size_bytes", "Request body size by method, route and status.", "request_size"),
+            ("http_response_size_bytes", "Response body size by method, route and status.", "response_size"),
+        )
+        series = sorted(total.series.items())
+        for name, help_text, attr in histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route, status), entry in series:
+                histogram = getattr(entry, attr)
+                labels = f'method="{_escape(method)}",route="{_escape(route)}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                cumulative += histogram.counts[-1]
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.series.clear()
+            self._retired = Shard()
+
+
+def _merge_shard(into, shard):
+    # dict.copy() is atomic under the GIL, so the owning thread may keep
+    # adding series while we read
+    for key, series in shard.series.copy().items():
+        target = into.series.get(key)
+        if target is None:
+            target = into.series[key] = Series()
+        target.merge(series)
+    into.in_flight += shard.in_flight
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/queue overhead) timing
+    each sampled request and counting body bytes in both directions. The
+    route label is the matched path template, e.g. /api/v1/users/{user_id},
+    so ids don't explode the series count.
+    """
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        shard = self.metrics.shard()
+        status = 500
+        request_bytes = response_bytes = 0
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        shard.in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = perf_counter() - start
+            shard.in_flight -= 1
+            # FastAPI stores the matched route in the (shared) scope
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.metrics.observe(shard, scope["method"], template, status, elapsed, request_bytes, response_bytes)
+
+
+registry = Metrics.from_env()
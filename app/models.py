@@ -1,5 +1,5 @@
-from enum import Enum
-
-class Role(str, Enum):
-    student = "student"
-    admin = "admin"
+from enum import Enum
+
+class Role(str, Enum):
+    student = "student"
+    admin = "admin"
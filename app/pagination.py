@@ -0,0 +1,152 @@
+import base64
+import binascii
+
+from fastapi import HTTPException, Query, Response
+
+from app.responses import RecordResponse
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# ---------------- CURSORS ----------------
+
+def _encode_raw(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def encode_cursor(last_id):
+    return _encode_raw(f"id:{last_id}")
+
+
+def _decode_raw(cursor, prefix):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    found, _, value = raw.partition(":")
+    if found != prefix:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def decode_cursor(cursor):
+    try:
+        return int(_decode_raw(cursor, "id"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_name_cursor(name, last_id):
+    # id first: names may contain ':'
+    return _encode_raw(f"name:{last_id}:{name}")
+
+
+def decode_name_cursor(cursor):
+    last_id, _, name = _decode_raw(cursor, "name").partition(":")
+    try:
+        return name, int(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(score, last_id):
+    return _encode_raw(f"rank:{score}:{last_id}")
+
+
+def decode_rank_cursor(cursor):
+    score, _, last_id = _decode_raw(cursor, "rank").partition(":")
+    try:
+        return int(score), int(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ---------------- DEPENDENCIES ----------------
+# Dependencies are async so FastAPI resolves them on the event loop instead
+# of dispatching each one to the threadpool.
+
+class Page:
+    """
+    Keyset pagination parameters shared by the list endpoints. Without
+    `limit` the whole collection is returned, as before.
+
+    Use as `page: Page = Depends(Page.query)`.
+    """
+
+    decode = staticmethod(decode_cursor)
+
+    def __init__(self, limit=None, after=None):
+        self.limit = limit
+        self.after = after
+
+    @classmethod
+    async def query(
+        cls,
+        limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: str | None = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    ):
+        return cls(limit, None if after is None else cls.decode(after))
+
+    def cursor(self, row):
+        return encode_cursor(row["id"])
+
+    async def fetch(self, list_rows, response, **filters):
+        """
+        Await an async repository list method for one page. One extra row is
+        requested to tell whether another page exists; if so its cursor is
+        sent back in the X-Next-Cursor header.
+        """
+        if self.limit is None:
+            return await list_rows(after=self.after, **filters)
+        rows = await list_rows(after=self.after, limit=self.limit + 1, **filters)
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            response.headers[NEXT_CURSOR_HEADER] = self.cursor(rows[-1])
+        return rows
+
+
+class NamePage(Page):
+    """Page over rows sorted by (name, user_id) rather than id, e.g. a course roster."""
+
+    decode = staticmethod(decode_name_cursor)
+
+    def cursor(self, row):
+        return encode_name_cursor(row["name"], row["user_id"])
+
+
+class RankPage(Page):
+    """Page over ranked search results, ordered by (-score, id)."""
+
+    decode = staticmethod(decode_rank_cursor)
+
+    def cursor(self, row):
+        return encode_rank_cursor(row["score"], row["id"])
+
+
+class Fields:
+    """`fields=id,name` projection, validated against a schema's field names."""
+
+    def __init__(self, model):
+        self.allowed = tuple(model.model_fields)
+
+    async def __call__(self, fields: str | None = Query(None, description="Comma-separated fields to return")):
+        if fields is None:
+            return None
+        selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [f for f in selected if f not in self.allowed]
+        if unknown or not selected:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or fields}")
+        return selected
+
+
+def project(rows, fields, response: Response):
+    """
+    Apply a Fields selection and encode the page as a RecordResponse
+    carrying the headers already set on `response`. Rows (whole or
+    partial) bypass the route's response_model, which would reject a
+    projection and only re-check whole rows that storage already validated.
+    """
+    if fields is not None:
+        rows = [{f: row[f] for f in fields} for row in rows]
+    return RecordResponse(rows, headers=dict(response.headers))
@@ -0,0 +1,223 @@
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qs
+
+from app.auth import authenticator
+
+PROFILE_HEADER = "x-profile"
+_PROFILE_HEADER_KEY = PROFILE_HEADER.encode()
+PROFILE_ID_HEADER = "X-Profile-Id"
+MAX_DEPTH = 128
+
+
+def _frame_label(code):
+    path = code.co_filename
+    parts = path.replace("\\", "/").rsplit("/", 2)
+    short = "/".join(parts[-2:])
+    # collapsed-stack format separates frames with ';' and ends with ' <count>'
+    return f"{code.co_qualname} ({short}:{code.co_firstlineno})".replace(";", ",")
+
+
+def fold(frame):
+    """One stack as a collapsed-stack line prefix: root first, ';'-separated."""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack from a background thread. Each sample
+    is weighted by the microseconds since the previous one, so the collapsed
+    output attributes wall time correctly even when the GIL delays the
+    sampler (a CPU-bound request only lets it in every switch interval).
+    """
+
+    def __init__(self, thread_id, interval, max_seconds):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        started = last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold(frame)] += int((now - last) * 1_000_000)
+                self.samples += 1
+            last = now
+            if now - started > self.max_seconds:
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class Profile:
+    __slots__ = ("id", "method", "path", "status", "started_at", "duration_ms", "samples", "collapsed", "truncated")
+
+    def __init__(self, profile_id, method, path):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.samples = 0
+        self.collapsed = ""
+        self.truncated = False
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+            "truncated": self.truncated,
+        }
+
+
+class Profiler:
+    """
+    Opt-in per-request profiling. A request is profiled when an admin asks
+    for it (`X-Profile: 1` header or `?profile=1`) or when it's picked at
+    `sample_rate`. Guardrails:
+
+    - one profile at a time; other requests that ask are served unprofiled
+      (`X-Profile-Id: busy`),
+    - each profile samples for at most `max_seconds`,
+    - only the heaviest `max_stacks` distinct stacks are kept per profile,
+    - only the latest `max_retained` profiles are kept.
+
+    Profiles are stored as collapsed stacks (`frame;frame;frame micros`),
+    ready for flamegraph.pl or speedscope. The sampler sees whatever is
+    running on the request's thread, which on the event loop can include
+    other requests' coroutines; profile under light load for a clean view.
+    """
+
+    def __init__(self, sample_rate=0.0, interval=0.001, max_seconds=30.0, max_stacks=2000, max_retained=50):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_stacks = max_stacks
+        self.profiles = deque(maxlen=max_retained)
+        self._ids = itertools.count(1)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ
+        return cls(
+            sample_rate=float(env.get("PROFILE_SAMPLE_RATE", "0")),
+            interval=float(env.get("PROFILE_INTERVAL", "0.001")),
+            max_seconds=float(env.get("PROFILE_MAX_SECONDS", "30")),
+            max_stacks=int(env.get("PROFILE_MAX_STACKS", "2000")),
+            max_retained=int(env.get("PROFILE_MAX_RETAINED", "50")),
+        )
+
+    def requested(self, scope):
+        """Whether this request asked for (admin) or drew (sampling) a profile."""
+        # runs on every request, so no header dict and no query parsing
+        # unless the query string could hold the flag
+        flag = next((value for name, value in scope["headers"] if name == _PROFILE_HEADER_KEY), None)
+        if not flag:
+            query = scope.get("query_string", b"")
+            if b"profile" in query:
+                flag = parse_qs(query.decode()).get("profile", [""])[0].encode()
+        if flag in (b"1", b"true"):
+            identity = authenticator.identify(scope)
+            if identity is not None and identity.role == "admin":
+                return True
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+
+    def begin(self, method, path):
+        """Claim the single profiling slot; None if another profile is running."""
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = Profile(next(self._ids), method, path)
+        sampler = StackSampler(threading.get_ident(), self.interval, self.max_seconds)
+        sampler.start()
+        return profile, sampler
+
+    def finish(self, profile, sampler, status, started):
+        try:
+            stacks = sampler.stop()
+        finally:
+            self._active.release()
+        profile.status = status
+        profile.duration_ms = (time.perf_counter() - started) * 1000
+        profile.samples = sampler.samples
+        heaviest = stacks.most_common(self.max_stacks)
+        profile.truncated = len(heaviest) < len(stacks)
+        profile.collapsed = "".join(f"{stack} {micros}\n" for stack, micros in heaviest)
+        with self._lock:
+            self.profiles.append(profile)
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((p for p in self.profiles if p.id == profile_id), None)
+
+    def list(self):
+        with self._lock:
+            return [p.summary() for p in reversed(self.profiles)]
+
+    def clear(self):
+        with self._lock:
+            self.profiles.clear()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; requests that aren't profiled pass straight through."""
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        claimed = self.profiler.begin(scope["method"], scope["path"])
+        profile_id = b"busy" if claimed is None else str(claimed[0].id).encode()
+        status = 500
+
+        async def tagged_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), profile_id)]}
+            await send(message)
+
+        if claimed is None:
+            await self.app(scope, receive, tagged_send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, tagged_send)
+        finally:
+            self.profiler.finish(*claimed, status, started)
+
+
+profiler = Profiler.from_env()
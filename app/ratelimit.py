@@ -0,0 +1,125 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+from app.auth import authenticator
+
+# Buckets are spread over shards, each with its own lock, so concurrent
+# requests for different clients rarely touch the same lock
+SHARDS = 16
+MAX_BUCKETS = 100_000
+ANONYMOUS = "anonymous"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by arbitrary hashable keys. A bucket holds up to
+    `burst` tokens and refills at `rate` per second; it's refilled lazily
+    when touched, so there's no timer and each check is O(1).
+
+    Memory is bounded: each shard is an LRU of at most max_buckets / SHARDS
+    buckets, and inserting past that evicts the least recently used one.
+    The evicted bucket is the one idle the longest, which has usually
+    refilled to full anyway, so forgetting it only ever errs towards
+    letting a client through.
+    """
+
+    def __init__(self, max_buckets=MAX_BUCKETS, enabled=True, clock=time.monotonic):
+        self.enabled = enabled
+        self.clock = clock
+        self.per_shard = max(1, max_buckets // SHARDS)
+        self._shards = [(OrderedDict(), threading.Lock()) for _ in range(SHARDS)]
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_buckets=int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", str(MAX_BUCKETS))),
+            enabled=os.environ.get("RATE_LIMIT_ENABLED", "1") not in ("0", "false"),
+        )
+
+    def hit(self, key, rate, burst):
+        """Take a token from `key`'s bucket; 0.0 if allowed, else seconds until one refills."""
+        buckets, lock = self._shards[hash(key) % SHARDS]
+        now = self.clock()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(burst, now)
+                if len(buckets) > self.per_shard:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / rate
+
+    def __len__(self):
+        return sum(len(buckets) for buckets, _ in self._shards)
+
+    def reset(self):
+        for buckets, lock in self._shards:
+            with lock:
+                buckets.clear()
+
+
+limiter = RateLimiter.from_env()
+
+
+class RateLimit:
+    """
+    Per-route limit, used as `dependencies=[Depends(RateLimit(...))]`.
+    Routes sharing an instance share its buckets.
+
+    Each request takes a token from two buckets:
+      - its client IP's, at `per_ip` (rate/s, burst), so rotating
+        identities doesn't escape the limit;
+      - its user's (the authenticated user id, falling back to the IP),
+        at the `per_role` limit for its role; unauthenticated callers and
+        roles not listed use `per_role["anonymous"]`, and with no entry
+        there at all only the IP bucket applies.
+
+    The first empty bucket fails the request with 429 and a Retry-After
+    (whole seconds) saying when a token will be back.
+    """
+
+    def __init__(self, name, per_role, per_ip, limiter=limiter):
+        self.name = name
+        self.per_role = per_role
+        self.per_ip = per_ip
+        self.limiter = limiter
+
+    async def __call__(self, request: Request):
+        if not self.limiter.enabled:
+            return
+        ip = request.client.host if request.client else None
+        identity = authenticator.identify(request.scope)
+        role = identity.role if identity is not None else None
+        if role not in self.per_role:
+            role = ANONYMOUS
+        checks = [((self.name, "ip", ip), self.per_ip)]
+        if role in self.per_role:
+            user = identity.user_id if identity is not None and identity.user_id is not None else ip
+            checks.append(((self.name, role, user), self.per_role[role]))
+        for key, (rate, burst) in checks:
+            wait = self.limiter.hit(key, rate, burst)
+            if wait:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Depends
+from app.schemas import TokenRequest, Token
+from app.auth import Identity, authenticator
+from app.dependencies import get_repo, get_identity
+from app.storage import AsyncRepository
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+# Tokens are signed, not stored: the role is read from storage.users when
+# the token is minted and carried inside it, so requests are authenticated
+# without touching storage. The first admin token comes from
+# `python -m app.auth <user_id> admin` with the server's AUTH_SECRET.
+
+@router.post("/token", response_model=Token, status_code=201)
+async def mint_token(
+    request: TokenRequest,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    user = await repo.get_user(request.user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    token, expires_at = authenticator.mint(user["id"], user["role"])
+    return {"access_token": token, "expires_at": expires_at}
@@ -1,42 +1,171 @@
-from fastapi import APIRouter, HTTPException, Header
-from app.schemas import CourseCreate, Course
-from app.storage import courses, course_id_seq
-
-router = APIRouter(prefix="/courses", tags=["Courses"])
-
-@router.post("/", response_model=Course, status_code=201)
-def create_course(
-    course: CourseCreate,
-    x_user_role: str = Header(...)
-):
-    global course_id_seq
-
-    if x_user_role != "admin":
-        raise HTTPException(status_code=403, detail="Admin only")
-
-    
-    for c in courses.values():
-        if c["code"] == course.code:
-            raise HTTPException(status_code=400, detail="Course code already exists")
-
-    cid = course_id_seq
-    courses[cid] = {
-        "id": cid,
-        "title": course.title,
-        "code": course.code
-    }
-    course_id_seq += 1
-
-    return courses[cid]
-
-
-@router.get("/", response_model=list[Course])
-def get_courses():
-    return list(courses.values())
-
-
-@router.get("/{course_id}", response_model=Course)
-def get_course(course_id: int):
-    if course_id not in courses:
-        raise HTTPException(status_code=404, detail="Course not found")
-    return courses[course_id]
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from app.schemas import CourseCreate, CourseUpdate, Course, CourseSearchResult, WaitlistEntry, RosterEntry
+from app.auth import Identity
+from app.dependencies import get_repo, get_identity
+from app.pagination import Page, NamePage, RankPage, Fields, project
+from app.bulk import BulkResponse, body_format, bulk_results
+from app.cache import catalog_cache
+from app.responses import RecordResponse
+from app.storage import AsyncRepository, DuplicateKeyError, NotFoundError
+
+router = APIRouter(prefix="/courses", tags=["Courses"])
+
+@router.post("/", response_model=Course, status_code=201)
+async def create_course(
+    course: CourseCreate,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    try:
+        return await repo.create_course(course.title, course.code, course.capacity)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Course code must be unique")
+
+
+@router.post("/bulk")
+async def bulk_create_courses(
+    request: Request,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """Create courses from a streamed NDJSON or CSV body; streams back one NDJSON result per row."""
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    fmt = body_format(request)
+    results = bulk_results(request, fmt, CourseCreate, repo.create_courses, lambda e: (400, "Course code must be unique"))
+    return BulkResponse(results)
+
+
+# The catalog reads are public and far more frequent than course writes, so
+# their serialized bodies are cached until the repository's catalog version
+# moves (see app.cache).
+
+@router.get("/", response_model=list[Course])
+async def get_courses(
+    request: Request,
+    response: Response,
+    page: Page = Depends(Page.query),
+    fields: tuple | None = Depends(Fields(Course)),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    async def render():
+        rows = await page.fetch(repo.list_courses, response)
+        return project(rows, fields, response).body, dict(response.headers)
+
+    return await catalog_cache.respond(request, repo, await repo.catalog_version(), render)
+
+
+@router.get("/search", response_model=list[CourseSearchResult])
+async def search_courses(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description='Title words or code prefix, e.g. "intro bio" or "MATH"'),
+    page: RankPage = Depends(RankPage.query),
+    fields: tuple | None = Depends(Fields(CourseSearchResult)),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """
+    Catalog search, best match first. A course matches when its code starts
+    with `q` or when every word of `q` starts a word of its title.
+    """
+    rows = await page.fetch(repo.search_courses, response, text=q)
+    return project(rows, fields, response)
+
+
+@router.get("/{course_id}", response_model=Course)
+async def get_course(course_id: int, request: Request, repo: AsyncRepository = Depends(get_repo)):
+    async def render():
+        course = await repo.get_course(course_id)
+        if course is None:
+            raise HTTPException(status_code=404, detail="Course not found")
+        return RecordResponse(course).body, {}
+
+    return await catalog_cache.respond(request, repo, await repo.catalog_version(), render)
+
+
+async def _update_course(course_id, changes, identity, repo):
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    try:
+        return await repo.update_course(course_id, **changes)
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Course not found")
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Course code must be unique")
+
+
+@router.put("/{course_id}", response_model=Course)
+async def replace_course(
+    course_id: int,
+    course: CourseCreate,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    return await _update_course(course_id, course.model_dump(), identity, repo)
+
+
+@router.patch("/{course_id}", response_model=Course)
+async def update_course(
+    course_id: int,
+    course: CourseUpdate,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    return await _update_course(course_id, course.model_dump(exclude_unset=True), identity, repo)
+
+
+@router.delete("/{course_id}")
+async def delete_course(
+    course_id: int,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """Delete a course together with its enrollments and waitlist."""
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    try:
+        await repo.delete_course(course_id)
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return {"detail": "Course deleted"}
+
+
+@router.get("/{course_id}/waitlist", response_model=list[WaitlistEntry])
+async def get_waitlist(
+    course_id: int,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    if await repo.get_course(course_id) is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return [
+        {"position": position, "user_id": user_id}
+        for position, user_id in enumerate(await repo.get_waitlist(course_id), start=1)
+    ]
+
+
+@router.get("/{course_id}/roster", response_model=list[RosterEntry])
+async def get_roster(
+    course_id: int,
+    response: Response,
+    identity: Identity = Depends(get_identity),
+    page: NamePage = Depends(NamePage.query),
+    fields: tuple | None = Depends(Fields(RosterEntry)),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """Students enrolled in the course, sorted by name; paginated like the other lists."""
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    if await repo.get_course(course_id) is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    rows = await page.fetch(repo.list_roster, response, course_id=course_id)
+    return project(rows, fields, response)
@@ -1,59 +1,191 @@
-from fastapi import APIRouter, HTTPException, Header
-from app.schemas import EnrollmentCreate, Enrollment
-from app.storage import enrollments, enrollment_id_seq, users, courses
-
-router = APIRouter(prefix="/enrollments", tags=["Enrollments"])
-
-# These endpoints allow students to enroll/deregister themselves and view their enrollments. Adims can view all enrollments and mange them as needed.
-
-@router.post("/", response_model=Enrollment, status_code=201)
-def enroll_student(enroll: EnrollmentCreate, x_user_role: str = Header(...)):
-    global enrollment_id_seq
-
-    if x_user_role != "student":
-        raise HTTPException(status_code=403, detail="Students only")
-
-    if enroll.user_id not in users:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if enroll.course_id not in courses:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    if any(
-        e["user_id"] == enroll.user_id and e["course_id"] == enroll.course_id
-        for e in enrollments.values()
-    ):
-        raise HTTPException(status_code=400, detail="Already enrolled")
-
-    eid = enrollment_id_seq
-    enrollments[eid] = {
-        "id": eid,
-        "user_id": enroll.user_id,
-        "course_id": enroll.course_id,
-    }
-    enrollment_id_seq += 1
-    return enrollments[eid]
-
-@router.get("/")
-def get_enrollments(
-    x_user_role: str = Header(...),
-    x_user_id: int | None = Header(None)
-):
-    if x_user_role == "admin":
-        return list(enrollments.values())
-
-    if x_user_role == "student":
-        return [e for e in enrollments.values() if e["user_id"] == x_user_id]
-
-    raise HTTPException(status_code=403, detail="Invalid role")
-
-@router.delete("/{enrollment_id}")
-def deregister(enrollment_id: int, x_user_role: str = Header(...)):
-    if enrollment_id not in enrollments:
-        raise HTTPException(status_code=404, detail="Enrollment not found")
-
-    if x_user_role not in ("student", "admin"):
-        raise HTTPException(status_code=403, detail="Forbidden")
-
-    del enrollments[enrollment_id]
-    return {"detail": "Enrollment deregistered"}
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.schemas import EnrollmentCreate, Enrollment, BatchEnrollmentCreate
+from app.auth import Identity
+from app.dependencies import get_repo, get_identity
+from app.pagination import Page, Fields, project
+from app.bulk import BulkResponse, body_format, bulk_results
+from app.export import parse_include, export_columns, iter_export_rows, ndjson_chunks, csv_chunks
+from app.ratelimit import RateLimit
+from app.storage import AsyncRepository, DuplicateKeyError, NotFoundError, CourseFullError
+
+router = APIRouter(prefix="/enrollments", tags=["Enrollments"])
+
+# These endpoints allow students to enroll/deregister themselves and view their enrollments. Adims can view all enrollments and mange them as needed.
+
+# Enroll and drop share one budget (requests/second, burst) so a client
+# can't flood registration by churning either; see app.ratelimit
+ENROLLMENT_WRITES = RateLimit(
+    "enrollment-writes",
+    per_role={"student": (2, 10), "admin": (20, 100), "anonymous": (1, 5)},
+    per_ip=(50, 200),
+)
+
+def _require_owner(identity, user_id):
+    # students only act for themselves (a header-trusted student who sent no
+    # X-User-Id can't be checked; see app.auth)
+    if identity.role == "student" and identity.user_id is not None and identity.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Forbidden: not your enrollment")
+
+@router.post("/", response_model=Enrollment, status_code=201, dependencies=[Depends(ENROLLMENT_WRITES)])
+async def enroll_student(
+    enroll: EnrollmentCreate,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    if identity.role != "student":
+        raise HTTPException(status_code=403, detail="Forbidden: students only")
+    _require_owner(identity, enroll.user_id)
+
+    # user/course existence, the (user_id, course_id) unique index and the
+    # seat reservation are checked atomically with the insert
+    try:
+        return await repo.create_enrollment(enroll.user_id, enroll.course_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DuplicateKeyError as e:
+        if e.index == "waitlist":
+            raise HTTPException(status_code=400, detail="Already on waitlist")
+        raise HTTPException(status_code=400, detail="Already enrolled")
+    except CourseFullError as e:
+        # queued, not enrolled: 202 with the student's place in line
+        return JSONResponse(
+            status_code=202,
+            content={
+                "detail": "Course is full; added to waitlist",
+                "user_id": enroll.user_id,
+                "course_id": enroll.course_id,
+                "position": e.position,
+            },
+        )
+
+def _describe_enroll_error(error):
+    if isinstance(error, NotFoundError):
+        return 404, str(error)
+    if isinstance(error, CourseFullError):
+        return 409, "Course is full"
+    return 400, "Already enrolled"
+
+@router.post("/batch", status_code=201, dependencies=[Depends(ENROLLMENT_WRITES)])
+async def enroll_student_batch(
+    batch: BatchEnrollmentCreate,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """
+    Enroll one student in several courses at once, all or nothing: 201 with
+    every enrollment, or 409 with nothing written and a per-course result
+    saying which courses failed. A full course fails the batch rather than
+    joining its waitlist.
+    """
+    if identity.role != "student":
+        raise HTTPException(status_code=403, detail="Forbidden: students only")
+    _require_owner(identity, batch.user_id)
+
+    try:
+        outcomes = await repo.enroll_in_courses(batch.user_id, batch.course_ids)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if not any(isinstance(outcome, Exception) for outcome in outcomes):
+        return {
+            "user_id": batch.user_id,
+            "results": [
+                {"course_id": course_id, "status": 201, "enrollment": outcome}
+                for course_id, outcome in zip(batch.course_ids, outcomes)
+            ],
+        }
+
+    results = []
+    for course_id, outcome in zip(batch.course_ids, outcomes):
+        if outcome is None:
+            status, detail = 424, "Not applied: another course in the batch failed"
+        else:
+            status, detail = _describe_enroll_error(outcome)
+        results.append({"course_id": course_id, "status": status, "detail": detail})
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "No enrollments made", "user_id": batch.user_id, "results": results},
+    )
+
+@router.post("/bulk")
+async def bulk_enroll(
+    request: Request,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """
+    Term loads: enroll students from a streamed NDJSON or CSV body of
+    {user_id, course_id} rows. Admin only; streams back one NDJSON result per row.
+    """
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    fmt = body_format(request)
+    results = bulk_results(request, fmt, EnrollmentCreate, repo.create_enrollments, _describe_enroll_error)
+    return BulkResponse(results)
+
+@router.get("/")
+async def get_enrollments(
+    response: Response,
+    identity: Identity = Depends(get_identity),
+    page: Page = Depends(Page.query),
+    fields: tuple | None = Depends(Fields(Enrollment)),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    if identity.role == "admin":
+        rows = await page.fetch(repo.list_enrollments, response)
+    elif identity.role == "student":
+        # without a user id a student owns nothing (user_id=None would mean "all")
+        rows = [] if identity.user_id is None else await page.fetch(repo.list_enrollments, response, user_id=identity.user_id)
+    else:
+        raise HTTPException(status_code=403, detail="Invalid role")
+
+    return project(rows, fields, response)
+
+@router.get("/export")
+async def export_enrollments(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    include: str | None = Query(None, description="Comma-separated joins: user, course"),
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """
+    Admin export of every enrollment, streamed page by page so memory stays
+    flat however large the term is. `include=user,course` adds the user's
+    name/email and the course code.
+    """
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    joins = parse_include(include)
+    pages = iter_export_rows(repo, joins)
+    if fmt == "csv":
+        return StreamingResponse(
+            csv_chunks(pages, export_columns(joins)),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="enrollments.csv"'},
+        )
+    return StreamingResponse(ndjson_chunks(pages), media_type="application/x-ndjson")
+
+@router.delete("/{enrollment_id}", dependencies=[Depends(ENROLLMENT_WRITES)])
+async def deregister(
+    enrollment_id: int,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    enrollment = await repo.get_enrollment(enrollment_id)
+    if enrollment is None:
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+
+    if identity.role not in ("student", "admin"):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    _require_owner(identity, enrollment["user_id"])
+
+    try:
+        await repo.delete_enrollment(enrollment_id)
+    except NotFoundError:
+        # lost a race with a concurrent deregister
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+    return {"detail": "Enrollment deregistered"}
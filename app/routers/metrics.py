@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from app.metrics import registry, CONTENT_TYPE
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request metrics in Prometheus text format, merged across threads at scrape time."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, Depends, Response
+from app.auth import Identity
+from app.dependencies import get_identity
+from app.profiling import profiler
+
+router = APIRouter(prefix="/profiles", tags=["Profiling"])
+
+# Request profiles are captured by app.profiling.ProfilingMiddleware when an
+# admin sends `X-Profile: 1` (or `?profile=1`); the response's X-Profile-Id
+# header names the profile to fetch here.
+
+@router.get("/")
+async def list_profiles(identity: Identity = Depends(get_identity)):
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+    return profiler.list()
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: int, identity: Identity = Depends(get_identity)):
+    """The profile as collapsed stacks (one `frame;frame;... microseconds` line per stack)."""
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(profile.collapsed, media_type="text/plain; charset=utf-8")
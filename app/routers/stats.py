@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from app.schemas import EnrollmentStats
+from app.auth import Identity
+from app.dependencies import get_repo, get_identity
+from app.storage import AsyncRepository
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+MAX_TOP = 100
+
+# Every figure here is a counter the repository keeps up to date on each
+# write, so dashboards can poll this without scanning enrollments.
+
+@router.get("", response_model=EnrollmentStats)
+async def get_stats(
+    top: int = Query(10, ge=1, le=MAX_TOP, description="How many of the most-enrolled courses to list"),
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+    return await repo.enrollment_stats(top)
@@ -1,34 +1,64 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas import UserCreate, User
-from app.storage import users, user_id_seq
-from email_validator import validate_email, EmailNotValidError
-
-router = APIRouter(prefix="/users", tags=["Users"])
-
-@router.post("/", response_model=User, status_code=201)
-def create_user(user: UserCreate):
-    global user_id_seq
-
-    # duplicate email check
-    for u in users.values():
-        if u["email"] == user.email:
-            raise HTTPException(status_code=400, detail="Email already exists")
-
-    uid = user_id_seq
-    users[uid] = {"id": uid, **user.dict()}
-    user_id_seq += 1
-
-    return users[uid]
-
-
-@router.get("/", response_model=list[User])
-def get_users():
-    return list(users.values())
-
-@router.get("/{user_id}", response_model=User)
-def get_user(user_id: int):
-    if user_id not in users:
-        raise HTTPException(status_code=404, detail="User not found")
-    return users[user_id]
-
-
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from app.schemas import UserCreate, User
+from app.auth import Identity
+from app.dependencies import get_repo, get_identity
+from app.pagination import Page, Fields, project
+from app.responses import RecordResponse
+from app.ratelimit import RateLimit
+from app.bulk import BulkResponse, body_format, bulk_results
+from app.storage import AsyncRepository, DuplicateKeyError
+from email_validator import validate_email, EmailNotValidError
+
+router = APIRouter(prefix="/users", tags=["Users"])
+
+# sign-up is unauthenticated, so it's limited per client IP only
+SIGNUP = RateLimit("signup", per_role={}, per_ip=(5, 20))
+
+@router.post("/", response_model=User, status_code=201, dependencies=[Depends(SIGNUP)])
+async def create_user(user: UserCreate, repo: AsyncRepository = Depends(get_repo)):
+    # id allocation and the duplicate email check (case-insensitive index)
+    # happen atomically inside storage
+    try:
+        return await repo.create_user(user.name, user.email, user.role)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already exists")
+
+
+@router.post("/bulk")
+async def bulk_create_users(
+    request: Request,
+    identity: Identity = Depends(get_identity),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """Create users from a streamed NDJSON or CSV body; streams back one NDJSON result per row."""
+    if identity.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: admin only")
+
+    fmt = body_format(request)
+    results = bulk_results(request, fmt, UserCreate, repo.create_users, lambda e: (400, "Email already exists"))
+    return BulkResponse(results)
+
+
+@router.get("/", response_model=list[User])
+async def get_users(
+    response: Response,
+    role: Literal["student", "admin"] | None = Query(None),
+    email_prefix: str | None = Query(None, min_length=1, description="Case-insensitive start of the email"),
+    name_contains: str | None = Query(None, min_length=1, description="Case-insensitive part of the name"),
+    page: Page = Depends(Page.query),
+    fields: tuple | None = Depends(Fields(User)),
+    repo: AsyncRepository = Depends(get_repo)
+):
+    """Users in id order; the filters combine, and role/email lookups go through indexes."""
+    rows = await page.fetch(repo.list_users, response, role=role, email_prefix=email_prefix, name_contains=name_contains)
+    return project(rows, fields, response)
+
+@router.get("/{user_id}", response_model=User)
+async def get_user(user_id: int, repo: AsyncRepository = Depends(get_repo)):
+    user = await repo.get_user(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return RecordResponse(user)
+
+
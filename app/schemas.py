@@ -1,32 +1,96 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Literal
-
-# ---------------- USERS ----------------
-
-class UserCreate(BaseModel):
-    name: str = Field(..., min_length=1)
-    email: EmailStr
-    role: Literal["student", "admin"]
-
-class User(UserCreate):
-    id: int
-
-
-# ---------------- COURSES ----------------
-
-class CourseCreate(BaseModel):
-    title: str = Field(..., min_length=1)
-    code: str = Field(..., min_length=1)
-
-class Course(CourseCreate):
-    id: int
-
-
-# ---------------- ENROLLMENTS ----------------
-
-class EnrollmentCreate(BaseModel):
-    user_id: int
-    course_id: int
-
-class Enrollment(EnrollmentCreate):
-    id: int
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Literal
+
+# ---------------- USERS ----------------
+
+class UserCreate(BaseModel):
+    name: str = Field(..., min_length=1)
+    email: EmailStr
+    role: Literal["student", "admin"]
+
+class User(UserCreate):
+    id: int
+
+
+# ---------------- COURSES ----------------
+
+class CourseCreate(BaseModel):
+    title: str = Field(..., min_length=1)
+    code: str = Field(..., min_length=1)
+    capacity: int | None = Field(None, ge=1, description="Seat limit; unlimited if omitted")
+
+class CourseUpdate(BaseModel):
+    # PATCH body: only the fields sent are changed; title/code can't be nulled
+    title: str = Field(None, min_length=1)
+    code: str = Field(None, min_length=1)
+    capacity: int | None = Field(None, ge=1)
+
+class Course(CourseCreate):
+    id: int
+
+class CourseSearchResult(Course):
+    score: int = Field(..., description="Relevance; results come best first")
+
+
+# ---------------- ENROLLMENTS ----------------
+
+class EnrollmentCreate(BaseModel):
+    user_id: int
+    course_id: int
+
+class Enrollment(EnrollmentCreate):
+    id: int
+
+class BatchEnrollmentCreate(BaseModel):
+    # a term's registration: one student, a handful of courses
+    user_id: int
+    course_ids: list[int] = Field(..., min_length=1, max_length=20)
+
+    @field_validator("course_ids")
+    @classmethod
+    def distinct_courses(cls, course_ids):
+        if len(set(course_ids)) != len(course_ids):
+            raise ValueError("course_ids must not repeat")
+        return course_ids
+
+class WaitlistEntry(BaseModel):
+    position: int
+    user_id: int
+
+class RosterEntry(BaseModel):
+    user_id: int
+    name: str
+    email: EmailStr
+    enrollment_id: int
+
+
+# ---------------- STATS ----------------
+
+class UserTotals(BaseModel):
+    total: int
+    by_role: dict[str, int]
+
+class CourseEnrollment(BaseModel):
+    id: int
+    code: str
+    title: str
+    enrolled: int
+
+class EnrollmentStats(BaseModel):
+    users: UserTotals
+    courses: int
+    enrollments: int
+    courses_per_user: dict[int, int] = Field(..., description="Number of users holding exactly k enrollments, by k")
+    top_courses: list[CourseEnrollment]
+
+
+
+# ---------------- AUTH ----------------
+
+class TokenRequest(BaseModel):
+    user_id: int
+
+class Token(BaseModel):
+    access_token: str
+    token_type: Literal["bearer"] = "bearer"
+    expires_at: int = Field(..., description="Unix time after which the token is rejected")
@@ -1,7 +0,0 @@
-users = {}
-courses = {}
-enrollments = {}
-
-user_id_seq = 1
-course_id_seq = 1
-enrollment_id_seq = 1
@@ -0,0 +1,57 @@
+import os
+import threading
+
+from app.storage.aio import AsyncRepository
+from app.storage.base import Repository, DuplicateKeyError, NotFoundError, CourseFullError, normalize_email
+from app.storage.memory import MemoryRepository, Table, EnrollmentStore, Index, UniqueIndex
+from app.storage.sqlite import SQLiteRepository
+from app.storage.journal import JournaledRepository, Journal, JournalError
+
+# Backend selection:
+#   STORAGE_BACKEND=memory (default) | sqlite | journal
+#   SQLITE_PATH=enrollment.db
+#   JOURNAL_DIR=journal, JOURNAL_FSYNC=always | interval | off,
+#   JOURNAL_FSYNC_INTERVAL=1.0 (seconds), JOURNAL_SNAPSHOT_EVERY=100000 (writes)
+DEFAULT_SQLITE_PATH = "enrollment.db"
+DEFAULT_JOURNAL_DIR = "journal"
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def create_repository(backend=None, path=None):
+    backend = backend or os.environ.get("STORAGE_BACKEND", "memory")
+    if backend == "memory":
+        return MemoryRepository()
+    if backend == "sqlite":
+        return SQLiteRepository(path or os.environ.get("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    if backend == "journal":
+        return JournaledRepository(
+            path or os.environ.get("JOURNAL_DIR", DEFAULT_JOURNAL_DIR),
+            fsync=os.environ.get("JOURNAL_FSYNC", "always"),
+            interval=float(os.environ.get("JOURNAL_FSYNC_INTERVAL", "1.0")),
+            snapshot_every=int(os.environ.get("JOURNAL_SNAPSHOT_EVERY", "100000")),
+        )
+    raise ValueError(f"Unknown storage backend '{backend}'")
+
+
+def get_repository():
+    """The process-wide repository, created from the environment on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = create_repository()
+    return _repository
+
+
+def set_repository(repository):
+    """Swap the process-wide repository (e.g. to point benchmarks at SQLite)."""
+    global _repository
+    with _repository_lock:
+        _repository = repository
+
+
+def reset():
+    """Empty every table (used by the test suite to isolate tests)."""
+    get_repository().clear()
@@ -0,0 +1,101 @@
+class AsyncRepository:
+    """
+    Awaitable view of a Repository with the same methods and semantics.
+    Every call goes through the backend's run_async(): inline on the event
+    loop for the in-memory store, on a dedicated thread pool for SQLite.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self._run = repo.run_async
+
+    # ---------------- USERS ----------------
+
+    async def create_user(self, name, email, role):
+        return await self._run(self.repo.create_user, name, email, role)
+
+    async def get_user(self, user_id):
+        return await self._run(self.repo.get_user, user_id)
+
+    async def list_users(self, after=None, limit=None, role=None, email_prefix=None, name_contains=None):
+        return await self._run(self.repo.list_users, after, limit, role, email_prefix, name_contains)
+
+    # ---------------- COURSES ----------------
+
+    async def create_course(self, title, code, capacity=None):
+        return await self._run(self.repo.create_course, title, code, capacity)
+
+    async def get_course(self, course_id):
+        return await self._run(self.repo.get_course, course_id)
+
+    async def list_courses(self, after=None, limit=None):
+        return await self._run(self.repo.list_courses, after, limit)
+
+    async def search_courses(self, text, after=None, limit=None):
+        return await self._run(self.repo.search_courses, text, after, limit)
+
+    async def update_course(self, course_id, **changes):
+        return await self._run(self.repo.update_course, course_id, **changes)
+
+    async def delete_course(self, course_id):
+        return await self._run(self.repo.delete_course, course_id)
+
+    async def catalog_version(self):
+        return await self._run(self.repo.catalog_version)
+
+    # ---------------- ENROLLMENTS ----------------
+
+    async def create_enrollment(self, user_id, course_id, waitlist=True):
+        return await self._run(self.repo.create_enrollment, user_id, course_id, waitlist)
+
+    async def enroll_in_courses(self, user_id, course_ids):
+        return await self._run(self.repo.enroll_in_courses, user_id, course_ids)
+
+    async def get_enrollment(self, enrollment_id):
+        return await self._run(self.repo.get_enrollment, enrollment_id)
+
+    async def list_enrollments(self, user_id=None, after=None, limit=None):
+        return await self._run(self.repo.list_enrollments, user_id, after, limit)
+
+    async def list_roster(self, course_id, after=None, limit=None):
+        return await self._run(self.repo.list_roster, course_id, after, limit)
+
+    async def delete_enrollment(self, enrollment_id):
+        return await self._run(self.repo.delete_enrollment, enrollment_id)
+
+    async def get_waitlist(self, course_id):
+        return await self._run(self.repo.get_waitlist, course_id)
+
+    # ---------------- STATS ----------------
+
+    async def enrollment_stats(self, top=10):
+        return await self._run(self.repo.enrollment_stats, top)
+
+    # ---------------- BULK ----------------
+
+    async def create_users(self, rows):
+        return await self._run(self.repo.create_users, rows)
+
+    async def create_courses(self, rows):
+        return await self._run(self.repo.create_courses, rows)
+
+    async def create_enrollments(self, rows):
+        return await self._run(self.repo.create_enrollments, rows)
+
+    # ---------------- STREAMING READS ----------------
+
+    async def iter_enrollments(self, batch_size=1000):
+        """Async twin of Repository.iter_enrollments: one awaited call per page."""
+        after = None
+        while True:
+            page = await self.list_enrollments(after=after, limit=batch_size)
+            if not page:
+                return
+            yield page
+            after = page[-1]["id"]
+
+    async def get_users_by_id(self, user_ids):
+        return await self._run(self.repo.get_users_by_id, user_ids)
+
+    async def get_courses_by_id(self, course_ids):
+        return await self._run(self.repo.get_courses_by_id, course_ids)
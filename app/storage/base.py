@@ -0,0 +1,277 @@
+import sys
+from abc import ABC, abstractmethod
+from functools import cached_property, partial
+
+import anyio
+
+from app.storage.aio import AsyncRepository
+
+
+class DuplicateKeyError(Exception):
+    """Raised when a write would violate a unique index."""
+
+    def __init__(self, index):
+        super().__init__(f"Duplicate value for unique index '{index}'")
+        self.index = index
+
+
+class NotFoundError(Exception):
+    """Raised when a write references a record that doesn't exist."""
+
+    def __init__(self, entity):
+        super().__init__(f"{entity} not found")
+        self.entity = entity
+
+
+class CourseFullError(Exception):
+    """
+    Raised when a course has no free seat. `position` is the user's place
+    on the course waitlist if they were queued instead of enrolled.
+    """
+
+    def __init__(self, position=None):
+        super().__init__("Course is full")
+        self.position = position
+
+
+def normalize_email(email):
+    # Emails are matched case-insensitively, so indexes store the casefolded form
+    return email.casefold()
+
+
+def prefix_end(prefix):
+    """
+    The exclusive upper bound of the strings starting with `prefix` (its
+    last character bumped), or None when there is none: a prefix made only
+    of U+10FFFF has nothing above it, and trailing U+10FFFF can't be bumped.
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    following = ord(prefix[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000  # surrogates can't be encoded, and never occur in stored text
+    return prefix[:-1] + chr(following)
+
+
+def _attempt(create, *args):
+    try:
+        return create(*args)
+    except (DuplicateKeyError, NotFoundError, CourseFullError) as e:
+        return e
+
+
+class Repository(ABC):
+    """
+    Storage interface used by the routers. Records go in and come out as
+    plain dicts shaped like the response schemas in app.schemas.
+
+    Writes that must be unique raise DuplicateKeyError; writes that reference
+    a missing user/course/enrollment raise NotFoundError.
+
+    Courses may have a `capacity`. Seats are reserved atomically with the
+    enrollment insert; a student who finds the course full is queued on its
+    waitlist (CourseFullError with a position) and promoted, in arrival
+    order, when a seat frees up.
+
+    List methods are keyset-paginated: they return rows with id > `after`
+    in ascending id order, at most `limit` of them (None means no bound).
+
+    Bulk methods take a list of field dicts and return one entry per input,
+    in order: the created record, or the DuplicateKeyError/NotFoundError
+    that row hit. A failing row never aborts the rest of the batch.
+    """
+
+    # ---------------- USERS ----------------
+
+    @abstractmethod
+    def create_user(self, name, email, role):
+        ...
+
+    @abstractmethod
+    def get_user(self, user_id):
+        ...
+
+    @abstractmethod
+    def list_users(self, after=None, limit=None, role=None, email_prefix=None, name_contains=None):
+        """
+        Users in id order, optionally filtered (filters combine with AND):
+        by `role`, by an email prefix and by a substring of the name, both
+        case-insensitive.
+        """
+
+    # ---------------- COURSES ----------------
+
+    @abstractmethod
+    def create_course(self, title, code, capacity=None):
+        ...
+
+    @abstractmethod
+    def get_course(self, course_id):
+        ...
+
+    @abstractmethod
+    def list_courses(self, after=None, limit=None):
+        ...
+
+    @abstractmethod
+    def search_courses(self, text, after=None, limit=None):
+        """
+        Courses matching a catalog search (see search.CourseQuery), each
+        with its `score`, best first: ordered by (-score, id). `after` is
+        the (score, id) of the previous page's last row.
+        """
+
+    @abstractmethod
+    def update_course(self, course_id, **changes):
+        """
+        Apply `changes` (title, code, capacity) and return the new record.
+        A code change moves the unique key atomically (DuplicateKeyError if
+        taken); a capacity increase promotes from the waitlist.
+        """
+
+    @abstractmethod
+    def delete_course(self, course_id):
+        """Delete a course with its enrollments and waitlist; returns the course."""
+
+    @abstractmethod
+    def catalog_version(self):
+        """
+        Counter bumped after every course write (and clear). Anything
+        derived from the catalog at an older version is stale.
+        """
+
+    # ---------------- ENROLLMENTS ----------------
+
+    @abstractmethod
+    def create_enrollment(self, user_id, course_id, waitlist=True):
+        """
+        Enroll, or raise CourseFullError if there's no seat. With
+        `waitlist` the user is queued first and the error carries their
+        position; a second attempt while queued raises
+        DuplicateKeyError("waitlist").
+        """
+
+    @abstractmethod
+    def enroll_in_courses(self, user_id, course_ids):
+        """
+        Enroll one user in several courses, all or nothing. Every course is
+        checked before any seat is taken; the result has one entry per
+        course id, in order. On success that's the created records. If any
+        course fails, nothing is written and the failing entries hold their
+        NotFoundError/DuplicateKeyError/CourseFullError (a repeated id is a
+        duplicate) while the rest are None. A full course is an error, not a
+        waitlist place. A missing user raises NotFoundError("User").
+        """
+
+    @abstractmethod
+    def get_enrollment(self, enrollment_id):
+        ...
+
+    @abstractmethod
+    def list_enrollments(self, user_id=None, after=None, limit=None):
+        ...
+
+    @abstractmethod
+    def list_roster(self, course_id, after=None, limit=None):
+        """
+        A course's enrolled students as {user_id, name, email,
+        enrollment_id}, sorted by (name, user_id). `after` is the
+        (name, user_id) of the previous page's last row. Read through the
+        course's enrollment index, so the cost follows the roster size.
+        """
+
+    @abstractmethod
+    def delete_enrollment(self, enrollment_id):
+        """Remove an enrollment and promote from the course's waitlist into the freed seat."""
+
+    @abstractmethod
+    def get_waitlist(self, course_id):
+        """User ids queued for a course, in promotion order."""
+
+    # ---------------- STATS ----------------
+
+    @abstractmethod
+    def enrollment_stats(self, top=10):
+        """
+        Dashboard aggregates, kept up to date as writes happen so a read
+        costs O(top) whatever the data size:
+          users             {"total", "by_role": {role: count}}
+          courses           number of courses
+          enrollments       number of enrollments
+          courses_per_user  {k: users holding exactly k enrollments}
+          top_courses       the `top` courses by enrollment (ties by id) as
+                            {id, code, title, enrolled}; empty courses left out
+        """
+
+    # ---------------- BULK ----------------
+    # Row-at-a-time fallbacks; backends override these to amortize locking
+    # and commits over the whole batch.
+
+    def create_users(self, rows):
+        return [_attempt(self.create_user, row["name"], row["email"], row["role"]) for row in rows]
+
+    def create_courses(self, rows):
+        return [_attempt(self.create_course, row["title"], row["code"], row.get("capacity")) for row in rows]
+
+    def create_enrollments(self, rows):
+        # bulk loads place students directly; a full course is an error, not a queue
+        return [_attempt(self.create_enrollment, row["user_id"], row["course_id"], False) for row in rows]
+
+    # ---------------- STREAMING READS ----------------
+
+    def iter_enrollments(self, batch_size=1000):
+        """
+        Yield every enrollment as a sequence of keyset pages, so callers can
+        walk the whole table in constant memory and never hold a long-lived
+        snapshot (or, for SQLite, a long read transaction).
+        """
+        after = None
+        while True:
+            page = self.list_enrollments(after=after, limit=batch_size)
+            if not page:
+                return
+            yield page
+            after = page[-1]["id"]
+
+    def get_users_by_id(self, user_ids):
+        """{id: user} for the given ids; missing ids are left out."""
+        found = {}
+        for user_id in user_ids:
+            user = self.get_user(user_id)
+            if user is not None:
+                found[user_id] = user
+        return found
+
+    def get_courses_by_id(self, course_ids):
+        """{id: course} for the given ids; missing ids are left out."""
+        found = {}
+        for course_id in course_ids:
+            course = self.get_course(course_id)
+            if course is not None:
+                found[course_id] = course
+        return found
+
+    # ---------------- ASYNC ----------------
+
+    @cached_property
+    def aio(self):
+        """AsyncRepository facade over this backend, used by the async routes."""
+        return AsyncRepository(self)
+
+    async def run_async(self, method, *args, **kwargs):
+        """
+        Await one of this repository's methods from the event loop. The
+        default assumes it may block and runs it on a worker thread;
+        backends whose methods never block override this.
+        """
+        return await anyio.to_thread.run_sync(partial(method, *args, **kwargs))
+
+    # ---------------- MAINTENANCE ----------------
+
+    @abstractmethod
+    def clear(self):
+        """Remove every record and restart id allocation."""
+
+    def close(self):
+        """Release any resources (connections, files) held by the backend."""
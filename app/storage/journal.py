@@ -0,0 +1,425 @@
+import asyncio
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+
+from app.storage.memory import MemoryRepository
+
+# Every mutating Repository method. Each call is applied to the in-memory
+# tables and appended to the journal under one write lock, so the journal
+# order is the apply order and replaying it reproduces the same ids,
+# waitlist positions and promotions.
+WRITES = frozenset({
+    "create_user", "create_users",
+    "create_course", "create_courses", "update_course", "delete_course",
+    "create_enrollment", "create_enrollments", "enroll_in_courses", "delete_enrollment",
+    "clear",
+})
+
+FSYNC_POLICIES = ("always", "interval", "off")
+
+# frame: payload length, crc32(payload), payload (pickled (method, args, kwargs))
+FRAME = struct.Struct("<II")
+SEGMENT = re.compile(r"journal-(\d{8})\.log$")
+SNAPSHOT = re.compile(r"snapshot-(\d{8})\.bin$")
+
+
+def _segment_path(directory, seq):
+    return os.path.join(directory, f"journal-{seq:08d}.log")
+
+
+def _snapshot_path(directory, seq):
+    return os.path.join(directory, f"snapshot-{seq:08d}.bin")
+
+
+def _numbered(directory, pattern):
+    found = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            found.append(int(match.group(1)))
+    return sorted(found)
+
+
+def _fsync_dir(directory):
+    # makes renames and new files durable; Windows can't open a directory
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_segment(path):
+    """
+    (records, good_bytes) for one journal file. Reading stops at the first
+    short or corrupt frame: a write torn by a crash can only be at the end,
+    and the caller truncates it away.
+    """
+    records = []
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + FRAME.size <= len(data):
+        length, crc = FRAME.unpack_from(data, pos)
+        payload = data[pos + FRAME.size:pos + FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(pickle.loads(payload))
+        pos += FRAME.size + length
+    return records, pos
+
+
+class JournalError(Exception):
+    """Raised to writers waiting on a flush that failed (e.g. fsync EIO)."""
+
+
+class Journal:
+    """
+    Append-only log of write calls with group commit. Writers append a
+    frame to an in-memory buffer and get a sequence number (lsn); a flusher
+    thread writes whatever has accumulated in one write() + fsync() and
+    then releases every writer the batch covered. While one fsync runs, new
+    appends pile up for the next one, so the fsync rate stays flat as the
+    write rate grows.
+
+    fsync policy:
+      always    a write returns once its frame is on disk (group-committed)
+      interval  the flusher writes and fsyncs every `interval` seconds;
+                writes don't wait, a crash loses at most that window
+      off       as interval, but never fsyncs: survives a process crash,
+                not a power loss
+    """
+
+    def __init__(self, directory, seq, fsync="always", interval=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+        self.directory = directory
+        self.fsync = fsync
+        self.interval = interval
+        self.seq = seq
+        self.appended = 0
+        self.durable = 0
+        self.syncs = 0
+        self.error = None
+        self._buffer = bytearray()
+        self._waiters = []  # (lsn, loop, future) for async writers
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._file = open(_segment_path(directory, seq), "ab")
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    # ---------------- WRITERS ----------------
+
+    def append(self, record):
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            self._buffer += frame
+            self.appended += 1
+            if self.fsync == "always":
+                self._cond.notify_all()
+            return self.appended
+
+    def wait(self, lsn):
+        """Block until `lsn` is durable (only under the `always` policy)."""
+        if self.fsync != "always":
+            return
+        with self._cond:
+            while self.durable < lsn and self.error is None:
+                self._cond.wait()
+            if self.durable < lsn:
+                raise JournalError("journal flush failed") from self.error
+
+    async def wait_async(self, lsn):
+        """wait() for event-loop callers: parks the coroutine, not the thread."""
+        if self.fsync != "always":
+            return
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self.durable >= lsn:
+                return
+            if self.error is not None:
+                raise JournalError("journal flush failed") from self.error
+            future = loop.create_future()
+            self._waiters.append((lsn, loop, future))
+        await future
+
+    # ---------------- FLUSHER ----------------
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if self.fsync == "always":
+                    while not self._buffer and not self._closed:
+                        self._cond.wait()
+                elif not self._closed:
+                    self._cond.wait(self.interval)
+                if self._closed and not self._buffer:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Write and (per policy) fsync everything appended so far, then release its writers."""
+        with self._io_lock:
+            with self._cond:
+                data, self._buffer = self._buffer, bytearray()
+                upto = self.appended
+            error = None
+            if data:
+                try:
+                    self._file.write(data)
+                    self._file.flush()
+                    if self.fsync != "off":
+                        os.fsync(self._file.fileno())
+                        self.syncs += 1
+                except OSError as e:
+                    error = e
+        with self._cond:
+            if error is not None:
+                self.error = error
+            else:
+                self.durable = max(self.durable, upto)
+            self._cond.notify_all()
+            done, pending = [], []
+            for waiter in self._waiters:
+                (done if error is not None or waiter[0] <= self.durable else pending).append(waiter)
+            self._waiters = pending
+        for _, loop, future in done:
+            loop.call_soon_threadsafe(_resolve, future, error)
+
+    # ---------------- SEGMENTS ----------------
+
+    def rotate(self):
+        """
+        Flush, close the current segment and start the next one; returns the
+        new segment's number. The caller holds the repository's write lock,
+        so nothing is appended in between.
+        """
+        self.flush()
+        with self._io_lock:
+            self._file.close()
+            self.seq += 1
+            self._file = open(_segment_path(self.directory, self.seq), "ab")
+        _fsync_dir(self.directory)
+        return self.seq
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self.flush()
+        with self._io_lock:
+            if not self._file.closed:
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+
+def _resolve(future, error):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(JournalError("journal flush failed"))
+
+
+class JournaledRepository(MemoryRepository):
+    """
+    The in-memory store made durable: every write call is appended to an
+    append-only journal (group-committed, see Journal), and the full state
+    is periodically written to a compact binary snapshot. On startup the
+    newest snapshot is loaded and the journal written after it replayed.
+
+    Files in `directory`:
+      snapshot-N.bin   pickled MemoryRepository.dump_state(), taken just as
+                       segment N was started
+      journal-N.log    write calls made after that snapshot
+
+    A snapshot runs every `snapshot_every` journaled writes (on a
+    background thread) and from snapshot(); the state copy is taken under
+    the write lock, so writes pause for the copy but not for the pickling
+    and fsync. Writes from the event loop wait out that pause on the
+    executor. The copy is kept short because enrollment reads need the
+    EnrollmentStore lock too: only its columns are copied (a memcpy each,
+    ~30 ms at 2M rows) and the adjacency lists are rebuilt on load. The
+    pickling still competes with request handling for the GIL, so
+    latencies rise while it runs. Older snapshots and segments are then
+    deleted.
+
+    A write is visible as soon as it's applied, before its journal frame is
+    durable: under the `always` policy the writer isn't answered until the
+    flush, but a concurrent reader can already see the row, and a crash in
+    between loses a row someone may have read.
+
+    Journal records are logical (method and arguments), so they only replay
+    correctly onto the state they were written after; that's why each
+    snapshot starts a new segment.
+    """
+
+    def __init__(self, directory, fsync="always", interval=1.0, snapshot_every=100_000):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self._write_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread = None
+        self._since_snapshot = 0
+        last = self._recover()
+        self.journal = Journal(directory, last + 1, fsync=fsync, interval=interval)
+
+    # ---------------- RECOVERY ----------------
+
+    def _recover(self):
+        """Load the newest snapshot and replay later segments; returns the last segment number seen."""
+        snapshots = _numbered(self.directory, SNAPSHOT)
+        start = 0
+        if snapshots:
+            start = snapshots[-1]
+            with open(_snapshot_path(self.directory, start), "rb") as f:
+                self.load_state(pickle.load(f))
+        segments = [seq for seq in _numbered(self.directory, SEGMENT) if seq >= start]
+        for seq in segments:
+            path = _segment_path(self.directory, seq)
+            records, good = read_segment(path)
+            if good < os.path.getsize(path):
+                # drop a torn tail so later appends aren't stranded behind it
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+            for method, args, kwargs in records:
+                try:
+                    getattr(MemoryRepository, method)(self, *args, **kwargs)
+                except Exception:
+                    # the call failed the first time too; it's journaled for
+                    # any side effects it had (e.g. joining a waitlist)
+                    pass
+            self._since_snapshot += len(records)
+        return max([start, *segments])
+
+    # ---------------- WRITES ----------------
+
+    def _apply(self, method, args, kwargs):
+        """Apply and journal one write call; returns (result or exception, lsn)."""
+        with self._write_lock:
+            return self._apply_locked(method, args, kwargs)
+
+    def _apply_locked(self, method, args, kwargs):
+        # caller holds the write lock
+        try:
+            outcome = getattr(MemoryRepository, method)(self, *args, **kwargs)
+        except Exception as e:
+            outcome = e
+        lsn = self.journal.append((method, args, kwargs))
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self._start_snapshot()
+        return outcome, lsn
+
+    def _write(self, method, *args, **kwargs):
+        outcome, lsn = self._apply(method, args, kwargs)
+        self.journal.wait(lsn)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def run_async(self, method, *args, **kwargs):
+        # reads stay inline; writes apply inline and then park on the group
+        # commit instead of blocking the event loop in fsync. The loop never
+        # waits for the write lock: while it's held (a snapshot copying the
+        # state, or a write from another thread) the write goes to the
+        # executor and waits there.
+        if method.__name__ not in WRITES:
+            return method(*args, **kwargs)
+        if self._write_lock.acquire(blocking=False):
+            try:
+                outcome, lsn = self._apply_locked(method.__name__, args, kwargs)
+            finally:
+                self._write_lock.release()
+        else:
+            loop = asyncio.get_running_loop()
+            outcome, lsn = await loop.run_in_executor(None, self._apply, method.__name__, args, kwargs)
+        await self.journal.wait_async(lsn)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def create_user(self, name, email, role):
+        return self._write("create_user", name, email, role)
+
+    def create_users(self, rows):
+        return self._write("create_users", list(rows))
+
+    def create_course(self, title, code, capacity=None):
+        return self._write("create_course", title, code, capacity)
+
+    def create_courses(self, rows):
+        return self._write("create_courses", list(rows))
+
+    def update_course(self, course_id, **changes):
+        return self._write("update_course", course_id, **changes)
+
+    def delete_course(self, course_id):
+        return self._write("delete_course", course_id)
+
+    def create_enrollment(self, user_id, course_id, waitlist=True):
+        return self._write("create_enrollment", user_id, course_id, waitlist)
+
+    def create_enrollments(self, rows):
+        return self._write("create_enrollments", list(rows))
+
+    def enroll_in_courses(self, user_id, course_ids):
+        return self._write("enroll_in_courses", user_id, list(course_ids))
+
+    def delete_enrollment(self, enrollment_id):
+        return self._write("delete_enrollment", enrollment_id)
+
+    def clear(self):
+        return self._write("clear")
+
+    # ---------------- SNAPSHOTS ----------------
+
+    def _start_snapshot(self):
+        # caller holds the write lock
+        if self._snapshot_thread is None or not self._snapshot_thread.is_alive():
+            self._since_snapshot = 0
+            self._snapshot_thread = threading.Thread(target=self.snapshot, name="journal-snapshot", daemon=True)
+            self._snapshot_thread.start()
+
+    def snapshot(self):
+        """Write a snapshot of the current state and drop the files it supersedes; returns its number."""
+        with self._snapshot_lock:
+            with self._write_lock:
+                state = self.dump_state()
+                seq = self.journal.rotate()
+                self._since_snapshot = 0
+            path = _snapshot_path(self.directory, seq)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_dir(self.directory)
+            for old in _numbered(self.directory, SNAPSHOT):
+                if old < seq:
+                    os.remove(_snapshot_path(self.directory, old))
+            for old in _numbered(self.directory, SEGMENT):
+                if old < seq:
+                    os.remove(_segment_path(self.directory, old))
+            return seq
+
+    # ---------------- MAINTENANCE ----------------
+
+    def close(self):
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        self.journal.close()
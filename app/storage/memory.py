@@ -0,0 +1,1116 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+from contextlib import ExitStack
+from itertools import islice
+
+from app.storage.base import Repository, DuplicateKeyError, NotFoundError, CourseFullError, normalize_email, prefix_end
+from app.storage.search import CourseQuery, TERM_EXACT, TERM_PREFIX, CODE_EXACT, CODE_PREFIX, code_key, tokenize
+
+# Enrollment writes lock only their course's stripe, so a rush on one
+# popular section doesn't serialize enrollments everywhere else
+COURSE_LOCK_STRIPES = 64
+
+
+class Index:
+    """
+    Base for secondary indexes. `field` is a field name, or a tuple of names
+    for a composite key such as ("user_id", "course_id").
+    """
+
+    unique = False
+
+    def __init__(self, field, normalize=None):
+        self.field = field
+        self.normalize = normalize
+
+    def key(self, value):
+        return self.normalize(value) if self.normalize else value
+
+    def record_key(self, record):
+        if isinstance(self.field, tuple):
+            return self.key(tuple(record[f] for f in self.field))
+        return self.key(record[self.field])
+
+
+class UniqueIndex(Index):
+    """Hash index mapping one (normalized) key to a single record id."""
+
+    unique = True
+
+    def __init__(self, field, normalize=None):
+        super().__init__(field, normalize)
+        self._ids = {}
+
+    def lookup(self, value):
+        return self._ids.get(self.key(value))
+
+    def holder(self, record):
+        """Id of the record currently owning `record`'s key, if any."""
+        return self._ids.get(self.record_key(record))
+
+    def add(self, record):
+        self._ids[self.record_key(record)] = record["id"]
+
+    def discard(self, record):
+        key = self.record_key(record)
+        if self._ids.get(key) == record["id"]:
+            del self._ids[key]
+
+    def clear(self):
+        self._ids.clear()
+
+
+class SortedIndex(Index):
+    """
+    Multi index whose ids per key are kept in a sorted list rather than a
+    set, so a keyset page within one key seeks with bisect and membership
+    is a bisect too. Ids usually arrive in increasing order and append.
+    """
+
+    def __init__(self, field, normalize=None):
+        super().__init__(field, normalize)
+        self._ids = {}
+
+    def lookup(self, value):
+        return self._ids.get(self.key(value), [])
+
+    def count(self, value):
+        return len(self._ids.get(self.key(value), ()))
+
+    def counts(self):
+        """{key: number of records} over every key."""
+        return {key: len(ids) for key, ids in list(self._ids.items())}
+
+    def add(self, record):
+        ids = self._ids.setdefault(self.record_key(record), [])
+        if not ids or record["id"] > ids[-1]:
+            ids.append(record["id"])
+        else:
+            insort(ids, record["id"])
+
+    def discard(self, record):
+        key = self.record_key(record)
+        ids = self._ids.get(key)
+        if ids is not None:
+            pos = bisect_left(ids, record["id"])
+            if pos < len(ids) and ids[pos] == record["id"]:
+                del ids[pos]
+            if not ids:
+                del self._ids[key]
+
+    def clear(self):
+        self._ids.clear()
+
+
+class TokenIndex(Index):
+    """
+    Inverted index over a text field: each token (see search.tokenize)
+    maps to the set of ids of the records containing it, and the distinct
+    tokens are kept sorted so a prefix expands to its tokens with one
+    bisect. Sets rather than ordered dicts, so intersections cost the
+    smaller side.
+    """
+
+    def __init__(self, field, tokenize):
+        super().__init__(field)
+        self.tokenize = tokenize
+        self._ids = {}
+        self.tokens = []
+
+    def lookup(self, value):
+        return self._ids.get(value, frozenset())
+
+    def _with_prefix(self, prefix):
+        # islice tolerates the list moving under a concurrent write
+        for token in islice(self.tokens, bisect_left(self.tokens, prefix), None):
+            if not token.startswith(prefix):
+                return
+            yield self._ids.get(token, frozenset())
+
+    def count_prefix(self, prefix):
+        return sum(len(ids) for ids in self._with_prefix(prefix))
+
+    def lookup_prefix(self, prefix, within=None):
+        """Ids of the records with a token starting with `prefix`, limited to the set `within` if given."""
+        found = set()
+        for ids in self._with_prefix(prefix):
+            found |= ids if within is None else within & ids
+        return found
+
+    def add(self, record):
+        for token in set(self.tokenize(record[self.field])):
+            ids = self._ids.get(token)
+            if ids is None:
+                ids = self._ids[token] = set()
+                insort(self.tokens, token)
+            ids.add(record["id"])
+
+    def discard(self, record):
+        for token in set(self.tokenize(record[self.field])):
+            ids = self._ids.get(token)
+            if ids is not None:
+                ids.discard(record["id"])
+                if not ids:
+                    del self._ids[token]
+                    del self.tokens[bisect_left(self.tokens, token)]
+
+    def clear(self):
+        self._ids.clear()
+        self.tokens = []
+
+
+class PrefixIndex(Index):
+    """
+    Keys kept sorted (with their ids in a parallel list), so the records
+    whose key starts with a prefix are one contiguous slice. It has its own
+    lock because a reader must never see the two lists mid-insert.
+    """
+
+    def __init__(self, field, normalize=None):
+        super().__init__(field, normalize)
+        self._keys = []
+        self._ids = []
+        self._lock = threading.Lock()
+
+    def lookup(self, value):
+        key = self.key(value)
+        with self._lock:
+            return self._ids[bisect_left(self._keys, key):bisect_right(self._keys, key)]
+
+    def lookup_prefix(self, prefix):
+        if not prefix:
+            return []
+        # keys starting with `prefix` sort in [prefix, prefix_end(prefix))
+        end = prefix_end(prefix)
+        with self._lock:
+            stop = len(self._keys) if end is None else bisect_left(self._keys, end)
+            return self._ids[bisect_left(self._keys, prefix):stop]
+
+    def add(self, record):
+        key = self.record_key(record)
+        with self._lock:
+            pos = bisect_right(self._keys, key)
+            self._keys.insert(pos, key)
+            self._ids.insert(pos, record["id"])
+
+    def discard(self, record):
+        key = self.record_key(record)
+        with self._lock:
+            for pos in range(bisect_left(self._keys, key), bisect_right(self._keys, key)):
+                if self._ids[pos] == record["id"]:
+                    del self._keys[pos]
+                    del self._ids[pos]
+                    return
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._ids = []
+
+
+class Table:
+    """
+    id -> record mapping that keeps its secondary indexes in sync on
+    insert, update and delete, so lookups by indexed field are O(1)
+    (unique) or O(k) in the number of matches (multi).
+
+    Writes (including id allocation) are serialized by a per-table lock so
+    check-then-insert can't race under FastAPI's threadpool. Records are
+    never mutated in place (update swaps in a new dict), so reads stay
+    lock-free.
+
+    `order` is the sorted list of ids used to seek for keyset pagination.
+    Deletes leave their id behind (skipped on scan) until the list is
+    compacted, so deletes stay O(1) amortized.
+    """
+
+    def __init__(self, **indexes):
+        self.rows = {}
+        self.indexes = indexes
+        self.order = []
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    # ---------------- READS ----------------
+
+    def __contains__(self, record_id):
+        return record_id in self.rows
+
+    def __getitem__(self, record_id):
+        return self.rows[record_id]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def get(self, record_id, default=None):
+        return self.rows.get(record_id, default)
+
+    def values(self):
+        return self.rows.values()
+
+    def find(self, index, value):
+        record_id = self.indexes[index].lookup(value)
+        return None if record_id is None else self.rows.get(record_id)
+
+    def count(self, index, value):
+        return self.indexes[index].count(value)
+
+    def find_all(self, index, value, after=None, limit=None):
+        rows = self.rows
+        # tuple() snapshots the id set in one step, so a concurrent write can't
+        # change it mid-iteration
+        ids = tuple(self.indexes[index].lookup(value))
+        out = []
+        for i in ids:
+            if after is not None and i <= after:
+                continue
+            row = rows.get(i)
+            if row is not None:
+                out.append(row)
+                if len(out) == limit:
+                    break
+        return out
+
+    def scan(self, after=None, limit=None):
+        """
+        Rows with id > `after` in id order, at most `limit` of them. Seeks
+        with bisect, so a page costs O(log n + limit) rather than O(n).
+        """
+        rows = self.rows
+        if after is None and limit is None:
+            return list(rows.values())
+        order = self.order
+        out = []
+        for pos in range(0 if after is None else bisect_right(order, after), len(order)):
+            row = rows.get(order[pos])
+            if row is not None:
+                out.append(row)
+                if len(out) == limit:
+                    break
+        return out
+
+    # ---------------- WRITES ----------------
+
+    def _check_unique(self, record, exclude_id=None):
+        for name, index in self.indexes.items():
+            if not index.unique:
+                continue
+            existing = index.holder(record)
+            if existing is not None and existing != exclude_id:
+                raise DuplicateKeyError(name)
+
+    def _insert(self, record):
+        if record["id"] in self.rows:
+            raise DuplicateKeyError("id")
+        self._check_unique(record)
+        self.rows[record["id"]] = record
+        for index in self.indexes.values():
+            index.add(record)
+        if not self.order or record["id"] > self.order[-1]:
+            self.order.append(record["id"])
+        else:
+            insort(self.order, record["id"])
+        if record["id"] >= self.next_id:
+            self.next_id = record["id"] + 1
+        return record
+
+    def create(self, **fields):
+        """Allocate the next id and insert atomically. Raises DuplicateKeyError."""
+        with self.lock:
+            return self._insert({"id": self.next_id, **fields})
+
+    def create_many(self, rows):
+        """
+        create() for a batch under a single lock acquisition. Returns the
+        record or DuplicateKeyError for each row, in order.
+        """
+        out = []
+        with self.lock:
+            for fields in rows:
+                try:
+                    out.append(self._insert({"id": self.next_id, **fields}))
+                except DuplicateKeyError as e:
+                    out.append(e)
+        return out
+
+    def insert(self, record):
+        """Insert a record that already carries its id."""
+        with self.lock:
+            return self._insert(record)
+
+    def update(self, record_id, **changes):
+        with self.lock:
+            old = self.rows[record_id]
+            new = {**old, **changes, "id": record_id}
+            self._check_unique(new, exclude_id=record_id)
+            for index in self.indexes.values():
+                index.discard(old)
+            self.rows[record_id] = new
+            for index in self.indexes.values():
+                index.add(new)
+            return new
+
+    def _remove(self, record_id):
+        record = self.rows.pop(record_id)
+        for index in self.indexes.values():
+            index.discard(record)
+        return record
+
+    def _maybe_compact(self):
+        if len(self.order) > 2 * len(self.rows) + 1024:
+            # swap in a fresh list so concurrent scans keep their snapshot
+            self.order = [i for i in self.order if i in self.rows]
+
+    def delete(self, record_id):
+        with self.lock:
+            record = self._remove(record_id)
+            self._maybe_compact()
+            return record
+
+    def delete_many(self, record_ids):
+        """delete() for a batch under one lock; ids already gone are skipped."""
+        with self.lock:
+            records = [self._remove(i) for i in record_ids if i in self.rows]
+            self._maybe_compact()
+            return records
+
+    def clear(self):
+        with self.lock:
+            self.rows.clear()
+            for index in self.indexes.values():
+                index.clear()
+            self.order = []
+            self.next_id = 1
+
+    # ---------------- SNAPSHOTS ----------------
+
+    def dump_state(self):
+        """Plain-data copy of the rows; records are immutable, so a shallow copy is enough."""
+        with self.lock:
+            return {"rows": dict(self.rows), "order": list(self.order), "next_id": self.next_id}
+
+    def load_state(self, state):
+        """Replace the contents with a dump_state() copy, rebuilding the indexes."""
+        with self.lock:
+            self.rows = state["rows"]
+            self.order = state["order"]
+            self.next_id = state["next_id"]
+            for index in self.indexes.values():
+                index.clear()
+                for record in self.rows.values():
+                    index.add(record)
+
+
+class CountBuckets:
+    """
+    Counts that mostly move by one, grouped by value for ranking:
+    `buckets[n]` holds the keys whose count is n (n >= 1), sorted, and
+    `levels` the distinct counts, sorted. A +1/-1 moves a key to the
+    neighbouring bucket (a bisect and a memmove in each), and the top k
+    are the first keys of the highest levels, so reading them touches k
+    keys however many are tied.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.levels = []
+
+    def move(self, key, old, new):
+        if old:
+            bucket = self.buckets[old]
+            del bucket[bisect_left(bucket, key)]
+            if not bucket:
+                del self.buckets[old]
+                del self.levels[bisect_left(self.levels, old)]
+        if new:
+            bucket = self.buckets.get(new)
+            if bucket is None:
+                bucket = self.buckets[new] = []
+                insort(self.levels, new)
+            insort(bucket, key)
+
+    def top(self, k):
+        """Up to k (key, count) pairs, highest count first, ties by key."""
+        out = []
+        for level in reversed(self.levels):
+            if len(out) >= k:
+                break
+            out.extend((key, level) for key in self.buckets[level][:k - len(out)])
+        return out
+
+
+class EnrollmentStore:
+    """
+    Compact enrollment table: three parallel `array('q')` columns (id,
+    user_id, course_id) indexed by row number, so a row is 24 bytes of
+    column data instead of a dict plus its boxed ints. A deleted row's
+    number goes on a free-list and is reused by the next insert.
+
+    - `row_of` maps id to row (`row_of[id - 1]`, -1 once deleted). Ids
+      only grow, so it's dense and doubles as the id order for keyset
+      scans; it costs 8 bytes per id ever issued, deleted ones included.
+    - The user_id / course_id adjacency indexes map a key to an array of
+      row numbers in insertion (= id) order. The (user_id, course_id)
+      uniqueness check scans the user's rows, which stay short.
+
+    Records are materialized as dicts only when read, so callers see the
+    same interface as Table (find/count/find_all with the index names
+    "user_course", "user_id" and "course_id"). Every access holds the lock:
+    rows are reused in place, so unlike Table's immutable dicts a lock-free
+    read could see half of a recycled row.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.ids = array("q")
+        self.user_ids = array("q")
+        self.course_ids = array("q")
+        self.free = array("q")
+        self.row_of = array("q")
+        self.by_user = {}
+        self.by_course = {}
+        self.live = 0
+        self.next_id = 1
+        self._reset_counts()
+
+    def _reset_counts(self):
+        # maintained on every insert and remove, so stats reads are O(k)
+        self.course_counts = CountBuckets()
+        self.user_counts = Counter()  # k -> users holding exactly k enrollments (k >= 1)
+
+    # ---------------- ROWS ----------------
+
+    def _record(self, row):
+        return {"id": self.ids[row], "user_id": self.user_ids[row], "course_id": self.course_ids[row]}
+
+    def _row(self, record_id):
+        if 0 < record_id <= len(self.row_of):
+            row = self.row_of[record_id - 1]
+            if row >= 0:
+                return row
+        return None
+
+    def _pair_row(self, user_id, course_id):
+        course_ids = self.course_ids
+        for row in self.by_user.get(user_id, ()):
+            if course_ids[row] == course_id:
+                return row
+        return None
+
+    def _adjacent(self, index, value):
+        if index == "user_id":
+            return self.by_user.get(value, ())
+        if index == "course_id":
+            return self.by_course.get(value, ())
+        raise KeyError(index)
+
+    # ---------------- READS ----------------
+
+    def __contains__(self, record_id):
+        with self.lock:
+            return self._row(record_id) is not None
+
+    def __len__(self):
+        return self.live
+
+    def get(self, record_id, default=None):
+        with self.lock:
+            row = self._row(record_id)
+            return default if row is None else self._record(row)
+
+    def find(self, index, value):
+        if index != "user_course":
+            raise KeyError(index)
+        with self.lock:
+            row = self._pair_row(*value)
+            return None if row is None else self._record(row)
+
+    def count(self, index, value):
+        with self.lock:
+            return len(self._adjacent(index, value))
+
+    def find_ids(self, index, value):
+        with self.lock:
+            ids = self.ids
+            return [ids[row] for row in self._adjacent(index, value)]
+
+    def find_all(self, index, value, after=None, limit=None):
+        out = []
+        with self.lock:
+            rows = self._adjacent(index, value)
+            start = 0
+            if after is not None:
+                # adjacency rows are in id order, so seek like a scan
+                ids = self.ids
+                start = bisect_right(rows, after, key=lambda row: ids[row])
+            for row in rows[start:None if limit is None else start + limit]:
+                out.append(self._record(row))
+        return out
+
+    def scan(self, after=None, limit=None):
+        """Rows with id > `after` in id order, at most `limit` of them (see Table.scan)."""
+        out = []
+        with self.lock:
+            row_of = self.row_of
+            # row_of[i] holds id i + 1; deleted ids are skipped
+            for pos in range(0 if after is None else max(after, 0), len(row_of)):
+                row = row_of[pos]
+                if row >= 0:
+                    out.append(self._record(row))
+                    if len(out) == limit:
+                        break
+        return out
+
+    # ---------------- WRITES ----------------
+
+    def create(self, user_id, course_id):
+        """Allocate the next id and insert atomically. Raises DuplicateKeyError."""
+        with self.lock:
+            if self._pair_row(user_id, course_id) is not None:
+                raise DuplicateKeyError("user_course")
+            record_id = self.next_id
+            self.next_id += 1
+            if self.free:
+                row = self.free.pop()
+                self.ids[row] = record_id
+                self.user_ids[row] = user_id
+                self.course_ids[row] = course_id
+            else:
+                row = len(self.ids)
+                self.ids.append(record_id)
+                self.user_ids.append(user_id)
+                self.course_ids.append(course_id)
+            # ids only grow, so row_of and the adjacency lists stay in id order by appending
+            self.row_of.append(row)
+            user_rows = self.by_user.setdefault(user_id, array("q"))
+            user_rows.append(row)
+            course_rows = self.by_course.setdefault(course_id, array("q"))
+            course_rows.append(row)
+            self.live += 1
+            self._count_user(len(user_rows) - 1, len(user_rows))
+            self.course_counts.move(course_id, len(course_rows) - 1, len(course_rows))
+            return {"id": record_id, "user_id": user_id, "course_id": course_id}
+
+    def _remove(self, row):
+        record = self._record(row)
+        ids = self.ids
+        for adjacency, key in ((self.by_user, record["user_id"]), (self.by_course, record["course_id"])):
+            rows = adjacency[key]
+            # adjacency rows are in id order: binary search, then one memmove
+            del rows[bisect_left(rows, record["id"], key=lambda r: ids[r])]
+            if not rows:
+                del adjacency[key]
+        self._release(row, record)
+        held = len(self.by_user.get(record["user_id"], ()))
+        self._count_user(held + 1, held)
+        seats = len(self.by_course.get(record["course_id"], ()))
+        self.course_counts.move(record["course_id"], seats + 1, seats)
+        return record
+
+    def _release(self, row, record):
+        self.row_of[record["id"] - 1] = -1
+        self.free.append(row)
+        self.live -= 1
+
+    def _count_user(self, old, new):
+        counts = self.user_counts
+        if old:
+            counts[old] -= 1
+            if not counts[old]:
+                del counts[old]
+        if new:
+            counts[new] += 1
+
+    def counts(self, top):
+        """(top (course_id, enrolled) pairs, {k: users holding k enrollments})."""
+        with self.lock:
+            return self.course_counts.top(top), dict(self.user_counts)
+
+    def delete(self, record_id):
+        """Remove and return a record; KeyError if it doesn't exist."""
+        with self.lock:
+            row = self._row(record_id)
+            if row is None:
+                raise KeyError(record_id)
+            return self._remove(row)
+
+    def delete_many(self, record_ids):
+        """
+        delete() for a batch under one lock; ids already gone are skipped.
+        Each adjacency list the batch touches is rebuilt once, so the cost
+        is linear in the rows removed plus the lists they were on.
+        """
+        with self.lock:
+            rows = [row for row in map(self._row, dict.fromkeys(record_ids)) if row is not None]
+            records = [self._record(row) for row in rows]
+            dropped = set(rows)
+            for adjacency, column, recount in (
+                (self.by_user, self.user_ids, lambda key, old, new: self._count_user(old, new)),
+                (self.by_course, self.course_ids, self.course_counts.move),
+            ):
+                for key, removed in Counter(column[row] for row in rows).items():
+                    old = adjacency[key]
+                    if removed == len(old):
+                        del adjacency[key]
+                    else:
+                        adjacency[key] = array("q", (row for row in old if row not in dropped))
+                    recount(key, len(old), len(old) - removed)
+            for row, record in zip(rows, records):
+                self._release(row, record)
+            return records
+
+    def clear(self):
+        with self.lock:
+            self._reset()
+
+    # ---------------- SNAPSHOTS ----------------
+
+    ARRAYS = ("ids", "user_ids", "course_ids", "free", "row_of")
+
+    def dump_state(self):
+        """
+        The columns only: copying five arrays is a memcpy each, so readers
+        wait on the lock for milliseconds even at millions of rows. The
+        adjacency lists and counters are derived and rebuilt by load_state().
+        """
+        with self.lock:
+            state = {name: getattr(self, name)[:] for name in self.ARRAYS}
+            state["live"] = self.live
+            state["next_id"] = self.next_id
+            return state
+
+    def load_state(self, state):
+        with self.lock:
+            for name in (*self.ARRAYS, "live", "next_id"):
+                setattr(self, name, state[name])
+            # row_of is in id order, so appending keeps each adjacency list in id order too
+            self.by_user, self.by_course = {}, {}
+            user_ids, course_ids = self.user_ids, self.course_ids
+            for row in self.row_of:
+                if row >= 0:
+                    user_rows = self.by_user.get(user_ids[row])
+                    if user_rows is None:
+                        user_rows = self.by_user[user_ids[row]] = array("q")
+                    user_rows.append(row)
+                    course_rows = self.by_course.get(course_ids[row])
+                    if course_rows is None:
+                        course_rows = self.by_course[course_ids[row]] = array("q")
+                    course_rows.append(row)
+            self._reset_counts()
+            for user_rows in self.by_user.values():
+                self._count_user(0, len(user_rows))
+            for course_id, course_rows in self.by_course.items():
+                self.course_counts.move(course_id, 0, len(course_rows))
+
+
+class MemoryRepository(Repository):
+    """
+    In-process backend: one indexed Table per entity, except enrollments,
+    the big one, which live in a compact EnrollmentStore. Fast, but not
+    durable.
+
+    A course's taken seats are the size of its course_id adjacency set;
+    checking that count and inserting happen under the course's stripe lock,
+    which also guards its waitlist.
+    """
+
+    def __init__(self):
+        self.users = Table(
+            email=UniqueIndex("email", normalize=normalize_email),
+            email_order=PrefixIndex("email", normalize=normalize_email),
+            role=SortedIndex("role"),
+        )
+        self.courses = Table(
+            code=UniqueIndex("code"),
+            title_tokens=TokenIndex("title", tokenize),
+            code_prefix=PrefixIndex("code", normalize=code_key),
+        )
+        self.enrollments = EnrollmentStore()
+        self.waitlists = {}  # course_id -> deque of user ids
+        self.waitlisted = set()  # (user_id, course_id) pairs currently queued
+        self._course_locks = [threading.Lock() for _ in range(COURSE_LOCK_STRIPES)]
+        self._catalog_version = 0
+        self._catalog_lock = threading.Lock()
+
+    def _course_lock(self, course_id):
+        return self._course_locks[course_id % COURSE_LOCK_STRIPES]
+
+    def _has_seat(self, course):
+        capacity = course.get("capacity")
+        return capacity is None or self.enrollments.count("course_id", course["id"]) < capacity
+
+    # ---------------- USERS ----------------
+
+    def create_user(self, name, email, role):
+        return self.users.create(name=name, email=email, role=role)
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    def list_users(self, after=None, limit=None, role=None, email_prefix=None, name_contains=None):
+        if role is None and email_prefix is None and name_contains is None:
+            return self.users.scan(after, limit)
+        prefix = None if email_prefix is None else normalize_email(email_prefix)
+        needle = None if name_contains is None else name_contains.casefold()
+
+        def keep(user):
+            return (
+                (role is None or user["role"] == role)
+                and (prefix is None or normalize_email(user["email"]).startswith(prefix))
+                and (needle is None or needle in user["name"].casefold())
+            )
+
+        # drive from the narrower index (the role's sorted ids, or the ids
+        # in the email prefix range) and check the other filters per row;
+        # a name substring has no index, so alone it walks every id
+        by_role = None if role is None else self.users.indexes["role"].lookup(role)
+        by_email = None if prefix is None else self.users.indexes["email_order"].lookup_prefix(prefix)
+        rows = self.users.rows
+        if by_email is not None and (by_role is None or len(by_email) < len(by_role)):
+            return self._users_in_id_order(by_email, after, limit, keep)
+        ids = by_role if by_role is not None else self.users.order
+        out = []
+        for pos in range(0 if after is None else bisect_right(ids, after), len(ids)):
+            user = rows.get(ids[pos])
+            if user is not None and keep(user):
+                out.append(user)
+                if len(out) == limit:
+                    break
+        return out
+
+    def _users_in_id_order(self, ids, after, limit, keep):
+        # email order -> id order without sorting every match on every
+        # page: take the `batch` smallest ids past the cursor, doubling the
+        # batch while `keep` rejects too many of them to fill the page
+        rows = self.users.rows
+        out = []
+        batch = limit
+        while True:
+            if after is not None:
+                ids = [user_id for user_id in ids if user_id > after]
+            chunk = sorted(ids) if limit is None else heapq.nsmallest(batch, ids)
+            for user_id in chunk:
+                user = rows.get(user_id)
+                if user is not None and keep(user):
+                    out.append(user)
+                    if len(out) == limit:
+                        return out
+            if limit is None or len(chunk) < batch or not chunk:
+                return out
+            after, batch = chunk[-1], batch * 2
+
+    # ---------------- COURSES ----------------
+
+    def create_course(self, title, code, capacity=None):
+        course = self.courses.create(title=title, code=code, capacity=capacity)
+        self._bump_catalog()
+        return course
+
+    def catalog_version(self):
+        return self._catalog_version
+
+    def _bump_catalog(self):
+        # after the write, so a reader that sees the new version sees the change
+        with self._catalog_lock:
+            self._catalog_version += 1
+
+    def get_course(self, course_id):
+        return self.courses.get(course_id)
+
+    def update_course(self, course_id, **changes):
+        with self._course_lock(course_id):
+            if course_id not in self.courses:
+                raise NotFoundError("Course")
+            # the code index swaps old key for new under the table lock
+            course = self.courses.update(course_id, **changes)
+            # a raised capacity opens seats for the waitlist
+            self._promote(course_id)
+        self._bump_catalog()
+        return course
+
+    def delete_course(self, course_id):
+        with self._course_lock(course_id):
+            course = self.courses.get(course_id)
+            if course is None:
+                raise NotFoundError("Course")
+            self.courses.delete(course_id)
+            # cascade through the course_id adjacency list: linear in this
+            # course's enrollments (see delete_many), not a scan of every enrollment
+            self.enrollments.delete_many(self.enrollments.find_ids("course_id", course_id))
+            for user_id in self.waitlists.pop(course_id, ()):
+                self.waitlisted.discard((user_id, course_id))
+        self._bump_catalog()
+        return course
+
+    def list_courses(self, after=None, limit=None):
+        return self.courses.scan(after, limit)
+
+    def search_courses(self, text, after=None, limit=None):
+        query = CourseQuery(text)
+        if not query.terms:
+            return []
+        out = []
+        for score, ids in self._search_tiers(query):
+            if after is not None:
+                if score > after[0]:
+                    continue
+                if score == after[0]:
+                    ids = {course_id for course_id in ids if course_id > after[1]}
+            page = sorted(ids) if limit is None else heapq.nsmallest(limit - len(out), ids)
+            for course_id in page:
+                course = self.courses.get(course_id)
+                if course is not None:
+                    out.append({**course, "score": score})
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def _search_tiers(self, query):
+        """
+        The matching course ids grouped by score, best first. Built from
+        set operations on the course indexes, so no title is re-read and
+        a page only sorts the tiers it reaches.
+        """
+        codes = self.courses.indexes["code_prefix"]
+        words = self.courses.indexes["title_tokens"]
+        exact_code = set(codes.lookup(query.code))
+        code_prefix = set(codes.lookup_prefix(query.code)).difference(exact_code)
+
+        # every term must start a title word; start from the rarest term
+        # and only keep its ids as the others are applied
+        matched = None
+        for term in sorted(query.terms, key=words.count_prefix):
+            matched = words.lookup_prefix(term, within=matched)
+            if not matched:
+                break
+        title_tiers = {}
+        if matched:
+            whole = Counter()
+            for term in query.terms:
+                whole.update(matched & words.lookup(term))
+            base = TERM_PREFIX * len(query.terms)
+            title_tiers[base] = matched.difference(whole)
+            for course_id, n in whole.items():
+                title_tiers.setdefault(base + n * (TERM_EXACT - TERM_PREFIX), set()).add(course_id)
+
+        tiers = {}
+        for code_score, code_ids in ((CODE_EXACT, exact_code), (CODE_PREFIX, code_prefix)):
+            tiers.setdefault(code_score, set()).update(code_ids.difference(matched))
+            for title_score, title_ids in title_tiers.items():
+                tiers.setdefault(code_score + title_score, set()).update(code_ids & title_ids)
+        for title_score, title_ids in title_tiers.items():
+            tiers.setdefault(title_score, set()).update(title_ids - exact_code - code_prefix)
+        return sorted(((score, ids) for score, ids in tiers.items() if ids), key=lambda tier: tier[0], reverse=True)
+
+    # ---------------- ENROLLMENTS ----------------
+
+    def create_enrollment(self, user_id, course_id, waitlist=True):
+        if user_id not in self.users:
+            raise NotFoundError("User")
+        with self._course_lock(course_id):
+            return self._enroll(user_id, course_id, waitlist)
+
+    def _enroll(self, user_id, course_id, waitlist):
+        # caller holds the course's stripe lock
+        course = self.courses.get(course_id)
+        if course is None:
+            raise NotFoundError("Course")
+        if self.enrollments.find("user_course", (user_id, course_id)) is not None:
+            raise DuplicateKeyError("user_course")
+        if not self._has_seat(course):
+            if not waitlist:
+                raise CourseFullError()
+            if (user_id, course_id) in self.waitlisted:
+                raise DuplicateKeyError("waitlist")
+            queue = self.waitlists.setdefault(course_id, deque())
+            queue.append(user_id)
+            self.waitlisted.add((user_id, course_id))
+            raise CourseFullError(position=len(queue))
+        return self.enrollments.create(user_id=user_id, course_id=course_id)
+
+    def enroll_in_courses(self, user_id, course_ids):
+        if user_id not in self.users:
+            raise NotFoundError("User")
+        with ExitStack() as stack:
+            # every involved stripe, in stripe order so two batches can't
+            # deadlock; held across check and apply, so no seat or course
+            # changes in between
+            for stripe in sorted({course_id % COURSE_LOCK_STRIPES for course_id in course_ids}):
+                stack.enter_context(self._course_locks[stripe])
+            errors = []
+            seen = set()
+            for course_id in course_ids:
+                course = self.courses.get(course_id)
+                if course is None:
+                    errors.append(NotFoundError("Course"))
+                elif course_id in seen or self.enrollments.find("user_course", (user_id, course_id)) is not None:
+                    errors.append(DuplicateKeyError("user_course"))
+                elif not self._has_seat(course):
+                    errors.append(CourseFullError())
+                else:
+                    errors.append(None)
+                seen.add(course_id)
+            if any(errors):
+                return errors
+            return [self.enrollments.create(user_id=user_id, course_id=course_id) for course_id in course_ids]
+
+    def _promote(self, course_id):
+        # caller holds the course's stripe lock
+        queue = self.waitlists.get(course_id)
+        course = self.courses.get(course_id)
+        while queue and course is not None and self._has_seat(course):
+            user_id = queue.popleft()
+            self.waitlisted.discard((user_id, course_id))
+            if user_id not in self.users:
+                continue
+            try:
+                self.enrollments.create(user_id=user_id, course_id=course_id)
+            except DuplicateKeyError:
+                continue
+        if queue is not None and not queue:
+            del self.waitlists[course_id]
+
+    def get_waitlist(self, course_id):
+        with self._course_lock(course_id):
+            return list(self.waitlists.get(course_id, ()))
+
+    def get_enrollment(self, enrollment_id):
+        return self.enrollments.get(enrollment_id)
+
+    def list_enrollments(self, user_id=None, after=None, limit=None):
+        if user_id is None:
+            return self.enrollments.scan(after, limit)
+        return self.enrollments.find_all("user_id", user_id, after, limit)
+
+    def list_roster(self, course_id, after=None, limit=None):
+        entries = []
+        for enrollment in self.enrollments.find_all("course_id", course_id):
+            user = self.users.get(enrollment["user_id"])
+            if user is None:
+                continue
+            key = (user["name"], user["id"])
+            if after is None or key > after:
+                entries.append((key, enrollment["id"], user["email"]))
+        # a page only needs its `limit` smallest keys, not a full sort
+        entries = sorted(entries) if limit is None else heapq.nsmallest(limit, entries)
+        return [
+            {"user_id": user_id, "name": name, "email": email, "enrollment_id": enrollment_id}
+            for (name, user_id), enrollment_id, email in entries
+        ]
+
+    def delete_enrollment(self, enrollment_id):
+        enrollment = self.enrollments.get(enrollment_id)
+        if enrollment is None:
+            raise NotFoundError("Enrollment")
+        with self._course_lock(enrollment["course_id"]):
+            try:
+                record = self.enrollments.delete(enrollment_id)
+            except KeyError:
+                raise NotFoundError("Enrollment")
+            self._promote(record["course_id"])
+        return record
+
+    # ---------------- BULK ----------------
+
+    def create_users(self, rows):
+        return self.users.create_many(
+            {"name": row["name"], "email": row["email"], "role": row["role"]} for row in rows
+        )
+
+    def create_courses(self, rows):
+        created = self.courses.create_many(
+            {"title": row["title"], "code": row["code"], "capacity": row.get("capacity")} for row in rows
+        )
+        self._bump_catalog()
+        return created
+
+    def create_enrollments(self, rows):
+        # group by course so each course's stripe lock is taken once per batch
+        out = [None] * len(rows)
+        by_course = {}
+        for pos, row in enumerate(rows):
+            if row["user_id"] not in self.users:
+                out[pos] = NotFoundError("User")
+            else:
+                by_course.setdefault(row["course_id"], []).append(pos)
+        for course_id, positions in by_course.items():
+            with self._course_lock(course_id):
+                for pos in positions:
+                    try:
+                        out[pos] = self._enroll(rows[pos]["user_id"], course_id, waitlist=False)
+                    except (DuplicateKeyError, NotFoundError, CourseFullError) as e:
+                        out[pos] = e
+        return out
+
+    # ---------------- STATS ----------------
+
+    def enrollment_stats(self, top=10):
+        top_courses, per_user = self.enrollments.counts(top)
+        users = len(self.users)
+        per_user[0] = max(0, users - sum(per_user.values()))
+        ranked = []
+        for course_id, enrolled in top_courses:
+            course = self.courses.get(course_id)
+            if course is not None:
+                ranked.append({"id": course_id, "code": course["code"], "title": course["title"], "enrolled": enrolled})
+        return {
+            "users": {"total": users, "by_role": self.users.indexes["role"].counts()},
+            "courses": len(self.courses),
+            "enrollments": len(self.enrollments),
+            "courses_per_user": {k: n for k, n in sorted(per_user.items()) if n},
+            "top_courses": ranked,
+        }
+
+    # ---------------- ASYNC ----------------
+
+    async def run_async(self, method, *args, **kwargs):
+        # Every method here is a few dict operations with no I/O, so it runs
+        # inline on the event loop: no thread hop, no threadpool slot. None of
+        # them awaits, so coroutines can't interleave inside a critical
+        # section; the threading locks only matter for callers on other
+        # threads and are uncontended on the loop.
+        return method(*args, **kwargs)
+
+    # ---------------- SNAPSHOTS ----------------
+
+    def dump_state(self):
+        """
+        Everything the repository holds, as plain picklable data. Callers
+        must keep writers out while it runs (JournaledRepository holds its
+        write lock) so the tables are copied at one point in time.
+        """
+        return {
+            "users": self.users.dump_state(),
+            "courses": self.courses.dump_state(),
+            "enrollments": self.enrollments.dump_state(),
+            "waitlists": {course_id: list(queue) for course_id, queue in self.waitlists.items()},
+            "catalog_version": self._catalog_version,
+        }
+
+    def load_state(self, state):
+        self.users.load_state(state["users"])
+        self.courses.load_state(state["courses"])
+        self.enrollments.load_state(state["enrollments"])
+        self.waitlists = {course_id: deque(queue) for course_id, queue in state["waitlists"].items()}
+        self.waitlisted = {(user_id, course_id) for course_id, queue in self.waitlists.items() for user_id in queue}
+        with self._catalog_lock:
+            self._catalog_version = state["catalog_version"]
+
+    # ---------------- MAINTENANCE ----------------
+
+    def clear(self):
+        self.users.clear()
+        self.courses.clear()
+        self.enrollments.clear()
+        self.waitlists.clear()
+        self.waitlisted.clear()
+        self._bump_catalog()
@@ -0,0 +1,55 @@
+import re
+from functools import lru_cache
+
+TOKEN = re.compile(r"[^\W_]+")
+
+# Ranking weights: a code match outranks any title match, and a term that
+# is a whole title word outranks one that only starts a word
+CODE_EXACT = 100
+CODE_PREFIX = 50
+TERM_EXACT = 10
+TERM_PREFIX = 5
+
+
+def tokenize(text):
+    """Casefolded alphanumeric runs: "Intro to Bio-Chem" -> ["intro", "to", "bio", "chem"]."""
+    return TOKEN.findall(text.casefold())
+
+
+def code_key(code):
+    # "cs-101", "CS 101" and "CS101" all search the same
+    return "".join(tokenize(code))
+
+
+class CourseQuery:
+    """
+    A parsed catalog search. A course matches when its code starts with
+    the query (ignoring case, spaces and punctuation) or when every query
+    term starts some word of its title; score() ranks the match.
+    """
+
+    def __init__(self, text):
+        self.terms = list(dict.fromkeys(tokenize(text)))
+        self.code = "".join(self.terms)
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def parse(cls, text):
+        return cls(text)
+
+    def score(self, title, code):
+        """Rank of a course for this query; 0 if it doesn't match."""
+        if not self.terms:
+            return 0
+        key = code_key(code)
+        score = CODE_EXACT if key == self.code else CODE_PREFIX if key.startswith(self.code) else 0
+        words = tokenize(title)
+        title_score = 0
+        for term in self.terms:
+            if term in words:
+                title_score += TERM_EXACT
+            elif any(word.startswith(term) for word in words):
+                title_score += TERM_PREFIX
+            else:
+                return score
+        return score + title_score
@@ -0,0 +1,692 @@
+import asyncio
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from app.storage.base import Repository, DuplicateKeyError, NotFoundError, CourseFullError, normalize_email, prefix_end
+from app.storage.search import CourseQuery, CODE_EXACT, CODE_PREFIX, TERM_EXACT, TERM_PREFIX, code_key, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL,
+    role TEXT NOT NULL,
+    enrolled INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email_key);
+CREATE INDEX IF NOT EXISTS users_role ON users (role, id);
+
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    code TEXT NOT NULL,
+    capacity INTEGER,
+    enrolled INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS courses_code ON courses (code);
+
+CREATE TABLE IF NOT EXISTS enrollments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    course_id INTEGER NOT NULL REFERENCES courses (id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS enrollments_user_course ON enrollments (user_id, course_id);
+CREATE INDEX IF NOT EXISTS enrollments_course ON enrollments (course_id);
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    course_id INTEGER NOT NULL REFERENCES courses (id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS waitlist_user_course ON waitlist (user_id, course_id);
+CREATE INDEX IF NOT EXISTS waitlist_course ON waitlist (course_id, id);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('catalog_version', 0);
+"""
+
+# Columns added after the first release; ALTERed into older database files
+# on open. `enrolled` is each course's seat counter, and each user's
+# enrollment count (kept by the STATS triggers).
+ADDED_COLUMNS = [
+    ("courses", "capacity", "INTEGER", None),
+    (
+        "courses",
+        "enrolled",
+        "INTEGER NOT NULL DEFAULT 0",
+        "UPDATE courses SET enrolled = (SELECT COUNT(*) FROM enrollments WHERE course_id = courses.id)",
+    ),
+    (
+        "users",
+        "enrolled",
+        "INTEGER NOT NULL DEFAULT 0",
+        "UPDATE users SET enrolled = (SELECT COUNT(*) FROM enrollments WHERE user_id = users.id)",
+    ),
+]
+
+
+def _bump(name, delta):
+    return (
+        f"INSERT INTO counters (name, value) VALUES ({name}, {delta})"
+        f" ON CONFLICT (name) DO UPDATE SET value = value + ({delta});"
+    )
+
+
+# Aggregates for enrollment_stats(), kept in `counters` by triggers so every
+# write path (and every process sharing the file) updates them:
+#   users:<role>  users per role       per_user:<k>  users holding k enrollments
+#   courses       number of courses    enrollments   number of enrollments
+# Created after migration (they need users.enrolled); STATS_BACKFILL fills
+# the counters from the tables when the triggers are first installed.
+STATS = [
+    "CREATE INDEX IF NOT EXISTS courses_enrolled ON courses (enrolled DESC, id)",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_user_insert AFTER INSERT ON users BEGIN
+        {_bump("'users:' || NEW.role", 1)}
+        {_bump("'per_user:' || NEW.enrolled", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_user_delete AFTER DELETE ON users BEGIN
+        {_bump("'users:' || OLD.role", -1)}
+        {_bump("'per_user:' || OLD.enrolled", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_user_enrolled AFTER UPDATE OF enrolled ON users BEGIN
+        {_bump("'per_user:' || OLD.enrolled", -1)}
+        {_bump("'per_user:' || NEW.enrolled", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_course_insert AFTER INSERT ON courses BEGIN
+        {_bump("'courses'", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_course_delete AFTER DELETE ON courses BEGIN
+        {_bump("'courses'", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_enrollment_insert AFTER INSERT ON enrollments BEGIN
+        UPDATE users SET enrolled = enrolled + 1 WHERE id = NEW.user_id;
+        {_bump("'enrollments'", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_enrollment_delete AFTER DELETE ON enrollments BEGIN
+        UPDATE users SET enrolled = enrolled - 1 WHERE id = OLD.user_id;
+        {_bump("'enrollments'", -1)}
+    END""",
+]
+STATS_BACKFILL = [
+    "DELETE FROM counters WHERE name != 'catalog_version'",
+    "INSERT INTO counters (name, value) SELECT 'users:' || role, COUNT(*) FROM users GROUP BY role",
+    "INSERT INTO counters (name, value) SELECT 'per_user:' || enrolled, COUNT(*) FROM users GROUP BY enrolled",
+    "INSERT INTO counters (name, value) VALUES ('courses', (SELECT COUNT(*) FROM courses))",
+    "INSERT INTO counters (name, value) VALUES ('enrollments', (SELECT COUNT(*) FROM enrollments))",
+]
+
+# Catalog search index: a row per distinct title word (kind TITLE_WORD)
+# and one for the code key (kind CODE_KEY) of every course, written in the
+# course's own transaction. A search is then a few range seeks on the
+# primary key instead of a pass over the table. _migrate fills it for
+# database files from before it existed.
+TITLE_WORD, CODE_KEY = 0, 1
+TERM_COUNT_CAP = 1000
+SEARCH_INDEX = [
+    """CREATE TABLE IF NOT EXISTS course_tokens (
+        kind INTEGER NOT NULL,
+        token TEXT NOT NULL,
+        course_id INTEGER NOT NULL REFERENCES courses (id),
+        PRIMARY KEY (kind, token, course_id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS course_tokens_course ON course_tokens (course_id, kind, token)",
+]
+
+# SQLite reports unique violations as "UNIQUE constraint failed: <columns>";
+# map those columns back to the index names the memory backend uses
+UNIQUE_COLUMNS = {
+    "users.email_key": "email",
+    "courses.code": "code",
+    "enrollments.user_id, enrollments.course_id": "user_course",
+    "waitlist.user_id, waitlist.course_id": "waitlist",
+}
+
+USER_COLUMNS = "id, name, email, role"
+COURSE_COLUMNS = "id, title, code, capacity"
+COURSE_FIELDS = ("title", "code", "capacity")
+ENROLLMENT_COLUMNS = "id, user_id, course_id"
+
+
+class _Connection(sqlite3.Connection):
+    # plain sqlite3.Connection can't be weakly referenced; the pool needs that
+    pass
+
+
+def _page(after, limit):
+    # keyset pagination parameters: "id > ?" with 0 matching everything and
+    # "LIMIT -1" meaning no limit
+    return (0 if after is None else after, -1 if limit is None else limit)
+
+
+def _prefix_range(kind, prefix, params):
+    """SQL matching course_tokens rows of `kind` starting with `prefix`; appends its parameters."""
+    params += [kind, prefix]
+    end = prefix_end(prefix)
+    if end is None:
+        return "kind = ? AND token >= ?"
+    params.append(end)
+    return "kind = ? AND token >= ? AND token < ?"
+
+
+def _duplicate(error):
+    columns = str(error).partition("UNIQUE constraint failed: ")[2]
+    return DuplicateKeyError(UNIQUE_COLUMNS.get(columns, columns or "unknown"))
+
+
+class SQLiteRepository(Repository):
+    """
+    SQLite backend in WAL mode, so readers never block the writer and several
+    uvicorn worker processes can share one database file.
+
+    Connections are pooled per thread (sqlite3 connections must not be used
+    from two threads at once); a thread's connection is closed when the
+    thread exits. sqlite3 caches prepared statements per connection keyed by
+    SQL text, so every query below is a constant string with placeholders.
+
+    Async callers are served by a dedicated pool of `async_threads` threads,
+    each with its own connection, so database waits never tie up the event
+    loop or the shared anyio threadpool.
+    """
+
+    def __init__(self, path, timeout=30.0, async_threads=8):
+        if path == ":memory:":
+            raise ValueError("SQLiteRepository needs a file path; each connection would get its own :memory: db")
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._pool_lock = threading.Lock()
+        self.async_threads = async_threads
+        self._executor = None
+        self._connect().executescript(SCHEMA)
+        self._migrate()
+
+    # ---------------- CONNECTIONS ----------------
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,  # autocommit; multi-statement writes use _transaction
+                check_same_thread=False,  # only so close() can run from another thread
+                cached_statements=256,
+                factory=_Connection,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.create_function("casefold", 1, str.casefold, deterministic=True)
+            self._local.conn = conn
+            with self._pool_lock:
+                self._connections.add(conn)
+        return conn
+
+    def _migrate(self):
+        with self._transaction() as conn:
+            for table, column, ddl, backfill in ADDED_COLUMNS:
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+                    if backfill:
+                        conn.execute(backfill)
+            installed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'stats_user_insert'"
+            ).fetchone()
+            for statement in STATS:
+                conn.execute(statement)
+            if installed is None:
+                for statement in STATS_BACKFILL:
+                    conn.execute(statement)
+            indexed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'course_tokens'"
+            ).fetchone()
+            for statement in SEARCH_INDEX:
+                conn.execute(statement)
+            if indexed is None:
+                for row in conn.execute("SELECT id, title, code FROM courses").fetchall():
+                    self._index_course(conn, row["id"], row["title"], row["code"])
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so check-then-insert can't
+        # interleave with another writer (thread or process)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _one(self, sql, params):
+        row = self._connect().execute(sql, params).fetchone()
+        return None if row is None else dict(row)
+
+    def _all(self, sql, params=()):
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    # ---------------- USERS ----------------
+
+    def create_user(self, name, email, role):
+        try:
+            cur = self._connect().execute(
+                "INSERT INTO users (name, email, email_key, role) VALUES (?, ?, ?, ?)",
+                (name, email, normalize_email(email), role),
+            )
+        except sqlite3.IntegrityError as e:
+            raise _duplicate(e)
+        return {"id": cur.lastrowid, "name": name, "email": email, "role": role}
+
+    def get_user(self, user_id):
+        return self._one(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,))
+
+    def list_users(self, after=None, limit=None, role=None, email_prefix=None, name_contains=None):
+        # users_role and users_email_key serve the first two filters; the
+        # planner picks whichever it estimates narrower
+        after, limit = _page(after, limit)
+        where, params = ["id > ?"], [after]
+        if role is not None:
+            where.append("role = ?")
+            params.append(role)
+        if email_prefix is not None:
+            prefix = normalize_email(email_prefix)
+            where.append("email_key >= ?")
+            params.append(prefix)
+            end = prefix_end(prefix)
+            if end is not None:
+                where.append("email_key < ?")
+                params.append(end)
+        if name_contains is not None:
+            where.append("instr(casefold(name), ?) > 0")
+            params.append(name_contains.casefold())
+        return self._all(
+            f"SELECT {USER_COLUMNS} FROM users WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+            (*params, limit),
+        )
+
+    # ---------------- COURSES ----------------
+
+    def create_course(self, title, code, capacity=None):
+        try:
+            with self._transaction() as conn:
+                cur = conn.execute(
+                    "INSERT INTO courses (title, code, capacity) VALUES (?, ?, ?)", (title, code, capacity)
+                )
+                self._index_course(conn, cur.lastrowid, title, code)
+                self._bump_catalog(conn)
+        except sqlite3.IntegrityError as e:
+            raise _duplicate(e)
+        return {"id": cur.lastrowid, "title": title, "code": code, "capacity": capacity}
+
+    def get_course(self, course_id):
+        return self._one(f"SELECT {COURSE_COLUMNS} FROM courses WHERE id = ?", (course_id,))
+
+    def list_courses(self, after=None, limit=None):
+        return self._all(
+            f"SELECT {COURSE_COLUMNS} FROM courses WHERE id > ? ORDER BY id LIMIT ?", _page(after, limit)
+        )
+
+    def search_courses(self, text, after=None, limit=None):
+        # matches and scores both come from course_tokens: the code key's
+        # prefix range, and the rarest term's prefix range with every other
+        # term probed per course through course_tokens_course, so a title
+        # matches only when each term starts one of its words. The SQL text
+        # only varies with the number of terms, so it's still cached.
+        query = CourseQuery.parse(text)
+        if not query.terms:
+            return []
+        conn = self._connect()
+        params = [query.code]
+        hits = [
+            f"SELECT course_id, CASE WHEN token = ? THEN {CODE_EXACT} ELSE {CODE_PREFIX} END AS score"
+            f" FROM course_tokens WHERE {_prefix_range(CODE_KEY, query.code, params)}"
+        ]
+        terms = query.terms
+        if len(terms) > 1:
+            terms = sorted(terms, key=lambda term: self._term_frequency(conn, term))
+        first, *others = terms
+        term_score = f"MAX(CASE WHEN token = ? THEN {TERM_EXACT} ELSE {TERM_PREFIX} END)"
+        probes = []
+        for term in others:
+            params.append(term)
+            probes.append(
+                f" + (SELECT {term_score} FROM course_tokens"
+                f" WHERE course_id = t.course_id AND {_prefix_range(TITLE_WORD, term, params)})"
+            )
+        params.append(first)
+        # a term with no matching word makes its probe, and so the row's
+        # score, NULL; HAVING below drops courses left with no score
+        hits.append(
+            f"SELECT course_id, score{''.join(probes)} AS score FROM"
+            f" (SELECT course_id, {term_score} AS score FROM course_tokens"
+            f" WHERE {_prefix_range(TITLE_WORD, first, params)} GROUP BY course_id) t"
+        )
+
+        score, course_id = (None, 0) if after is None else after
+        return [dict(row) for row in conn.execute(
+            f"SELECT c.id, c.title, c.code, c.capacity, m.score FROM"
+            f" (SELECT course_id, SUM(score) AS score FROM ({' UNION ALL '.join(hits)})"
+            " GROUP BY course_id HAVING SUM(score) IS NOT NULL) m"
+            " JOIN courses c ON c.id = m.course_id"
+            " WHERE ? IS NULL OR m.score < ? OR (m.score = ? AND c.id > ?)"
+            " ORDER BY m.score DESC, c.id LIMIT ?",
+            (*params, score, score, score, course_id, -1 if limit is None else limit),
+        )]
+
+    def _term_frequency(self, conn, term):
+        # title words starting with `term`, counted up to TERM_COUNT_CAP: enough to pick the rarest term
+        params = []
+        where = _prefix_range(TITLE_WORD, term, params)
+        return conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM course_tokens WHERE {where} LIMIT ?)", (*params, TERM_COUNT_CAP)
+        ).fetchone()[0]
+
+    def _index_course(self, conn, course_id, title, code):
+        rows = [(TITLE_WORD, word, course_id) for word in set(tokenize(title))]
+        key = code_key(code)
+        if key:
+            rows.append((CODE_KEY, key, course_id))
+        conn.executemany("INSERT INTO course_tokens (kind, token, course_id) VALUES (?, ?, ?)", rows)
+
+    def update_course(self, course_id, **changes):
+        columns = [c for c in COURSE_FIELDS if c in changes]
+        try:
+            with self._transaction() as conn:
+                if columns:
+                    # one UPDATE, so the unique code index moves old key to new atomically
+                    assignments = ", ".join(f"{c} = ?" for c in columns)
+                    conn.execute(
+                        f"UPDATE courses SET {assignments} WHERE id = ?",
+                        (*(changes[c] for c in columns), course_id),
+                    )
+                row = conn.execute(f"SELECT {COURSE_COLUMNS} FROM courses WHERE id = ?", (course_id,)).fetchone()
+                if row is None:
+                    raise NotFoundError("Course")
+                if "title" in columns or "code" in columns:
+                    conn.execute("DELETE FROM course_tokens WHERE course_id = ?", (course_id,))
+                    self._index_course(conn, course_id, row["title"], row["code"])
+                # a raised capacity opens seats for the waitlist
+                self._promote(conn, course_id)
+                self._bump_catalog(conn)
+        except sqlite3.IntegrityError as e:
+            raise _duplicate(e)
+        return dict(row)
+
+    def delete_course(self, course_id):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT {COURSE_COLUMNS} FROM courses WHERE id = ?", (course_id,)).fetchone()
+            if row is None:
+                raise NotFoundError("Course")
+            # the cascades all seek on a course_id index
+            conn.execute("DELETE FROM waitlist WHERE course_id = ?", (course_id,))
+            conn.execute("DELETE FROM enrollments WHERE course_id = ?", (course_id,))
+            conn.execute("DELETE FROM course_tokens WHERE course_id = ?", (course_id,))
+            conn.execute("DELETE FROM courses WHERE id = ?", (course_id,))
+            self._bump_catalog(conn)
+        return dict(row)
+
+    def catalog_version(self):
+        # kept in the database so every worker process sees the same version
+        return self._connect().execute("SELECT value FROM counters WHERE name = 'catalog_version'").fetchone()[0]
+
+    def _bump_catalog(self, conn):
+        # same transaction as the course write: the new version is visible
+        # exactly when the change is
+        conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'catalog_version'")
+
+    # ---------------- ENROLLMENTS ----------------
+
+    def create_enrollment(self, user_id, course_id, waitlist=True):
+        with self._transaction() as conn:
+            outcome = self._enroll(conn, user_id, course_id, waitlist)
+        # raised after COMMIT so a waitlist entry is kept
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _enroll(self, conn, user_id, course_id, waitlist):
+        """
+        One enrollment inside the caller's transaction. Returns the record
+        or the error; no statement runs unless all earlier checks pass, so
+        a failure leaves nothing behind in a shared bulk transaction.
+        """
+        if conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is None:
+            return NotFoundError("User")
+        if conn.execute("SELECT 1 FROM courses WHERE id = ?", (course_id,)).fetchone() is None:
+            return NotFoundError("Course")
+        if conn.execute(
+            "SELECT 1 FROM enrollments WHERE user_id = ? AND course_id = ?", (user_id, course_id)
+        ).fetchone() is not None:
+            return DuplicateKeyError("user_course")
+        # the conditional increment is the seat reservation
+        reserved = conn.execute(
+            "UPDATE courses SET enrolled = enrolled + 1 WHERE id = ? AND (capacity IS NULL OR enrolled < capacity)",
+            (course_id,),
+        ).rowcount
+        if not reserved:
+            if not waitlist:
+                return CourseFullError()
+            try:
+                cur = conn.execute("INSERT INTO waitlist (user_id, course_id) VALUES (?, ?)", (user_id, course_id))
+            except sqlite3.IntegrityError as e:
+                return _duplicate(e)
+            position = conn.execute(
+                "SELECT COUNT(*) FROM waitlist WHERE course_id = ? AND id <= ?", (course_id, cur.lastrowid)
+            ).fetchone()[0]
+            return CourseFullError(position=position)
+        cur = conn.execute("INSERT INTO enrollments (user_id, course_id) VALUES (?, ?)", (user_id, course_id))
+        return {"id": cur.lastrowid, "user_id": user_id, "course_id": course_id}
+
+    def enroll_in_courses(self, user_id, course_ids):
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is None:
+                raise NotFoundError("User")
+            conn.execute("SAVEPOINT batch")
+            outcomes = [self._enroll(conn, user_id, course_id, waitlist=False) for course_id in course_ids]
+            if any(isinstance(outcome, Exception) for outcome in outcomes):
+                # every course was tried, so each failure is reported; undo the rest
+                conn.execute("ROLLBACK TO batch")
+                return [outcome if isinstance(outcome, Exception) else None for outcome in outcomes]
+            return outcomes
+
+    def _promote(self, conn, course_id):
+        while True:
+            head = conn.execute(
+                "SELECT id, user_id FROM waitlist WHERE course_id = ? ORDER BY id LIMIT 1", (course_id,)
+            ).fetchone()
+            if head is None:
+                return
+            reserved = conn.execute(
+                "UPDATE courses SET enrolled = enrolled + 1 WHERE id = ? AND (capacity IS NULL OR enrolled < capacity)",
+                (course_id,),
+            ).rowcount
+            if not reserved:
+                return
+            conn.execute("DELETE FROM waitlist WHERE id = ?", (head["id"],))
+            try:
+                conn.execute(
+                    "INSERT INTO enrollments (user_id, course_id) VALUES (?, ?)", (head["user_id"], course_id)
+                )
+            except sqlite3.IntegrityError:
+                # already enrolled some other way; give the seat to the next in line
+                conn.execute("UPDATE courses SET enrolled = enrolled - 1 WHERE id = ?", (course_id,))
+
+    def get_waitlist(self, course_id):
+        return [
+            row["user_id"]
+            for row in self._connect().execute(
+                "SELECT user_id FROM waitlist WHERE course_id = ? ORDER BY id", (course_id,)
+            )
+        ]
+
+    def get_enrollment(self, enrollment_id):
+        return self._one(f"SELECT {ENROLLMENT_COLUMNS} FROM enrollments WHERE id = ?", (enrollment_id,))
+
+    def list_enrollments(self, user_id=None, after=None, limit=None):
+        if user_id is None:
+            return self._all(
+                f"SELECT {ENROLLMENT_COLUMNS} FROM enrollments WHERE id > ? ORDER BY id LIMIT ?",
+                _page(after, limit),
+            )
+        return self._all(
+            f"SELECT {ENROLLMENT_COLUMNS} FROM enrollments WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (user_id, *_page(after, limit)),
+        )
+
+    def list_roster(self, course_id, after=None, limit=None):
+        # enrollments_course finds the roster; the sort is over that alone
+        name, user_id = ("", 0) if after is None else after
+        return self._all(
+            "SELECT u.id AS user_id, u.name, u.email, e.id AS enrollment_id"
+            " FROM enrollments e JOIN users u ON u.id = e.user_id"
+            " WHERE e.course_id = ? AND (u.name, u.id) > (?, ?)"
+            " ORDER BY u.name, u.id LIMIT ?",
+            (course_id, name, user_id, -1 if limit is None else limit),
+        )
+
+    def delete_enrollment(self, enrollment_id):
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"SELECT {ENROLLMENT_COLUMNS} FROM enrollments WHERE id = ?", (enrollment_id,)
+            ).fetchone()
+            if row is None:
+                raise NotFoundError("Enrollment")
+            conn.execute("DELETE FROM enrollments WHERE id = ?", (enrollment_id,))
+            conn.execute("UPDATE courses SET enrolled = enrolled - 1 WHERE id = ?", (row["course_id"],))
+            self._promote(conn, row["course_id"])
+        return dict(row)
+
+    # ---------------- STREAMING READS ----------------
+
+    def get_users_by_id(self, user_ids):
+        return self._by_id(f"SELECT {USER_COLUMNS} FROM users WHERE id IN ", user_ids)
+
+    def get_courses_by_id(self, course_ids):
+        return self._by_id(f"SELECT {COURSE_COLUMNS} FROM courses WHERE id IN ", course_ids)
+
+    def _by_id(self, select, ids):
+        found = {}
+        ids = list(dict.fromkeys(ids))
+        # stay under SQLite's default 999 bound-parameter limit
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            for row in self._all(select + f"({', '.join('?' * len(chunk))})", chunk):
+                found[row["id"]] = row
+        return found
+
+    # ---------------- BULK ----------------
+    # One transaction (and so one WAL commit) per batch. A failing INSERT only
+    # rolls back its own statement, so the rest of the batch still lands.
+
+    def create_users(self, rows):
+        out = []
+        with self._transaction() as conn:
+            for row in rows:
+                try:
+                    cur = conn.execute(
+                        "INSERT INTO users (name, email, email_key, role) VALUES (?, ?, ?, ?)",
+                        (row["name"], row["email"], normalize_email(row["email"]), row["role"]),
+                    )
+                except sqlite3.IntegrityError as e:
+                    out.append(_duplicate(e))
+                    continue
+                out.append({"id": cur.lastrowid, "name": row["name"], "email": row["email"], "role": row["role"]})
+        return out
+
+    def create_courses(self, rows):
+        out = []
+        with self._transaction() as conn:
+            for row in rows:
+                capacity = row.get("capacity")
+                try:
+                    cur = conn.execute(
+                        "INSERT INTO courses (title, code, capacity) VALUES (?, ?, ?)",
+                        (row["title"], row["code"], capacity),
+                    )
+                except sqlite3.IntegrityError as e:
+                    out.append(_duplicate(e))
+                    continue
+                self._index_course(conn, cur.lastrowid, row["title"], row["code"])
+                out.append({"id": cur.lastrowid, "title": row["title"], "code": row["code"], "capacity": capacity})
+            self._bump_catalog(conn)
+        return out
+
+    def create_enrollments(self, rows):
+        with self._transaction() as conn:
+            return [self._enroll(conn, row["user_id"], row["course_id"], waitlist=False) for row in rows]
+
+    # ---------------- STATS ----------------
+
+    def enrollment_stats(self, top=10):
+        conn = self._connect()
+        # one read transaction, so the counters and the ranking agree
+        conn.execute("BEGIN")
+        try:
+            counters = dict(conn.execute("SELECT name, value FROM counters WHERE value != 0").fetchall())
+            ranked = [
+                dict(row) for row in conn.execute(
+                    "SELECT id, code, title, enrolled FROM courses WHERE enrolled > 0"
+                    " ORDER BY enrolled DESC, id LIMIT ?",
+                    (top,),
+                )
+            ]
+        finally:
+            conn.execute("COMMIT")
+        by_role = {name[len("users:"):]: n for name, n in counters.items() if name.startswith("users:")}
+        per_user = {int(name[len("per_user:"):]): n for name, n in counters.items() if name.startswith("per_user:")}
+        return {
+            "users": {"total": sum(by_role.values()), "by_role": by_role},
+            "courses": counters.get("courses", 0),
+            "enrollments": counters.get("enrollments", 0),
+            "courses_per_user": dict(sorted(per_user.items())),
+            "top_courses": ranked,
+        }
+
+    # ---------------- ASYNC ----------------
+
+    def _async_executor(self):
+        if self._executor is None:
+            with self._pool_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.async_threads, thread_name_prefix="sqlite")
+        return self._executor
+
+    async def run_async(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._async_executor(), partial(method, *args, **kwargs))
+
+    # ---------------- MAINTENANCE ----------------
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM waitlist")
+            conn.execute("DELETE FROM enrollments")
+            conn.execute("DELETE FROM course_tokens")
+            conn.execute("DELETE FROM courses")
+            conn.execute("DELETE FROM users")
+            conn.execute("DELETE FROM sqlite_sequence")
+            self._bump_catalog(conn)
+
+    def close(self):
+        with self._pool_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._pool_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
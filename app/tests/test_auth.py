@@ -0,0 +1,131 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import storage
+from app.auth import Authenticator, Identity, authenticator
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def tokens_only():
+    authenticator.trust_headers = False
+
+
+def bearer(user_id, role):
+    token, _ = authenticator.mint(user_id, role)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def seed():
+    """An admin, two students and a course, straight into storage."""
+    repo = storage.get_repository()
+    admin = repo.create_user("Root", "root@test.com", "admin")["id"]
+    ada = repo.create_user("Ada", "ada@test.com", "student")["id"]
+    bob = repo.create_user("Bob", "bob@test.com", "student")["id"]
+    course = repo.create_course("Math", "MATH101")["id"]
+    return admin, ada, bob, course
+
+# -------------------------
+# CREDENTIALS
+# -------------------------
+
+def test_requests_without_a_token_are_401():
+    res = client.get("/api/v1/enrollments/")
+    assert res.status_code == 401
+    assert res.headers["www-authenticate"] == "Bearer"
+    # role headers mean nothing once header trust is off
+    assert client.get("/api/v1/enrollments/", headers={"X-User-Role": "admin"}).status_code == 401
+
+def test_tampered_and_expired_tokens_are_rejected():
+    admin, ada, _, _ = seed()
+    token, _ = authenticator.mint(ada, "student")
+    forged = token.replace(".student.", ".admin.")
+    assert client.get("/api/v1/stats", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+    assert client.get("/api/v1/stats", headers={"Authorization": f"Basic {token}"}).status_code == 401
+    assert client.get("/api/v1/stats", headers={"Authorization": "Bearer nonsense"}).status_code == 401
+    # non-ASCII signatures are just invalid, not an error
+    assert authenticator.verify(token + "\xe9") is None
+    non_ascii = {"Authorization": f"Bearer {token[:-1]}\xe9".encode("latin-1")}
+    assert client.get("/api/v1/enrollments/", headers=non_ascii).status_code == 401
+    expired, _ = authenticator.mint(admin, "admin", ttl=-1)
+    assert client.get("/api/v1/stats", headers={"Authorization": f"Bearer {expired}"}).status_code == 401
+    assert client.get("/api/v1/stats", headers=bearer(admin, "admin")).status_code == 200
+
+def test_admin_mints_tokens_with_the_stored_role():
+    admin, ada, _, _ = seed()
+    res = client.post("/api/v1/auth/token", json={"user_id": ada}, headers=bearer(admin, "admin"))
+    assert res.status_code == 201
+    body = res.json()
+    assert body["token_type"] == "bearer"
+    assert authenticator.verify(body["access_token"]) == Identity(ada, "student")
+
+    student = {"Authorization": f"Bearer {body['access_token']}"}
+    assert client.post("/api/v1/auth/token", json={"user_id": ada}, headers=student).status_code == 403
+    assert client.post("/api/v1/auth/token", json={"user_id": 999}, headers=bearer(admin, "admin")).status_code == 404
+
+# -------------------------
+# OWNERSHIP
+# -------------------------
+
+def test_students_only_enroll_themselves():
+    _, ada, bob, course = seed()
+    res = client.post("/api/v1/enrollments/", json={"user_id": bob, "course_id": course}, headers=bearer(ada, "student"))
+    assert res.status_code == 403
+    res = client.post("/api/v1/enrollments/batch", json={"user_id": bob, "course_ids": [course]}, headers=bearer(ada, "student"))
+    assert res.status_code == 403
+    res = client.post("/api/v1/enrollments/", json={"user_id": ada, "course_id": course}, headers=bearer(ada, "student"))
+    assert res.status_code == 201
+
+    mine = client.get("/api/v1/enrollments/", headers=bearer(ada, "student")).json()
+    assert [e["user_id"] for e in mine] == [ada]
+    assert client.get("/api/v1/enrollments/", headers=bearer(bob, "student")).json() == []
+
+def test_deregister_checks_ownership():
+    admin, ada, bob, course = seed()
+    repo = storage.get_repository()
+    ada_enrollment = repo.create_enrollment(ada, course)["id"]
+    bob_enrollment = repo.create_enrollment(bob, course)["id"]
+
+    res = client.delete(f"/api/v1/enrollments/{bob_enrollment}", headers=bearer(ada, "student"))
+    assert res.status_code == 403
+    assert repo.get_enrollment(bob_enrollment) is not None
+    assert client.delete(f"/api/v1/enrollments/{ada_enrollment}", headers=bearer(ada, "student")).status_code == 200
+    assert client.delete(f"/api/v1/enrollments/{bob_enrollment}", headers=bearer(admin, "admin")).status_code == 200
+
+def test_trusted_headers_check_ownership_when_a_user_id_is_sent():
+    authenticator.trust_headers = True
+    _, ada, bob, course = seed()
+    bob_enrollment = storage.get_repository().create_enrollment(bob, course)["id"]
+    as_ada = {"X-User-Role": "student", "X-User-Id": str(ada)}
+    assert client.delete(f"/api/v1/enrollments/{bob_enrollment}", headers=as_ada).status_code == 403
+    assert client.get("/api/v1/enrollments/", headers={"X-User-Role": "student", "X-User-Id": "x"}).status_code == 401
+
+# -------------------------
+# VERIFIED-TOKEN CACHE
+# -------------------------
+
+def test_verified_tokens_are_cached_until_ttl_or_expiry():
+    now = [1_000_000.0]
+    auth = Authenticator(b"secret", token_ttl=600, cache_ttl=60, clock=lambda: now[0])
+    token, expires_at = auth.mint(7, "student")
+    assert expires_at == 1_000_600
+    assert auth.verify(token) == Identity(7, "student")
+    assert len(auth) == 1
+    now[0] += 59
+    assert auth.verify(token) == Identity(7, "student")
+    now[0] += 541  # past the token's own expiry, even though it was re-cached
+    assert auth.verify(token) is None
+    assert len(auth) == 0
+
+def test_verified_cache_is_bounded_and_skips_failures():
+    auth = Authenticator(b"secret", max_cached=2)
+    tokens = [auth.mint(i, "student")[0] for i in range(3)]
+    for token in tokens:
+        assert auth.verify(token) is not None
+    assert len(auth) == 2
+    assert auth.verify(tokens[0] + "x") is None
+    assert Authenticator(b"other").verify(tokens[0]) is None
+    assert len(auth) == 2
+    with pytest.raises(ValueError):
+        auth.mint(1, "teacher")
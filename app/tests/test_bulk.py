@@ -0,0 +1,114 @@
+import json
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+ADMIN_NDJSON = {"X-User-Role": "admin", "Content-Type": "application/x-ndjson"}
+ADMIN_CSV = {"X-User-Role": "admin", "Content-Type": "text/csv"}
+
+# -------------------------
+# HELPERS
+# -------------------------
+def results(res):
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+def ndjson(*rows):
+    return "\n".join(json.dumps(r) for r in rows) + "\n"
+
+# -------------------------
+# USERS
+# -------------------------
+
+def test_bulk_users_ndjson_reports_every_row():
+    body = ndjson(
+        {"name": "A", "email": "a@test.com", "role": "student"},
+        {"name": "B", "email": "b@test.com", "role": "admin"},
+        {"name": "", "email": "c@test.com", "role": "student"},
+        {"name": "A again", "email": "A@test.com", "role": "student"},
+    )
+    res = client.post("/api/v1/users/bulk", content=body, headers=ADMIN_NDJSON)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+
+    rows, summary = results(res)
+    assert [r["status"] for r in rows] == [201, 201, 422, 400]
+    assert [r["row"] for r in rows] == [1, 2, 3, 4]
+    assert rows[3]["detail"] == "Email already exists"
+    assert summary == {"created": 2, "failed": 2}
+
+    created = client.get(f"/api/v1/users/{rows[1]['id']}").json()
+    assert created["email"] == "b@test.com"
+
+def test_bulk_users_malformed_json_line():
+    body = '{"name": "A", "email": "a@test.com", "role": "student"}\n{not json}\n'
+    rows, summary = results(client.post("/api/v1/users/bulk", content=body, headers=ADMIN_NDJSON))
+    assert [r["status"] for r in rows] == [201, 422]
+    assert summary == {"created": 1, "failed": 1}
+
+def test_bulk_users_rejects_invalid_utf8_row():
+    body = ndjson({"name": "A", "email": "a@test.com", "role": "student"}).encode()
+    body += b'{"name": "Caf\xe9", "email": "b@test.com", "role": "student"}\n'
+    body += ndjson({"name": "C", "email": "c@test.com", "role": "student"}).encode()
+    rows, summary = results(client.post("/api/v1/users/bulk", content=body, headers=ADMIN_NDJSON))
+    assert [r["status"] for r in rows] == [201, 422, 201]
+    assert rows[1]["row"] == 2
+    assert rows[1]["detail"][0]["type"] == "utf8_invalid"
+    assert summary == {"created": 2, "failed": 1}
+    assert client.get("/api/v1/users/?email_prefix=b@test.com").json() == []
+
+def test_bulk_users_streamed_in_chunks():
+    def chunks():
+        for i in range(2500):
+            yield (json.dumps({"name": f"U{i}", "email": f"u{i}@test.com", "role": "student"}) + "\n").encode()
+
+    rows, summary = results(client.post("/api/v1/users/bulk", content=chunks(), headers=ADMIN_NDJSON))
+    assert summary == {"created": 2500, "failed": 0}
+    assert [r["id"] for r in rows] == list(range(1, 2501))
+
+def test_bulk_requires_admin():
+    res = client.post("/api/v1/users/bulk", content="", headers={"X-User-Role": "student"})
+    assert res.status_code == 403
+
+def test_bulk_rejects_unknown_content_type():
+    res = client.post("/api/v1/users/bulk", content="x", headers={"X-User-Role": "admin", "Content-Type": "text/plain"})
+    assert res.status_code == 415
+
+# -------------------------
+# COURSES & ENROLLMENTS (CSV)
+# -------------------------
+
+def test_bulk_courses_csv():
+    body = "title,code\nMath 101,MATH101\n\"Biology, Intro\",BIO101\nMath again,MATH101\n"
+    rows, summary = results(client.post("/api/v1/courses/bulk", content=body, headers=ADMIN_CSV))
+    assert [r["status"] for r in rows] == [201, 201, 400]
+    assert summary == {"created": 2, "failed": 1}
+    assert client.get(f"/api/v1/courses/{rows[1]['id']}").json()["title"] == "Biology, Intro"
+
+def test_bulk_courses_csv_blank_optional_cell():
+    body = "title,code,capacity\nMath,MATH101,\nArt,ART101,30\n,BIO101,\n"
+    rows, summary = results(client.post("/api/v1/courses/bulk", content=body, headers=ADMIN_CSV))
+    assert [r["status"] for r in rows] == [201, 201, 422]
+    assert rows[2]["detail"][0]["type"] == "missing"
+    assert summary == {"created": 2, "failed": 1}
+    assert client.get(f"/api/v1/courses/{rows[0]['id']}").json()["capacity"] is None
+    assert client.get(f"/api/v1/courses/{rows[1]['id']}").json()["capacity"] == 30
+
+def test_bulk_courses_csv_undecodable_header_stops_the_body():
+    body = b"title,c\xf4de\nMath,MATH101\n"
+    rows, summary = results(client.post("/api/v1/courses/bulk", content=body, headers=ADMIN_CSV))
+    assert [(r["row"], r["status"]) for r in rows] == [(0, 422)]
+    assert summary == {"created": 0, "failed": 1}
+
+def test_bulk_enrollments_csv():
+    client.post("/api/v1/users/bulk", content=ndjson({"name": "S", "email": "s@test.com", "role": "student"}), headers=ADMIN_NDJSON)
+    client.post("/api/v1/courses/bulk", content="title,code\nMath,M1\n", headers=ADMIN_CSV)
+
+    body = "user_id,course_id\n1,1\n1,1\n99,1\n1,99\n1,abc\n"
+    rows, summary = results(client.post("/api/v1/enrollments/bulk", content=body, headers=ADMIN_CSV))
+    assert [r["status"] for r in rows] == [201, 400, 404, 404, 422]
+    assert rows[2]["detail"] == "User not found"
+    assert rows[3]["detail"] == "Course not found"
+    assert summary == {"created": 1, "failed": 4}
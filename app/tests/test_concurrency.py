@@ -0,0 +1,148 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import storage
+
+client = TestClient(app)
+
+THREADS = 32
+
+
+@pytest.fixture(autouse=True)
+def tiny_switch_interval():
+    """Force very frequent GIL hand-offs so check-then-insert races actually surface."""
+    old = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(old)
+
+
+def hammer(fn, n):
+    barrier = threading.Barrier(min(n, THREADS))
+
+    def run(i):
+        if i < THREADS:
+            barrier.wait()
+        return fn(i)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return list(pool.map(run, range(n)))
+
+# -------------------------
+# STORAGE
+# -------------------------
+
+def test_concurrent_creates_get_unique_ids():
+    repo = storage.get_repository()
+    records = hammer(lambda i: repo.create_user(f"U{i}", f"u{i}@test.com", "student"), 2000)
+    ids = [r["id"] for r in records]
+    assert len(set(ids)) == 2000
+    assert sorted(ids) == list(range(1, 2001))
+    assert len(repo.list_users()) == 2000
+
+def test_concurrent_duplicate_creates_only_one_wins():
+    repo = storage.get_repository()
+
+    def attempt(i):
+        try:
+            return repo.create_user(f"Dup{i}", "same@test.com", "student")
+        except storage.DuplicateKeyError:
+            return None
+
+    winners = [r for r in hammer(attempt, 500) if r is not None]
+    assert len(winners) == 1
+    assert len(repo.list_users()) == 1
+
+def test_concurrent_enrolls_never_oversubscribe():
+    repo = storage.get_repository()
+    course_id = repo.create_course("Popular", "POP101", capacity=30)["id"]
+    user_ids = [u["id"] for u in repo.create_users(
+        [{"name": f"S{i}", "email": f"s{i}@test.com", "role": "student"} for i in range(2000)]
+    )]
+
+    def attempt(i):
+        try:
+            repo.create_enrollment(user_ids[i], course_id)
+            return "enrolled"
+        except storage.CourseFullError:
+            return "waitlisted"
+
+    outcomes = hammer(attempt, 2000)
+    assert outcomes.count("enrolled") == 30
+    assert len(repo.list_enrollments()) == 30
+    assert len(repo.get_waitlist(course_id)) == 1970
+
+def test_concurrent_drops_promote_each_waitlisted_once():
+    repo = storage.get_repository()
+    course_id = repo.create_course("Popular", "POP101", capacity=30)["id"]
+    for i in range(100):
+        try:
+            repo.create_enrollment(repo.create_user(f"S{i}", f"s{i}@test.com", "student")["id"], course_id)
+        except storage.CourseFullError:
+            pass
+    enrolled = repo.list_enrollments()
+    hammer(lambda i: repo.delete_enrollment(enrolled[i]["id"]), 30)
+
+    remaining = repo.list_enrollments()
+    assert len(remaining) == 30
+    assert sorted(e["user_id"] for e in remaining) == list(range(31, 61))
+    assert len(repo.get_waitlist(course_id)) == 40
+
+# -------------------------
+# ENDPOINTS
+# -------------------------
+
+def test_concurrent_signups_over_http():
+    results = hammer(
+        lambda i: client.post("/api/v1/users/", json={"name": f"S{i}", "email": f"s{i}@test.com", "role": "student"}),
+        100,
+    )
+    assert all(r.status_code == 201 for r in results)
+    assert len({r.json()["id"] for r in results}) == 100
+
+def test_concurrent_duplicate_email_over_http():
+    results = hammer(
+        lambda i: client.post("/api/v1/users/", json={"name": f"D{i}", "email": "race@test.com", "role": "student"}),
+        50,
+    )
+    codes = sorted(r.status_code for r in results)
+    assert codes.count(201) == 1
+    assert codes.count(400) == 49
+
+def test_concurrent_double_enrollment_over_http():
+    repo = storage.get_repository()
+    student_id = repo.create_user("Racer", "racer@test.com", "student")["id"]
+    course_id = repo.create_course("Race 101", "RACE101")["id"]
+
+    results = hammer(
+        lambda i: client.post(
+            "/api/v1/enrollments/",
+            json={"user_id": student_id, "course_id": course_id},
+            headers={"X-User-Role": "student"},
+        ),
+        50,
+    )
+    assert [r.status_code for r in results].count(201) == 1
+    assert len(repo.list_enrollments()) == 1
+
+def test_concurrent_enrolls_at_capacity_over_http():
+    repo = storage.get_repository()
+    course_id = repo.create_course("Small", "SMALL101", capacity=5)["id"]
+    user_ids = [repo.create_user(f"H{i}", f"h{i}@test.com", "student")["id"] for i in range(60)]
+
+    results = hammer(
+        lambda i: client.post(
+            "/api/v1/enrollments/",
+            json={"user_id": user_ids[i], "course_id": course_id},
+            headers={"X-User-Role": "student"},
+        ),
+        60,
+    )
+    codes = [r.status_code for r in results]
+    assert codes.count(201) == 5
+    assert codes.count(202) == 55
+    assert sorted(r.json()["position"] for r in results if r.status_code == 202) == list(range(1, 56))
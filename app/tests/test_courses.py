@@ -1,201 +1,355 @@
-
-from fastapi.testclient import TestClient
-from app.main import app
-
-client = TestClient(app)
-
-# -------------------------
-# HELPERS
-# -------------------------
-def create_admin(name="Admin", email="admin@test.com"):
-    res = client.post(
-        "/api/v1/users/",
-        json={"name": name, "email": email, "role": "admin"}
-    )
-    return res.json()["id"]
-
-def create_student(name="Student", email="student@test.com"):
-    res = client.post(
-        "/api/v1/users/",
-        json={"name": name, "email": email, "role": "student"}
-    )
-    return res.json()["id"]
-
-# -------------------------
-# CREATE COURSES
-# -------------------------
-
-def test_admin_can_create_course():
-    admin_id = create_admin()
-    res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Physics 101", "code": "PHYS101"},
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 201
-    data = res.json()
-    assert data["title"] == "Physics 101"
-    assert data["code"] == "PHYS101"
-    assert "id" in data
-
-def test_non_admin_cannot_create_course():
-    student_id = create_student()
-    res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Chemistry 101", "code": "CHEM101"},
-        headers={"X-User-Role": "student"}
-    )
-    assert res.status_code == 403
-
-def test_duplicate_course_code_rejected():
-    admin_id = create_admin(name="Admin2", email="admin2@test.com")
-    # First creation
-    client.post(
-        "/api/v1/courses/",
-        json={"title": "Math 101", "code": "MATH101"},
-        headers={"X-User-Role": "admin"}
-    )
-    # Duplicate creation
-    res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Advanced Math", "code": "MATH101"},
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 400
-    assert "unique" in res.json()["detail"].lower()
-
-# -------------------------
-# GET COURSES
-# -------------------------
-
-def test_get_all_courses():
-    res = client.get("/api/v1/courses/")
-    assert res.status_code == 200
-    data = res.json()
-    assert isinstance(data, list)
-
-def test_get_course_by_id():
-    admin_id = create_admin(name="Admin3", email="admin3@test.com")
-    create_res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Biology 101", "code": "BIO101"},
-        headers={"X-User-Role": "admin"}
-    )
-    course_id = create_res.json()["id"]
-
-    res = client.get(f"/api/v1/courses/{course_id}")
-    assert res.status_code == 200
-    data = res.json()
-    assert data["id"] == course_id
-    assert data["title"] == "Biology 101"
-
-def test_get_course_not_found():
-    res = client.get("/api/v1/courses/9999")
-    assert res.status_code == 404
-
-# -------------------------
-# UPDATE COURSES
-# -------------------------
-
-def test_admin_can_update_course():
-    admin_id = create_admin(name="Admin4", email="admin4@test.com")
-    create_res = client.post(
-        "/api/v1/courses/",
-        json={"title": "History 101", "code": "HIST101"},
-        headers={"X-User-Role": "admin"}
-    )
-    course_id = create_res.json()["id"]
-
-    res = client.patch(
-        f"/api/v1/courses/{course_id}",
-        json={"title": "History 102", "code": "HIST102"},
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 200
-    data = res.json()
-    assert data["title"] == "History 102"
-    assert data["code"] == "HIST102"
-
-def test_non_admin_cannot_update_course():
-    student_id = create_student(name="Student2", email="student2@test.com")
-    # Admin creates course
-    admin_id = create_admin(name="Admin5", email="admin5@test.com")
-    create_res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Geo 101", "code": "GEO101"},
-        headers={"X-User-Role": "admin"}
-    )
-    course_id = create_res.json()["id"]
-
-    res = client.patch(
-        f"/api/v1/courses/{course_id}",
-        json={"title": "Geo 102", "code": "GEO102"},
-        headers={"X-User-Role": "student"}
-    )
-    assert res.status_code == 403
-
-def test_update_course_duplicate_code():
-    admin_id = create_admin(name="Admin6", email="admin6@test.com")
-    # Create two courses
-    c1 = client.post(
-        "/api/v1/courses/",
-        json={"title": "Course1", "code": "C1"},
-        headers={"X-User-Role": "admin"}
-    ).json()["id"]
-    c2 = client.post(
-        "/api/v1/courses/",
-        json={"title": "Course2", "code": "C2"},
-        headers={"X-User-Role": "admin"}
-    ).json()["id"]
-
-    # Attempt to update course2 to code C1
-    res = client.patch(
-        f"/api/v1/courses/{c2}",
-        json={"title": "Course2 Updated", "code": "C1"},
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 400
-
-# -------------------------
-# DELETE COURSES
-# -------------------------
-
-def test_admin_can_delete_course():
-    admin_id = create_admin(name="Admin7", email="admin7@test.com")
-    create_res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Delete Me", "code": "DEL101"},
-        headers={"X-User-Role": "admin"}
-    )
-    course_id = create_res.json()["id"]
-
-    res = client.delete(
-        f"/api/v1/courses/{course_id}",
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 200
-    assert "deleted" in res.json()["detail"].lower()
-
-def test_non_admin_cannot_delete_course():
-    student_id = create_student(name="Student3", email="student3@test.com")
-    admin_id = create_admin(name="Admin8", email="admin8@test.com")
-    create_res = client.post(
-        "/api/v1/courses/",
-        json={"title": "Cannot Delete", "code": "NODEL101"},
-        headers={"X-User-Role": "admin"}
-    )
-    course_id = create_res.json()["id"]
-
-    res = client.delete(
-        f"/api/v1/courses/{course_id}",
-        headers={"X-User-Role": "student"}
-    )
-    assert res.status_code == 403
-
-def test_delete_course_not_found():
-    admin_id = create_admin(name="Admin9", email="admin9@test.com")
-    res = client.delete(
-        "/api/v1/courses/9999",
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 404
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+# -------------------------
+# HELPERS
+# -------------------------
+def create_admin(name="Admin", email="admin@test.com"):
+    res = client.post(
+        "/api/v1/users/",
+        json={"name": name, "email": email, "role": "admin"}
+    )
+    return res.json()["id"]
+
+def create_student(name="Student", email="student@test.com"):
+    res = client.post(
+        "/api/v1/users/",
+        json={"name": name, "email": email, "role": "student"}
+    )
+    return res.json()["id"]
+
+# -------------------------
+# CREATE COURSES
+# -------------------------
+
+def test_admin_can_create_course():
+    admin_id = create_admin()
+    res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Physics 101", "code": "PHYS101"},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 201
+    data = res.json()
+    assert data["title"] == "Physics 101"
+    assert data["code"] == "PHYS101"
+    assert "id" in data
+
+def test_non_admin_cannot_create_course():
+    student_id = create_student()
+    res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Chemistry 101", "code": "CHEM101"},
+        headers={"X-User-Role": "student"}
+    )
+    assert res.status_code == 403
+
+def test_duplicate_course_code_rejected():
+    admin_id = create_admin(name="Admin2", email="admin2@test.com")
+    # First creation
+    client.post(
+        "/api/v1/courses/",
+        json={"title": "Math 101", "code": "MATH101"},
+        headers={"X-User-Role": "admin"}
+    )
+    # Duplicate creation
+    res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Advanced Math", "code": "MATH101"},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 400
+    assert "unique" in res.json()["detail"].lower()
+
+# -------------------------
+# GET COURSES
+# -------------------------
+
+def test_get_all_courses():
+    res = client.get("/api/v1/courses/")
+    assert res.status_code == 200
+    data = res.json()
+    assert isinstance(data, list)
+
+def test_get_course_by_id():
+    admin_id = create_admin(name="Admin3", email="admin3@test.com")
+    create_res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Biology 101", "code": "BIO101"},
+        headers={"X-User-Role": "admin"}
+    )
+    course_id = create_res.json()["id"]
+
+    res = client.get(f"/api/v1/courses/{course_id}")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["id"] == course_id
+    assert data["title"] == "Biology 101"
+
+def test_get_course_not_found():
+    res = client.get("/api/v1/courses/9999")
+    assert res.status_code == 404
+
+# -------------------------
+# CATALOG CACHE
+# -------------------------
+
+def test_catalog_etag_revalidates_with_304():
+    client.post("/api/v1/courses/", json={"title": "Art 101", "code": "ART101"}, headers={"X-User-Role": "admin"})
+    first = client.get("/api/v1/courses/")
+    etag = first.headers["ETag"]
+
+    res = client.get("/api/v1/courses/", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["ETag"] == etag
+    assert client.get("/api/v1/courses/", headers={"If-None-Match": '"stale"'}).json() == first.json()
+
+def test_course_write_invalidates_catalog_cache():
+    client.post("/api/v1/courses/", json={"title": "Art 101", "code": "ART101"}, headers={"X-User-Role": "admin"})
+    etag = client.get("/api/v1/courses/").headers["ETag"]
+
+    client.post("/api/v1/courses/", json={"title": "Art 102", "code": "ART102"}, headers={"X-User-Role": "admin"})
+    res = client.get("/api/v1/courses/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert [c["code"] for c in res.json()] == ["ART101", "ART102"]
+    assert res.headers["ETag"] != etag
+
+def test_cached_pages_keep_cursor_and_projection():
+    for i in range(3):
+        client.post("/api/v1/courses/", json={"title": f"Art {i}", "code": f"ART{i}"}, headers={"X-User-Role": "admin"})
+    first = client.get("/api/v1/courses/?limit=2&fields=code")
+    again = client.get("/api/v1/courses/?limit=2&fields=code")
+    assert again.json() == first.json() == [{"code": "ART0"}, {"code": "ART1"}]
+    assert again.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+# -------------------------
+# UPDATE COURSES
+# -------------------------
+
+def test_admin_can_update_course():
+    admin_id = create_admin(name="Admin4", email="admin4@test.com")
+    create_res = client.post(
+        "/api/v1/courses/",
+        json={"title": "History 101", "code": "HIST101"},
+        headers={"X-User-Role": "admin"}
+    )
+    course_id = create_res.json()["id"]
+
+    res = client.patch(
+        f"/api/v1/courses/{course_id}",
+        json={"title": "History 102", "code": "HIST102"},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["title"] == "History 102"
+    assert data["code"] == "HIST102"
+
+def test_non_admin_cannot_update_course():
+    student_id = create_student(name="Student2", email="student2@test.com")
+    # Admin creates course
+    admin_id = create_admin(name="Admin5", email="admin5@test.com")
+    create_res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Geo 101", "code": "GEO101"},
+        headers={"X-User-Role": "admin"}
+    )
+    course_id = create_res.json()["id"]
+
+    res = client.patch(
+        f"/api/v1/courses/{course_id}",
+        json={"title": "Geo 102", "code": "GEO102"},
+        headers={"X-User-Role": "student"}
+    )
+    assert res.status_code == 403
+
+def test_update_course_duplicate_code():
+    admin_id = create_admin(name="Admin6", email="admin6@test.com")
+    # Create two courses
+    c1 = client.post(
+        "/api/v1/courses/",
+        json={"title": "Course1", "code": "C1"},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    c2 = client.post(
+        "/api/v1/courses/",
+        json={"title": "Course2", "code": "C2"},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+
+    # Attempt to update course2 to code C1
+    res = client.patch(
+        f"/api/v1/courses/{c2}",
+        json={"title": "Course2 Updated", "code": "C1"},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 400
+
+def test_put_replaces_course_and_patch_rejects_null_code():
+    course_id = client.post(
+        "/api/v1/courses/",
+        json={"title": "Drama 101", "code": "DRAMA101", "capacity": 10},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+
+    res = client.put(
+        f"/api/v1/courses/{course_id}",
+        json={"title": "Drama 201", "code": "DRAMA201"},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 200
+    assert res.json() == {"id": course_id, "title": "Drama 201", "code": "DRAMA201", "capacity": None}
+
+    res = client.patch(f"/api/v1/courses/{course_id}", json={"code": None}, headers={"X-User-Role": "admin"})
+    assert res.status_code == 422
+
+def test_update_missing_course():
+    res = client.patch("/api/v1/courses/9999", json={"title": "Ghost"}, headers={"X-User-Role": "admin"})
+    assert res.status_code == 404
+
+def test_update_invalidates_cached_course():
+    course_id = client.post(
+        "/api/v1/courses/",
+        json={"title": "Music 101", "code": "MUS101"},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    assert client.get(f"/api/v1/courses/{course_id}").json()["title"] == "Music 101"
+    client.patch(f"/api/v1/courses/{course_id}", json={"title": "Music 102"}, headers={"X-User-Role": "admin"})
+    assert client.get(f"/api/v1/courses/{course_id}").json()["title"] == "Music 102"
+
+# -------------------------
+# DELETE COURSES
+# -------------------------
+
+def test_admin_can_delete_course():
+    admin_id = create_admin(name="Admin7", email="admin7@test.com")
+    create_res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Delete Me", "code": "DEL101"},
+        headers={"X-User-Role": "admin"}
+    )
+    course_id = create_res.json()["id"]
+
+    res = client.delete(
+        f"/api/v1/courses/{course_id}",
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 200
+    assert "deleted" in res.json()["detail"].lower()
+
+def test_non_admin_cannot_delete_course():
+    student_id = create_student(name="Student3", email="student3@test.com")
+    admin_id = create_admin(name="Admin8", email="admin8@test.com")
+    create_res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Cannot Delete", "code": "NODEL101"},
+        headers={"X-User-Role": "admin"}
+    )
+    course_id = create_res.json()["id"]
+
+    res = client.delete(
+        f"/api/v1/courses/{course_id}",
+        headers={"X-User-Role": "student"}
+    )
+    assert res.status_code == 403
+
+def test_delete_course_not_found():
+    admin_id = create_admin(name="Admin9", email="admin9@test.com")
+    res = client.delete(
+        "/api/v1/courses/9999",
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 404
+
+def test_delete_course_removes_its_enrollments():
+    student_id = create_student(name="Student4", email="student4@test.com")
+    course_id = client.post(
+        "/api/v1/courses/",
+        json={"title": "Cascade", "code": "CASC101"},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+
+    client.delete(f"/api/v1/courses/{course_id}", headers={"X-User-Role": "admin"})
+    assert client.get(f"/api/v1/courses/{course_id}").status_code == 404
+    assert client.get("/api/v1/enrollments/", headers={"X-User-Role": "admin"}).json() == []
+
+# -------------------------
+# ROSTER
+# -------------------------
+
+def test_roster_lists_students_by_name_in_pages():
+    course_id = client.post(
+        "/api/v1/courses/",
+        json={"title": "Roster", "code": "ROST101"},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    other_id = client.post(
+        "/api/v1/courses/",
+        json={"title": "Other", "code": "OTHR101"},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    names = ["Dana", "alex", "Chris", "Bo:b", "Chris", "Eve"]
+    for i, name in enumerate(names):
+        student_id = create_student(name=name, email=f"roster{i}@test.com")
+        client.post(
+            "/api/v1/enrollments/",
+            json={"user_id": student_id, "course_id": course_id},
+            headers={"X-User-Role": "student"}
+        )
+    outsider = create_student(name="Aaron", email="outsider@test.com")
+    client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": outsider, "course_id": other_id},
+        headers={"X-User-Role": "student"}
+    )
+
+    rows, params = [], {"limit": 4}
+    while True:
+        res = client.get(f"/api/v1/courses/{course_id}/roster", params=params, headers={"X-User-Role": "admin"})
+        assert res.status_code == 200
+        rows += res.json()
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["after"] = res.headers["X-Next-Cursor"]
+    assert [r["name"] for r in rows] == ["Bo:b", "Chris", "Chris", "Dana", "Eve", "alex"]
+    assert rows[1]["user_id"] < rows[2]["user_id"]
+    assert set(rows[0]) == {"user_id", "name", "email", "enrollment_id"}
+
+def test_roster_is_admin_only_and_needs_a_course():
+    assert client.get("/api/v1/courses/1/roster", headers={"X-User-Role": "student"}).status_code == 403
+    assert client.get("/api/v1/courses/999/roster", headers={"X-User-Role": "admin"}).status_code == 404
+    res = client.get("/api/v1/courses/1/roster", params={"after": "not-a-cursor"}, headers={"X-User-Role": "admin"})
+    assert res.status_code == 400
+
+# -------------------------
+# SEARCH
+# -------------------------
+
+def test_search_courses_ranked_and_paginated():
+    for title, code in [("Intro to Programming", "CS-101"), ("Data Structures", "CS-201"), ("Intro to Statistics", "STAT-101")]:
+        client.post("/api/v1/courses/", json={"title": title, "code": code}, headers={"X-User-Role": "admin"})
+
+    res = client.get("/api/v1/courses/search", params={"q": "cs", "limit": 1})
+    assert res.status_code == 200
+    assert [c["code"] for c in res.json()] == ["CS-101"]
+    res = client.get("/api/v1/courses/search", params={"q": "cs", "limit": 1, "after": res.headers["X-Next-Cursor"]})
+    assert [c["code"] for c in res.json()] == ["CS-201"]
+    assert "X-Next-Cursor" not in res.headers
+
+    res = client.get("/api/v1/courses/search", params={"q": "intro stat", "fields": "code,score"})
+    assert res.json() == [{"code": "STAT-101", "score": 15}]
+
+def test_search_validates_query():
+    assert client.get("/api/v1/courses/search").status_code == 422
+    assert client.get("/api/v1/courses/search", params={"q": ""}).status_code == 422
+    assert client.get("/api/v1/courses/search", params={"q": "x", "after": "bad"}).status_code == 400
+
@@ -1,172 +1,337 @@
-
-from fastapi.testclient import TestClient
-from app.main import app
-import pytest
-
-client = TestClient(app)
-
-# -------------------------
-# HELPERS
-# -------------------------
-def create_admin(name="Admin", email="admin@test.com"):
-    res = client.post(
-        "/api/v1/users/",
-        json={"name": name, "email": email, "role": "admin"}
-    )
-    return res.json()["id"]
-
-def create_student(name="Student", email="student@test.com"):
-    res = client.post(
-        "/api/v1/users/",
-        json={"name": name, "email": email, "role": "student"}
-    )
-    return res.json()["id"]
-
-def create_course(admin_id, title="Test Course", code="TEST101"):
-    res = client.post(
-        "/api/v1/courses/",
-        json={"title": title, "code": code},
-        headers={"X-User-Role": "admin"}
-    )
-    return res.json()["id"]
-
-# -------------------------
-# FIXTURE: create users & course
-# -------------------------
-@pytest.fixture
-def setup_users_and_course():
-    student_id = create_student()
-    admin_id = create_admin(name="Admin2", email="admin2@test.com")
-    course_id = create_course(admin_id)
-    return {"student_id": student_id, "admin_id": admin_id, "course_id": course_id}
-
-# -------------------------
-# ENROLLMENT TESTS
-# -------------------------
-
-def test_student_can_enroll(setup_users_and_course):
-    ids = setup_users_and_course
-    student_id = ids["student_id"]
-    course_id = ids["course_id"]
-
-    res = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": course_id},
-        headers={"X-User-Role": "student"}
-    )
-    assert res.status_code == 201
-    data = res.json()
-    assert data["user_id"] == student_id
-    assert data["course_id"] == course_id
-
-def test_admin_cannot_enroll(setup_users_and_course):
-    ids = setup_users_and_course
-    admin_id = ids["admin_id"]
-    course_id = ids["course_id"]
-
-    res = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": admin_id, "course_id": course_id},
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 403
-
-def test_student_cannot_enroll_twice(setup_users_and_course):
-    ids = setup_users_and_course
-    student_id = ids["student_id"]
-    course_id = ids["course_id"]
-
-    # First enrollment
-    client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": course_id},
-        headers={"X-User-Role": "student"}
-    )
-
-    # Duplicate enrollment
-    res = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": course_id},
-        headers={"X-User-Role": "student"}
-    )
-    assert res.status_code == 400
-    assert "already enrolled" in res.json()["detail"].lower()
-
-def test_student_can_deregister(setup_users_and_course):
-    ids = setup_users_and_course
-    student_id = ids["student_id"]
-    course_id = ids["course_id"]
-
-    # Enroll first
-    enroll_res = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": course_id},
-        headers={"X-User-Role": "student"}
-    )
-    enroll_id = enroll_res.json()["id"]
-
-    # Deregister
-    res = client.delete(
-        f"/api/v1/enrollments/{enroll_id}",
-        headers={"X-User-Role": "student"}
-    )
-    assert res.status_code == 200
-    assert "deregistered" in res.json()["detail"].lower()
-
-def test_admin_can_force_deregister(setup_users_and_course):
-    ids = setup_users_and_course
-    student_id = ids["student_id"]
-    course_id = ids["course_id"]
-    admin_id = ids["admin_id"]
-
-    enroll_res = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": course_id},
-        headers={"X-User-Role": "student"}
-    )
-    enroll_id = enroll_res.json()["id"]
-
-    res = client.delete(
-        f"/api/v1/enrollments/{enroll_id}",
-        headers={"X-User-Role": "admin"}
-    )
-    assert res.status_code == 200
-
-def test_student_views_own_enrollments(setup_users_and_course):
-    ids = setup_users_and_course
-    student_id = ids["student_id"]
-    course_id = ids["course_id"]
-
-    # Enroll student
-    client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": course_id},
-        headers={"X-User-Role": "student"}
-    )
-
-    # Get enrollments
-    res = client.get(
-        "/api/v1/enrollments/",
-        headers={"X-User-Role": "student", "X-User-ID": str(student_id)}
-    )
-    assert res.status_code == 200
-    data = res.json()
-    assert all(e["user_id"] == student_id for e in data)
-
-def test_enroll_non_existing_user_or_course():
-    # Non-existent user
-    res1 = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": 9999, "course_id": 1},
-        headers={"X-User-Role": "student"}
-    )
-    assert res1.status_code == 404
-
-    # Non-existent course
-    student_id = create_student(name="EdgeCase", email="edge@test.com")
-    res2 = client.post(
-        "/api/v1/enrollments/",
-        json={"user_id": student_id, "course_id": 9999},
-        headers={"X-User-Role": "student"}
-    )
-    assert res2.status_code == 404
+
+from fastapi.testclient import TestClient
+from app.main import app
+import pytest
+import json
+
+client = TestClient(app)
+
+# -------------------------
+# HELPERS
+# -------------------------
+def create_admin(name="Admin", email="admin@test.com"):
+    res = client.post(
+        "/api/v1/users/",
+        json={"name": name, "email": email, "role": "admin"}
+    )
+    return res.json()["id"]
+
+def create_student(name="Student", email="student@test.com"):
+    res = client.post(
+        "/api/v1/users/",
+        json={"name": name, "email": email, "role": "student"}
+    )
+    return res.json()["id"]
+
+def create_course(admin_id, title="Test Course", code="TEST101"):
+    res = client.post(
+        "/api/v1/courses/",
+        json={"title": title, "code": code},
+        headers={"X-User-Role": "admin"}
+    )
+    return res.json()["id"]
+
+# -------------------------
+# FIXTURE: create users & course
+# -------------------------
+@pytest.fixture
+def setup_users_and_course():
+    student_id = create_student()
+    admin_id = create_admin(name="Admin2", email="admin2@test.com")
+    course_id = create_course(admin_id)
+    return {"student_id": student_id, "admin_id": admin_id, "course_id": course_id}
+
+# -------------------------
+# ENROLLMENT TESTS
+# -------------------------
+
+def test_student_can_enroll(setup_users_and_course):
+    ids = setup_users_and_course
+    student_id = ids["student_id"]
+    course_id = ids["course_id"]
+
+    res = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+    assert res.status_code == 201
+    data = res.json()
+    assert data["user_id"] == student_id
+    assert data["course_id"] == course_id
+
+def test_admin_cannot_enroll(setup_users_and_course):
+    ids = setup_users_and_course
+    admin_id = ids["admin_id"]
+    course_id = ids["course_id"]
+
+    res = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": admin_id, "course_id": course_id},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 403
+
+def test_student_cannot_enroll_twice(setup_users_and_course):
+    ids = setup_users_and_course
+    student_id = ids["student_id"]
+    course_id = ids["course_id"]
+
+    # First enrollment
+    client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+
+    # Duplicate enrollment
+    res = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+    assert res.status_code == 400
+    assert "already enrolled" in res.json()["detail"].lower()
+
+def test_student_can_deregister(setup_users_and_course):
+    ids = setup_users_and_course
+    student_id = ids["student_id"]
+    course_id = ids["course_id"]
+
+    # Enroll first
+    enroll_res = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+    enroll_id = enroll_res.json()["id"]
+
+    # Deregister
+    res = client.delete(
+        f"/api/v1/enrollments/{enroll_id}",
+        headers={"X-User-Role": "student"}
+    )
+    assert res.status_code == 200
+    assert "deregistered" in res.json()["detail"].lower()
+
+def test_admin_can_force_deregister(setup_users_and_course):
+    ids = setup_users_and_course
+    student_id = ids["student_id"]
+    course_id = ids["course_id"]
+    admin_id = ids["admin_id"]
+
+    enroll_res = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+    enroll_id = enroll_res.json()["id"]
+
+    res = client.delete(
+        f"/api/v1/enrollments/{enroll_id}",
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 200
+
+def test_student_views_own_enrollments(setup_users_and_course):
+    ids = setup_users_and_course
+    student_id = ids["student_id"]
+    course_id = ids["course_id"]
+
+    # Enroll student
+    client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+
+    # Get enrollments
+    res = client.get(
+        "/api/v1/enrollments/",
+        headers={"X-User-Role": "student", "X-User-ID": str(student_id)}
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert all(e["user_id"] == student_id for e in data)
+
+def test_enroll_non_existing_user_or_course():
+    # Non-existent user
+    res1 = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": 9999, "course_id": 1},
+        headers={"X-User-Role": "student"}
+    )
+    assert res1.status_code == 404
+
+    # Non-existent course
+    student_id = create_student(name="EdgeCase", email="edge@test.com")
+    res2 = client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": 9999},
+        headers={"X-User-Role": "student"}
+    )
+    assert res2.status_code == 404
+
+def test_student_without_id_sees_no_enrollments(setup_users_and_course):
+    ids = setup_users_and_course
+    client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": ids["student_id"], "course_id": ids["course_id"]},
+        headers={"X-User-Role": "student"}
+    )
+
+    res = client.get("/api/v1/enrollments/", headers={"X-User-Role": "student"})
+    assert res.status_code == 200
+    assert res.json() == []
+
+# -------------------------
+# CAPACITY & WAITLIST
+# -------------------------
+
+def enroll(student_id, course_id):
+    return client.post(
+        "/api/v1/enrollments/",
+        json={"user_id": student_id, "course_id": course_id},
+        headers={"X-User-Role": "student"}
+    )
+
+def test_full_course_waitlists_and_promotes():
+    course_id = client.post(
+        "/api/v1/courses/",
+        json={"title": "Seminar", "code": "SEM101", "capacity": 1},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    first = create_student("First", "first@test.com")
+    second = create_student("Second", "second@test.com")
+
+    enrollment_id = enroll(first, course_id).json()["id"]
+    res = enroll(second, course_id)
+    assert res.status_code == 202
+    assert res.json()["position"] == 1
+    assert enroll(second, course_id).json()["detail"] == "Already on waitlist"
+
+    waitlist = client.get(f"/api/v1/courses/{course_id}/waitlist", headers={"X-User-Role": "admin"})
+    assert waitlist.json() == [{"position": 1, "user_id": second}]
+
+    client.delete(f"/api/v1/enrollments/{enrollment_id}", headers={"X-User-Role": "student"})
+    mine = client.get("/api/v1/enrollments/", headers={"X-User-Role": "student", "X-User-Id": str(second)})
+    assert [e["course_id"] for e in mine.json()] == [course_id]
+    assert client.get(f"/api/v1/courses/{course_id}/waitlist", headers={"X-User-Role": "admin"}).json() == []
+
+def test_capacity_must_be_positive():
+    res = client.post(
+        "/api/v1/courses/",
+        json={"title": "Empty", "code": "EMPTY1", "capacity": 0},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 422
+
+# -------------------------
+# BATCH ENROLLMENT
+# -------------------------
+
+def enroll_batch(student_id, course_ids, role="student"):
+    return client.post(
+        "/api/v1/enrollments/batch",
+        json={"user_id": student_id, "course_ids": course_ids},
+        headers={"X-User-Role": role}
+    )
+
+def test_batch_enroll_in_several_courses():
+    admin_id = create_admin()
+    student_id = create_student()
+    courses = [create_course(admin_id, title=f"Course {i}", code=f"BATCH{i}") for i in range(4)]
+
+    res = enroll_batch(student_id, courses)
+    assert res.status_code == 201
+    results = res.json()["results"]
+    assert [r["course_id"] for r in results] == courses
+    assert {r["status"] for r in results} == {201}
+    mine = client.get("/api/v1/enrollments/", headers={"X-User-Role": "student", "X-User-Id": str(student_id)})
+    assert [e["id"] for e in mine.json()] == [r["enrollment"]["id"] for r in results]
+
+def test_batch_enroll_failure_writes_nothing():
+    admin_id = create_admin()
+    student_id = create_student()
+    other_id = create_student("Other", "other@test.com")
+    free = create_course(admin_id, title="Free", code="FREE1")
+    full = client.post(
+        "/api/v1/courses/",
+        json={"title": "Full", "code": "FULL1", "capacity": 1},
+        headers={"X-User-Role": "admin"}
+    ).json()["id"]
+    enroll(other_id, full)
+
+    res = enroll_batch(student_id, [free, full, 999])
+    assert res.status_code == 409
+    assert [(r["course_id"], r["status"]) for r in res.json()["results"]] == [(free, 424), (full, 409), (999, 404)]
+    mine = client.get("/api/v1/enrollments/", headers={"X-User-Role": "student", "X-User-Id": str(student_id)})
+    assert mine.json() == []
+    assert client.get(f"/api/v1/courses/{full}/waitlist", headers={"X-User-Role": "admin"}).json() == []
+
+def test_batch_enroll_validation():
+    admin_id = create_admin()
+    student_id = create_student()
+    course_id = create_course(admin_id)
+
+    assert enroll_batch(student_id, [course_id], role="admin").status_code == 403
+    assert enroll_batch(999, [course_id]).status_code == 404
+    assert enroll_batch(student_id, []).status_code == 422
+    assert enroll_batch(student_id, [course_id, course_id]).status_code == 422
+
+# -------------------------
+# EXPORT
+# -------------------------
+
+def enroll_many(n_students, course_ids):
+    student_ids = [create_student(name=f"S{i}", email=f"s{i}@test.com") for i in range(n_students)]
+    for sid in student_ids:
+        for cid in course_ids:
+            client.post(
+                "/api/v1/enrollments/",
+                json={"user_id": sid, "course_id": cid},
+                headers={"X-User-Role": "student"}
+            )
+    return student_ids
+
+def test_export_ndjson_with_joins():
+    admin_id = create_admin()
+    course_id = create_course(admin_id, code="EXP101")
+    student_ids = enroll_many(3, [course_id])
+
+    res = client.get(
+        "/api/v1/enrollments/export",
+        params={"include": "user,course"},
+        headers={"X-User-Role": "admin"}
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["user_id"] for r in rows] == student_ids
+    assert rows[0]["user_name"] == "S0"
+    assert rows[0]["user_email"] == "s0@test.com"
+    assert all(r["course_code"] == "EXP101" for r in rows)
+
+def test_export_csv_spans_several_pages(monkeypatch):
+    monkeypatch.setattr("app.export.BATCH_SIZE", 2)
+    admin_id = create_admin()
+    c1 = create_course(admin_id, code="A1")
+    c2 = create_course(admin_id, code="A2")
+    enroll_many(3, [c1, c2])
+
+    res = client.get("/api/v1/enrollments/export", params={"format": "csv", "include": "course"}, headers={"X-User-Role": "admin"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    lines = res.text.splitlines()
+    assert lines[0] == "id,user_id,course_id,course_code"
+    assert len(lines) == 1 + 6
+    assert lines[1].endswith(",A1") and lines[2].endswith(",A2")
+
+def test_export_empty_csv_has_header():
+    res = client.get("/api/v1/enrollments/export", params={"format": "csv"}, headers={"X-User-Role": "admin"})
+    assert res.text == "id,user_id,course_id\n"
+
+def test_export_admin_only_and_validates_include():
+    assert client.get("/api/v1/enrollments/export", headers={"X-User-Role": "student"}).status_code == 403
+    res = client.get("/api/v1/enrollments/export", params={"include": "grades"}, headers={"X-User-Role": "admin"})
+    assert res.status_code == 400
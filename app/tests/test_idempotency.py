@@ -0,0 +1,144 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app import storage
+from app.idempotency import IdempotencyCache, StoredResponse
+
+client = TestClient(app)
+ADMIN = {"X-User-Role": "admin"}
+STUDENT = {"X-User-Role": "student"}
+ADA = {"name": "Ada", "email": "ada@test.com", "role": "student"}
+
+
+def create_course(code="MATH101"):
+    res = client.post("/api/v1/courses/", json={"title": "Math", "code": code}, headers=ADMIN)
+    return res.json()["id"]
+
+# -------------------------
+# REPLAY
+# -------------------------
+
+def test_retry_replays_the_first_response():
+    headers = {"Idempotency-Key": "signup-1"}
+    first = client.post("/api/v1/users/", json=ADA, headers=headers)
+    retry = client.post("/api/v1/users/", json=ADA, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(storage.get_repository().list_users()) == 1
+
+def test_enrollment_retry_is_not_already_enrolled():
+    user_id = client.post("/api/v1/users/", json=ADA).json()["id"]
+    course_id = create_course()
+    headers = {**STUDENT, "Idempotency-Key": "enroll-1"}
+    body = {"user_id": user_id, "course_id": course_id}
+    first = client.post("/api/v1/enrollments/", json=body, headers=headers)
+    retry = client.post("/api/v1/enrollments/", json=body, headers=headers)
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    # without a key, the same request is a second attempt
+    assert client.post("/api/v1/enrollments/", json=body, headers=STUDENT).status_code == 400
+
+def test_errors_are_replayed_too():
+    client.post("/api/v1/users/", json=ADA)
+    headers = {"Idempotency-Key": "dup"}
+    assert client.post("/api/v1/users/", json=ADA, headers=headers).status_code == 400
+    storage.reset()
+    # the stored answer stands until it expires, even though a retry would now succeed
+    assert client.post("/api/v1/users/", json=ADA, headers=headers).status_code == 400
+
+def test_keys_are_scoped_per_path_and_user():
+    create_course("ART101")
+    headers = {**ADMIN, "Idempotency-Key": "k"}
+    assert client.post("/api/v1/courses/", json={"title": "Math", "code": "MATH101"}, headers=headers).status_code == 201
+    other_user = {**headers, "X-User-Id": "7"}
+    assert client.post("/api/v1/courses/", json={"title": "Bio", "code": "BIO101"}, headers=other_user).status_code == 201
+    assert client.post("/api/v1/users/", json=ADA, headers={"Idempotency-Key": "k"}).status_code == 201
+    assert len(storage.get_repository().list_courses()) == 3
+
+def test_anonymous_keys_are_scoped_per_client_address():
+    def from_address(host):
+        async def asgi(scope, receive, send):
+            await app({**scope, "client": (host, 50000)}, receive, send)
+        return TestClient(asgi)
+
+    first, second = from_address("10.0.0.1"), from_address("10.0.0.2")
+    headers = {"Idempotency-Key": "signup"}
+    bob = {**ADA, "name": "Bob", "email": "bob@test.com"}
+    assert first.post("/api/v1/users/", json=ADA, headers=headers).json()["name"] == "Ada"
+    res = second.post("/api/v1/users/", json=bob, headers=headers)
+    assert res.status_code == 201
+    assert res.json()["name"] == "Bob"
+    assert second.post("/api/v1/users/", json=bob, headers=headers).headers["idempotent-replayed"] == "true"
+    assert len(storage.get_repository().list_users()) == 2
+
+# -------------------------
+# MISUSE
+# -------------------------
+
+def test_key_reused_with_different_body_is_rejected():
+    headers = {"Idempotency-Key": "signup-1"}
+    assert client.post("/api/v1/users/", json=ADA, headers=headers).status_code == 201
+    res = client.post("/api/v1/users/", json={**ADA, "email": "bob@test.com"}, headers=headers)
+    assert res.status_code == 422
+    assert "different request" in res.json()["detail"]
+    assert len(storage.get_repository().list_users()) == 1
+
+def test_key_length_is_checked():
+    res = client.post("/api/v1/users/", json=ADA, headers={"Idempotency-Key": "x" * 256})
+    assert res.status_code == 400
+    assert storage.get_repository().list_users() == []
+
+# -------------------------
+# CONCURRENCY
+# -------------------------
+
+def test_concurrent_identical_requests_run_once():
+    threads = 16
+    barrier = threading.Barrier(threads)
+
+    def attempt(_):
+        barrier.wait()
+        return client.post("/api/v1/users/", json=ADA, headers={"Idempotency-Key": "same"})
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        responses = list(pool.map(attempt, range(threads)))
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.content for r in responses}) == 1
+    assert sum("idempotent-replayed" in r.headers for r in responses) == threads - 1
+    assert len(storage.get_repository().list_users()) == 1
+
+# -------------------------
+# CACHE
+# -------------------------
+
+def stored(body=b"{}"):
+    return StoredResponse(b"fp", 201, [], body, None)
+
+def test_cache_entries_expire():
+    now = [0.0]
+    cache = IdempotencyCache(ttl=60, clock=lambda: now[0])
+    assert cache.begin("k") is None
+    cache.finish("k", stored())
+    now[0] = 59
+    assert cache.begin("k").body == b"{}"
+    now[0] = 60
+    assert cache.begin("k") is None
+    cache.finish("k", None)
+    assert len(cache) == 0
+
+def test_cache_is_bounded_and_waiters_see_the_result():
+    cache = IdempotencyCache(max_entries=2)
+    for key in "abc":
+        assert cache.begin(key) is None
+        cache.finish(key, stored(key.encode()))
+    assert len(cache) == 2
+    assert cache.begin("a") is None  # evicted, so "a" runs again
+    waiter = cache.begin("a")
+    assert not waiter.done()
+    cache.finish("a", stored(b"again"))
+    assert waiter.result().body == b"again"
+    assert cache.begin("a").body == b"again"
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.metrics import Metrics, registry
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    registry.reset()
+    registry.sample_rate = 1.0
+    yield
+    registry.sample_rate = 1.0
+
+
+def scrape():
+    res = client.get("/api/v1/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return res.text
+
+# -------------------------
+# ENDPOINT
+# -------------------------
+
+def test_latency_is_labelled_by_route_template_and_status():
+    client.get("/api/v1/users/1")
+    client.get("/api/v1/users/2")
+    client.post("/api/v1/users/", json={"name": "A", "email": "a@test.com", "role": "student"})
+    text = scrape()
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/users/{user_id}",status="404"} 2' in text
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/users/",status="201"} 1' in text
+    assert 'le="+Inf"' in text
+
+def test_body_sizes_are_recorded():
+    body = b'{"name": "A", "email": "a@test.com", "role": "student"}'
+    res = client.post("/api/v1/users/", content=body, headers={"Content-Type": "application/json"})
+    text = scrape()
+    labels = 'method="POST",route="/api/v1/users/",status="201"'
+    assert f"http_request_size_bytes_sum{{{labels}}} {float(len(body))}" in text
+    assert f"http_response_size_bytes_sum{{{labels}}} {float(len(res.content))}" in text
+
+def test_unmatched_paths_share_one_series():
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+    assert 'http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"} 2' in scrape()
+
+def test_sample_rate_zero_records_nothing():
+    registry.sample_rate = 0.0
+    client.get("/api/v1/users/1")
+    text = scrape()
+    assert "http_metrics_sample_rate 0.0" in text
+    assert "/api/v1/users/{user_id}" not in text
+
+# -------------------------
+# PER-THREAD SHARDS
+# -------------------------
+
+def test_shards_from_many_threads_are_merged():
+    metrics = Metrics()
+
+    def record():
+        shard = metrics.shard()
+        for _ in range(100):
+            metrics.observe(shard, "GET", "/x", 200, 0.001, 0, 10)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    del threads  # lets finished threads' shards retire into the running total
+
+    series = metrics.snapshot().series[("GET", "/x", 200)]
+    assert sum(series.latency.counts) == 800
+    assert series.response_size.sum == 8000
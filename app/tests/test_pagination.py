@@ -0,0 +1,101 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.pagination import encode_cursor, decode_cursor, encode_name_cursor, decode_name_cursor
+
+client = TestClient(app)
+
+# -------------------------
+# HELPERS
+# -------------------------
+def create_users(n):
+    for i in range(n):
+        client.post("/api/v1/users/", json={"name": f"User{i}", "email": f"user{i}@test.com", "role": "student"})
+
+def walk(url, **params):
+    """Follow X-Next-Cursor until exhausted; returns every page."""
+    pages = []
+    while True:
+        res = client.get(url, params=params)
+        assert res.status_code == 200
+        pages.append(res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        params["after"] = cursor
+
+# -------------------------
+# CURSOR PAGINATION
+# -------------------------
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+def test_name_cursor_round_trip():
+    assert decode_name_cursor(encode_name_cursor("Ann: B", 7)) == ("Ann: B", 7)
+
+def test_invalid_cursor_rejected():
+    res = client.get("/api/v1/users/", params={"limit": 2, "after": "not-a-cursor"})
+    assert res.status_code == 400
+
+def test_users_paginate_in_id_order():
+    create_users(7)
+    pages = walk("/api/v1/users/", limit=3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    ids = [u["id"] for p in pages for u in p]
+    assert ids == sorted(ids) and len(set(ids)) == 7
+
+def test_last_full_page_has_no_cursor():
+    create_users(4)
+    res = client.get("/api/v1/users/", params={"limit": 4})
+    assert len(res.json()) == 4
+    assert "X-Next-Cursor" not in res.headers
+
+def test_without_limit_returns_everything():
+    create_users(5)
+    res = client.get("/api/v1/users/")
+    assert len(res.json()) == 5
+    assert "X-Next-Cursor" not in res.headers
+
+def test_limit_bounds_validated():
+    assert client.get("/api/v1/users/", params={"limit": 0}).status_code == 422
+    assert client.get("/api/v1/users/", params={"limit": 100000}).status_code == 422
+
+def test_enrollments_paginate_after_deregister():
+    create_users(1)
+    for i in range(5):
+        client.post("/api/v1/courses/", json={"title": f"C{i}", "code": f"C{i}"}, headers={"X-User-Role": "admin"})
+    eids = [
+        client.post(
+            "/api/v1/enrollments/",
+            json={"user_id": 1, "course_id": c},
+            headers={"X-User-Role": "student"}
+        ).json()["id"]
+        for c in range(1, 6)
+    ]
+    client.delete(f"/api/v1/enrollments/{eids[1]}", headers={"X-User-Role": "admin"})
+
+    res = client.get("/api/v1/enrollments/", params={"limit": 2}, headers={"X-User-Role": "student", "X-User-Id": "1"})
+    assert [e["id"] for e in res.json()] == [eids[0], eids[2]]
+    res = client.get(
+        "/api/v1/enrollments/",
+        params={"limit": 2, "after": res.headers["X-Next-Cursor"]},
+        headers={"X-User-Role": "admin"}
+    )
+    assert [e["id"] for e in res.json()] == [eids[3], eids[4]]
+    assert "X-Next-Cursor" not in res.headers
+
+# -------------------------
+# FIELD PROJECTION
+# -------------------------
+
+def test_fields_projection():
+    create_users(3)
+    res = client.get("/api/v1/users/", params={"fields": "id,email", "limit": 2})
+    assert res.status_code == 200
+    assert res.json() == [{"id": 1, "email": "user0@test.com"}, {"id": 2, "email": "user1@test.com"}]
+    assert "X-Next-Cursor" in res.headers
+
+def test_unknown_field_rejected():
+    res = client.get("/api/v1/courses/", params={"fields": "id,password"})
+    assert res.status_code == 400
+    assert "password" in res.json()["detail"]
@@ -0,0 +1,105 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.profiling import Profiler, profiler
+
+client = TestClient(app)
+ADMIN = {"X-User-Role": "admin"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_profiler():
+    profiler.clear()
+    profiler.sample_rate = 0.0
+    yield
+    profiler.sample_rate = 0.0
+    profiler.clear()
+
+# -------------------------
+# OPT-IN
+# -------------------------
+
+def test_admin_header_profiles_the_request():
+    res = client.get("/api/v1/users/", headers={**ADMIN, "X-Profile": "1"})
+    assert res.status_code == 200
+    profile_id = res.headers["x-profile-id"]
+
+    listed = client.get("/api/v1/profiles/", headers=ADMIN).json()
+    assert listed[0]["id"] == int(profile_id)
+    assert listed[0]["path"] == "/api/v1/users/"
+    assert listed[0]["status"] == 200
+
+    res = client.get(f"/api/v1/profiles/{profile_id}", headers=ADMIN)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    for line in res.text.splitlines():
+        assert re.fullmatch(r".+ \d+", line)
+
+def test_admin_query_flag_profiles_the_request():
+    res = client.get("/api/v1/courses/?profile=1", headers=ADMIN)
+    assert res.status_code == 200
+    assert res.headers["x-profile-id"].isdigit()
+
+def test_non_admin_flag_is_ignored():
+    res = client.get("/api/v1/users/", headers={"X-User-Role": "student", "X-Profile": "1"})
+    assert res.status_code == 200
+    assert "x-profile-id" not in res.headers
+    assert client.get("/api/v1/profiles/", headers=ADMIN).json() == []
+
+def test_unflagged_requests_are_not_profiled():
+    res = client.get("/api/v1/users/", headers=ADMIN)
+    assert "x-profile-id" not in res.headers
+
+def test_sample_rate_profiles_without_a_flag():
+    profiler.sample_rate = 1.0
+    res = client.get("/api/v1/users/")
+    assert res.headers["x-profile-id"].isdigit()
+
+# -------------------------
+# GUARDRAILS
+# -------------------------
+
+def test_one_profile_at_a_time():
+    assert profiler._active.acquire(blocking=False)
+    try:
+        res = client.get("/api/v1/users/", headers={**ADMIN, "X-Profile": "1"})
+    finally:
+        profiler._active.release()
+    assert res.status_code == 200
+    assert res.headers["x-profile-id"] == "busy"
+    assert client.get("/api/v1/profiles/", headers=ADMIN).json() == []
+
+def test_only_recent_profiles_are_retained():
+    bounded = Profiler(max_retained=2)
+    for _ in range(3):
+        profile, sampler = bounded.begin("GET", "/")
+        bounded.finish(profile, sampler, 200, 0.0)
+    assert [p["id"] for p in bounded.list()] == [3, 2]
+    assert bounded.get(1) is None
+
+def test_heaviest_stacks_are_kept():
+    bounded = Profiler(max_stacks=1)
+    profile, sampler = bounded.begin("GET", "/")
+    sampler.stop()
+    sampler.stacks.update({"a;b": 10, "a;c": 30})
+    bounded.finish(profile, sampler, 200, 0.0)
+    assert profile.collapsed == "a;c 30\n"
+    assert profile.truncated
+
+# -------------------------
+# ACCESS
+# -------------------------
+
+def test_profiles_are_admin_only():
+    res = client.get("/api/v1/users/", headers={**ADMIN, "X-Profile": "1"})
+    profile_id = res.headers["x-profile-id"]
+    student = {"X-User-Role": "student"}
+    assert client.get("/api/v1/profiles/", headers=student).status_code == 403
+    assert client.get(f"/api/v1/profiles/{profile_id}", headers=student).status_code == 403
+
+def test_unknown_profile_is_404():
+    res = client.get("/api/v1/profiles/999", headers=ADMIN)
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Profile not found"
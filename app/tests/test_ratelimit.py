@@ -0,0 +1,116 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.ratelimit import RateLimiter, limiter
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def limits_on(monkeypatch):
+    # frozen time: buckets only refill when a test moves the clock
+    monkeypatch.setattr(limiter, "clock", FakeClock())
+    limiter.reset()
+    limiter.enabled = True
+    yield
+    limiter.enabled = False
+
+# -------------------------
+# TOKEN BUCKETS
+# -------------------------
+
+def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    buckets = RateLimiter(clock=clock)
+    assert [buckets.hit("k", rate=2, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.hit("k", rate=2, burst=3) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.hit("k", rate=2, burst=3) == 0.0
+    clock.now += 60  # refills only up to the burst
+    assert [buckets.hit("k", rate=2, burst=3) for _ in range(4)][-1] > 0
+
+def test_keys_are_independent():
+    buckets = RateLimiter(clock=FakeClock())
+    assert buckets.hit("a", rate=1, burst=1) == 0.0
+    assert buckets.hit("a", rate=1, burst=1) > 0
+    assert buckets.hit("b", rate=1, burst=1) == 0.0
+
+def test_idle_buckets_are_evicted_lru():
+    buckets = RateLimiter(max_buckets=16 * 4, clock=FakeClock())
+    for i in range(10_000):
+        buckets.hit(i, rate=1, burst=1)
+    assert len(buckets) <= 16 * 4
+    # a just-used key survives, so its limit still holds
+    assert buckets.hit(9_999, rate=1, burst=1) > 0
+
+# -------------------------
+# ROUTES
+# -------------------------
+
+def setup_course():
+    user = client.post("/api/v1/users/", json={"name": "S", "email": "s@test.com", "role": "student"}).json()["id"]
+    course = client.post("/api/v1/courses/", json={"title": "Math", "code": "M1"}, headers={"X-User-Role": "admin"}).json()["id"]
+    return user, course
+
+def test_enroll_flood_gets_429_with_retry_after():
+    user, course = setup_course()
+    headers = {"X-User-Role": "student", "X-User-Id": str(user)}
+    statuses = [
+        client.post("/api/v1/enrollments/", json={"user_id": user, "course_id": course}, headers=headers)
+        for _ in range(15)
+    ]
+    assert [r.status_code for r in statuses].count(429) == 5  # burst of 10
+    limited = statuses[-1]
+    assert limited.json()["detail"] == "Too many requests"
+    assert int(limited.headers["Retry-After"]) >= 1
+
+def test_users_have_separate_budgets():
+    user, course = setup_course()
+    for _ in range(10):
+        client.delete("/api/v1/enrollments/999", headers={"X-User-Role": "student", "X-User-Id": "1"})
+    blocked = client.delete("/api/v1/enrollments/999", headers={"X-User-Role": "student", "X-User-Id": "1"})
+    other = client.delete("/api/v1/enrollments/999", headers={"X-User-Role": "student", "X-User-Id": "2"})
+    assert blocked.status_code == 429
+    assert other.status_code == 404
+
+def test_admins_get_a_larger_budget():
+    for _ in range(30):
+        res = client.delete("/api/v1/enrollments/999", headers={"X-User-Role": "admin", "X-User-Id": "1"})
+    assert res.status_code == 404
+
+def test_rotating_user_ids_still_hits_the_ip_limit():
+    statuses = [
+        client.delete("/api/v1/enrollments/999", headers={"X-User-Role": "student", "X-User-Id": str(i)}).status_code
+        for i in range(210)
+    ]
+    assert statuses.count(429) == 10  # per-IP burst of 200
+
+def test_signup_is_limited_per_ip():
+    statuses = [
+        client.post("/api/v1/users/", json={"name": "U", "email": f"u{i}@test.com", "role": "student"}).status_code
+        for i in range(25)
+    ]
+    assert statuses.count(201) == 20
+    assert statuses.count(429) == 5
+
+def test_reads_are_not_limited():
+    for _ in range(300):
+        res = client.get("/api/v1/courses/")
+    assert res.status_code == 200
+
+def test_retry_after_is_honoured():
+    headers = {"X-User-Role": "student", "X-User-Id": "1"}
+    for _ in range(10):
+        client.delete("/api/v1/enrollments/999", headers=headers)
+    limited = client.delete("/api/v1/enrollments/999", headers=headers)
+    assert limited.status_code == 429
+    limiter.clock.now += int(limited.headers["Retry-After"])
+    assert client.delete("/api/v1/enrollments/999", headers=headers).status_code == 404
@@ -0,0 +1,613 @@
+import asyncio
+import sqlite3
+
+import pytest
+from app.storage import MemoryRepository, SQLiteRepository, JournaledRepository, DuplicateKeyError, NotFoundError, CourseFullError
+
+# -------------------------
+# FIXTURE: every contract test runs against every backend
+# -------------------------
+@pytest.fixture(params=["memory", "sqlite", "journal"])
+def repo(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryRepository()
+        return
+    if request.param == "sqlite":
+        repository = SQLiteRepository(str(tmp_path / "test.db"))
+    else:
+        repository = JournaledRepository(str(tmp_path / "journal"))
+    yield repository
+    repository.close()
+
+# -------------------------
+# USERS & COURSES
+# -------------------------
+
+def test_create_and_get_user(repo):
+    user = repo.create_user("Ada", "Ada@Test.com", "student")
+    assert user == {"id": 1, "name": "Ada", "email": "Ada@Test.com", "role": "student"}
+    assert repo.get_user(user["id"]) == user
+    assert repo.get_user(999) is None
+    assert repo.list_users() == [user]
+
+def test_list_users_filters_combine(repo):
+    repo.create_users([
+        {"name": f"{'Admin' if i % 5 == 0 else 'Student'} {i}", "email": f"{'staff' if i % 5 == 0 else 'user'}{i}@Test.com",
+         "role": "admin" if i % 5 == 0 else "student"}
+        for i in range(1, 31)
+    ])
+    assert [u["id"] for u in repo.list_users(role="admin")] == [5, 10, 15, 20, 25, 30]
+    assert [u["id"] for u in repo.list_users(role="admin", after=10, limit=2)] == [15, 20]
+    assert [u["id"] for u in repo.list_users(email_prefix="USER2")] == [2, 21, 22, 23, 24, 26, 27, 28, 29]
+    assert [u["id"] for u in repo.list_users(email_prefix="user2", after=2, limit=3)] == [21, 22, 23]
+    assert [u["id"] for u in repo.list_users(email_prefix="user2", name_contains="7", after=21, limit=3)] == [27]
+    assert [u["id"] for u in repo.list_users(role="admin", email_prefix="staff")] == [5, 10, 15, 20, 25, 30]
+    assert repo.list_users(role="student", email_prefix="staff") == []
+    assert [u["id"] for u in repo.list_users(name_contains="ent 1", limit=3)] == [1, 11, 12]
+    assert [u["id"] for u in repo.list_users(role="admin", name_contains="2", email_prefix="staff2")] == [20, 25]
+
+def test_email_prefix_ending_in_the_last_code_point(repo):
+    top = chr(0x10FFFF)
+    repo.create_users([
+        {"name": "A", "email": f"a{top}@test.com", "role": "student"},
+        {"name": "B", "email": "b@test.com", "role": "student"},
+        {"name": "C", "email": "\ud7ff@test.com", "role": "student"},
+    ])
+    assert [u["name"] for u in repo.list_users(email_prefix=f"a{top}")] == ["A"]
+    assert [u["name"] for u in repo.list_users(email_prefix=top)] == []
+    assert [u["name"] for u in repo.list_users(email_prefix="\ud7ff")] == ["C"]
+
+def test_duplicate_email_is_case_insensitive(repo):
+    repo.create_user("Ada", "ada@test.com", "student")
+    with pytest.raises(DuplicateKeyError) as exc:
+        repo.create_user("Ada 2", "ADA@test.com", "student")
+    assert exc.value.index == "email"
+
+def test_duplicate_course_code(repo):
+    repo.create_course("Math", "MATH101")
+    with pytest.raises(DuplicateKeyError) as exc:
+        repo.create_course("Math again", "MATH101")
+    assert exc.value.index == "code"
+    assert len(repo.list_courses()) == 1
+
+def test_catalog_version_moves_on_course_writes(repo):
+    before = repo.catalog_version()
+    repo.create_course("Math", "MATH101")
+    after_create = repo.catalog_version()
+    assert after_create != before
+    with pytest.raises(DuplicateKeyError):
+        repo.create_course("Math", "MATH101")
+    repo.create_user("A", "a@test.com", "student")
+    assert repo.catalog_version() == after_create
+    repo.create_courses([{"title": "Art", "code": "ART1"}])
+    assert repo.catalog_version() != after_create
+
+def test_search_ranks_code_then_title_matches(repo):
+    repo.create_courses([
+        {"title": "Introduction to Biology", "code": "BIO-101"},
+        {"title": "Intro Bio Lab", "code": "BIO-102"},
+        {"title": "Biochemistry", "code": "CHEM-210"},
+        {"title": "Calculus", "code": "MATH101"},
+        {"title": "Mathematical Logic", "code": "PHIL-220"},
+    ])
+    hits = repo.search_courses("intro bio")
+    assert [(c["id"], c["score"]) for c in hits] == [(2, 20), (1, 10)]
+    assert [c["id"] for c in repo.search_courses("MATH")] == [4, 5]
+    assert [c["id"] for c in repo.search_courses("bio 101")] == [1]
+    assert repo.search_courses("nothing") == []
+    assert repo.search_courses("  -- ") == []
+
+    page = repo.search_courses("bio", limit=2)
+    rest = repo.search_courses("bio", after=(page[-1]["score"], page[-1]["id"]))
+    assert [c["id"] for c in page + rest] == [c["id"] for c in repo.search_courses("bio")]
+    assert len(page + rest) == 3
+
+def test_search_agrees_with_course_query_scores(repo):
+    import random
+    from app.storage.search import CourseQuery
+
+    rng = random.Random(3)
+    words = ["Intro", "Introduction", "Bio", "Biology", "Math", "Mathematics", "Lab", "Art"]
+    courses = repo.create_courses([
+        {"title": " ".join(rng.sample(words, rng.randint(1, 3))), "code": f"{rng.choice(['BIO', 'MATH', 'ART'])}-{i}"}
+        for i in range(200)
+    ])
+    for text in ["intro bio", "bio", "math 1", "MATH-12", "lab intro math", "art", "biology lab", "x"]:
+        query = CourseQuery(text)
+        scored = [(query.score(c["title"], c["code"]), c["id"]) for c in courses]
+        expected = sorted(((-score, course_id) for score, course_id in scored if score), key=tuple)
+        assert [(-c["score"], c["id"]) for c in repo.search_courses(text)] == expected
+
+def test_search_follows_course_writes(repo):
+    course = repo.create_course("Organic Chemistry", "CHEM-300")["id"]
+    repo.update_course(course, title="Inorganic Chemistry", code="CHM-301")
+    assert repo.search_courses("organic") == []
+    assert [c["id"] for c in repo.search_courses("inorg")] == [course]
+    assert [c["id"] for c in repo.search_courses("chm3")] == [course]
+    repo.delete_course(course)
+    assert repo.search_courses("chemistry") == []
+
+def test_update_course_moves_code_key(repo):
+    c1 = repo.create_course("Math", "MATH101")["id"]
+    c2 = repo.create_course("Art", "ART101")["id"]
+    updated = repo.update_course(c1, code="MATH102", title="Maths")
+    assert updated == {**repo.get_course(c1), "code": "MATH102", "title": "Maths"}
+
+    with pytest.raises(DuplicateKeyError) as exc:
+        repo.update_course(c2, code="MATH102")
+    assert exc.value.index == "code"
+    assert repo.get_course(c2)["code"] == "ART101"
+    # the old code was released by the rename
+    repo.create_course("Math again", "MATH101")
+    with pytest.raises(NotFoundError):
+        repo.update_course(999, title="Nope")
+
+def test_delete_course_cascades_to_its_enrollments_only(repo):
+    u1 = repo.create_user("A", "a@test.com", "student")["id"]
+    u2 = repo.create_user("B", "b@test.com", "student")["id"]
+    doomed = repo.create_course("Math", "MATH101", capacity=1)["id"]
+    kept = repo.create_course("Art", "ART101")["id"]
+    repo.create_enrollment(u1, doomed)
+    with pytest.raises(CourseFullError):
+        repo.create_enrollment(u2, doomed)
+    other = repo.create_enrollment(u1, kept)
+
+    assert repo.delete_course(doomed)["code"] == "MATH101"
+    assert repo.get_course(doomed) is None
+    assert repo.list_enrollments() == [other]
+    assert repo.list_enrollments(user_id=u1) == [other]
+    assert repo.get_waitlist(doomed) == []
+    with pytest.raises(NotFoundError):
+        repo.delete_course(doomed)
+    # the freed code can be reused
+    repo.create_course("Math", "MATH101")
+
+def test_raising_capacity_promotes_waitlist(repo):
+    users = [repo.create_user(f"U{i}", f"u{i}@test.com", "student")["id"] for i in range(3)]
+    c = repo.create_course("Seminar", "SEM1", capacity=1)["id"]
+    for user in users:
+        try:
+            repo.create_enrollment(user, c)
+        except CourseFullError:
+            pass
+    repo.update_course(c, capacity=2)
+    assert sorted(e["user_id"] for e in repo.list_enrollments()) == users[:2]
+    assert repo.get_waitlist(c) == users[2:]
+
+# -------------------------
+# ENROLLMENTS
+# -------------------------
+
+def test_enrollment_lifecycle(repo):
+    u1 = repo.create_user("A", "a@test.com", "student")["id"]
+    u2 = repo.create_user("B", "b@test.com", "student")["id"]
+    c = repo.create_course("Math", "MATH101")["id"]
+
+    e1 = repo.create_enrollment(u1, c)
+    e2 = repo.create_enrollment(u2, c)
+    assert repo.list_enrollments(user_id=u1) == [e1]
+    assert repo.list_enrollments() == [e1, e2]
+
+    with pytest.raises(DuplicateKeyError) as exc:
+        repo.create_enrollment(u1, c)
+    assert exc.value.index == "user_course"
+
+    assert repo.delete_enrollment(e1["id"]) == e1
+    assert repo.get_enrollment(e1["id"]) is None
+    assert repo.list_enrollments(user_id=u1) == []
+    with pytest.raises(NotFoundError):
+        repo.delete_enrollment(e1["id"])
+
+def test_roster_sorts_by_name_and_pages(repo):
+    course = repo.create_course("Math", "MATH101")["id"]
+    other = repo.create_course("Art", "ART101")["id"]
+    for i, name in enumerate(["Cy", "Ann", "Bea", "Ann"]):
+        user = repo.create_user(name, f"u{i}@test.com", "student")["id"]
+        repo.create_enrollment(user, course)
+    repo.create_enrollment(repo.create_user("Al", "al@test.com", "student")["id"], other)
+
+    roster = repo.list_roster(course)
+    assert [(r["name"], r["user_id"]) for r in roster] == [("Ann", 2), ("Ann", 4), ("Bea", 3), ("Cy", 1)]
+    assert roster[0] == {"user_id": 2, "name": "Ann", "email": "u1@test.com", "enrollment_id": 2}
+    assert repo.list_roster(course, after=("Ann", 2), limit=2) == roster[1:3]
+    assert repo.list_roster(other + 1) == []
+
+def test_enrollment_requires_user_and_course(repo):
+    u = repo.create_user("A", "a@test.com", "student")["id"]
+    c = repo.create_course("Math", "MATH101")["id"]
+    with pytest.raises(NotFoundError, match="User"):
+        repo.create_enrollment(999, c)
+    with pytest.raises(NotFoundError, match="Course"):
+        repo.create_enrollment(u, 999)
+
+def test_clear_restarts_ids(repo):
+    repo.create_user("A", "a@test.com", "student")
+    repo.clear()
+    assert repo.list_users() == []
+    assert repo.create_user("A", "a@test.com", "student")["id"] == 1
+
+# -------------------------
+# CAPACITY & WAITLIST
+# -------------------------
+
+def test_full_course_queues_in_arrival_order(repo):
+    users = [repo.create_user(f"U{i}", f"u{i}@test.com", "student")["id"] for i in range(4)]
+    c = repo.create_course("Seminar", "SEM1", capacity=2)
+    assert c["capacity"] == 2
+
+    first = repo.create_enrollment(users[0], c["id"])
+    repo.create_enrollment(users[1], c["id"])
+    for expected, user in enumerate(users[2:], start=1):
+        with pytest.raises(CourseFullError) as exc:
+            repo.create_enrollment(user, c["id"])
+        assert exc.value.position == expected
+    assert repo.get_waitlist(c["id"]) == users[2:]
+
+    with pytest.raises(DuplicateKeyError) as exc:
+        repo.create_enrollment(users[2], c["id"])
+    assert exc.value.index == "waitlist"
+    with pytest.raises(CourseFullError) as exc:
+        repo.create_enrollment(users[3], c["id"], waitlist=False)
+    assert exc.value.position is None
+
+    repo.delete_enrollment(first["id"])
+    assert repo.get_waitlist(c["id"]) == [users[3]]
+    assert sorted(e["user_id"] for e in repo.list_enrollments()) == [users[1], users[2]]
+
+def test_failed_enrollment_does_not_take_a_seat(repo):
+    u1 = repo.create_user("A", "a@test.com", "student")["id"]
+    u2 = repo.create_user("B", "b@test.com", "student")["id"]
+    c = repo.create_course("Seminar", "SEM1", capacity=1)["id"]
+    repo.create_enrollment(u1, c)
+    with pytest.raises(DuplicateKeyError):
+        repo.create_enrollment(u1, c)
+    with pytest.raises(CourseFullError):
+        repo.create_enrollment(u2, c)
+    assert len(repo.list_enrollments()) == 1
+
+def test_uncapped_course_never_fills(repo):
+    c = repo.create_course("Lecture", "LEC1")["id"]
+    for i in range(50):
+        repo.create_enrollment(repo.create_user(f"U{i}", f"u{i}@test.com", "student")["id"], c)
+    assert repo.get_waitlist(c) == []
+    assert len(repo.list_enrollments()) == 50
+
+# -------------------------
+# BULK
+# -------------------------
+
+def test_bulk_create_returns_outcome_per_row(repo):
+    users = repo.create_users([
+        {"name": "A", "email": "a@test.com", "role": "student"},
+        {"name": "A2", "email": "A@TEST.com", "role": "student"},
+        {"name": "B", "email": "b@test.com", "role": "student"},
+    ])
+    assert [u["id"] for u in (users[0], users[2])] == [1, 2]
+    assert isinstance(users[1], DuplicateKeyError)
+
+    courses = repo.create_courses([{"title": "Math", "code": "M1"}])
+    enrollments = repo.create_enrollments([
+        {"user_id": 1, "course_id": 1},
+        {"user_id": 1, "course_id": 1},
+        {"user_id": 9, "course_id": 1},
+        {"user_id": 2, "course_id": 9},
+    ])
+    assert enrollments[0] == {"id": 1, "user_id": 1, "course_id": courses[0]["id"]}
+    assert isinstance(enrollments[1], DuplicateKeyError)
+    assert str(enrollments[2]) == "User not found"
+    assert str(enrollments[3]) == "Course not found"
+    assert len(repo.list_enrollments()) == 1
+
+def test_bulk_enroll_into_full_course_is_an_error(repo):
+    for i in range(3):
+        repo.create_user(f"U{i}", f"u{i}@test.com", "student")
+    c = repo.create_courses([{"title": "Seminar", "code": "SEM1", "capacity": 2}])[0]["id"]
+    outcomes = repo.create_enrollments([{"user_id": u, "course_id": c} for u in (1, 2, 3)])
+    assert isinstance(outcomes[2], CourseFullError)
+    assert repo.get_waitlist(c) == []
+    assert len(repo.list_enrollments()) == 2
+
+def test_enroll_in_courses_applies_all(repo):
+    u = repo.create_user("A", "a@test.com", "student")["id"]
+    courses = [repo.create_course(f"C{i}", f"C{i}", capacity=1)["id"] for i in range(3)]
+    created = repo.enroll_in_courses(u, courses)
+    assert [e["course_id"] for e in created] == courses
+    assert repo.list_enrollments(user_id=u) == created
+
+def test_enroll_in_courses_is_all_or_nothing(repo):
+    a = repo.create_user("A", "a@test.com", "student")["id"]
+    b = repo.create_user("B", "b@test.com", "student")["id"]
+    open_course = repo.create_course("Open", "OPEN1")["id"]
+    full = repo.create_course("Full", "FULL1", capacity=1)["id"]
+    taken = repo.create_course("Taken", "TAKEN1")["id"]
+    repo.create_enrollment(b, full)
+    repo.create_enrollment(a, taken)
+
+    outcomes = repo.enroll_in_courses(a, [open_course, full, taken, 99, open_course])
+    assert outcomes[0] is None
+    assert isinstance(outcomes[1], CourseFullError)
+    assert isinstance(outcomes[2], DuplicateKeyError)
+    assert str(outcomes[3]) == "Course not found"
+    assert isinstance(outcomes[4], DuplicateKeyError)
+    assert [e["course_id"] for e in repo.list_enrollments(user_id=a)] == [taken]
+    assert repo.get_waitlist(full) == []
+    with pytest.raises(NotFoundError):
+        repo.enroll_in_courses(99, [open_course])
+
+# -------------------------
+# STATS
+# -------------------------
+
+def test_stats_follow_every_write_path(repo):
+    users = [repo.create_user(f"U{i}", f"u{i}@test.com", "student")["id"] for i in range(4)]
+    repo.create_user("Root", "root@test.com", "admin")
+    math = repo.create_course("Math", "MATH101", capacity=1)["id"]
+    art = repo.create_course("Art", "ART101")["id"]
+    bio = repo.create_course("Bio", "BIO101")["id"]
+    repo.create_enrollment(users[0], math)
+    with pytest.raises(CourseFullError):
+        repo.create_enrollment(users[1], math)
+    repo.enroll_in_courses(users[0], [art, bio])
+    repo.create_enrollments([{"user_id": users[2], "course_id": art}])
+
+    stats = repo.enrollment_stats()
+    assert stats["users"] == {"total": 5, "by_role": {"student": 4, "admin": 1}}
+    assert stats["courses"] == 3 and stats["enrollments"] == 4
+    assert stats["courses_per_user"] == {0: 3, 1: 1, 3: 1}
+    assert stats["top_courses"] == [
+        {"id": art, "code": "ART101", "title": "Art", "enrolled": 2},
+        {"id": math, "code": "MATH101", "title": "Math", "enrolled": 1},
+        {"id": bio, "code": "BIO101", "title": "Bio", "enrolled": 1},
+    ]
+    assert [c["id"] for c in repo.enrollment_stats(top=1)["top_courses"]] == [art]
+
+    # dropping Math promotes users[1]; deleting Art cascades
+    repo.delete_enrollment(1)
+    repo.delete_course(art)
+    stats = repo.enrollment_stats()
+    assert stats["courses"] == 2 and stats["enrollments"] == 2
+    assert stats["courses_per_user"] == {0: 3, 1: 2}
+    assert [(c["id"], c["enrolled"]) for c in stats["top_courses"]] == [(math, 1), (bio, 1)]
+
+    repo.clear()
+    assert repo.enrollment_stats() == {
+        "users": {"total": 0, "by_role": {}}, "courses": 0, "enrollments": 0,
+        "courses_per_user": {}, "top_courses": [],
+    }
+
+# -------------------------
+# ASYNC FACADE
+# -------------------------
+
+def test_async_methods_share_state_and_errors(repo):
+    async def scenario():
+        aio = repo.aio
+        user = await aio.create_user("A", "a@test.com", "student")
+        course = await aio.create_course("Math", "MATH101", capacity=1)
+        enrollment = await aio.create_enrollment(user["id"], course["id"])
+        with pytest.raises(DuplicateKeyError):
+            await aio.create_enrollment(user["id"], course["id"])
+        pages = [page async for page in aio.iter_enrollments(batch_size=1)]
+        return user, enrollment, pages
+
+    user, enrollment, pages = asyncio.run(scenario())
+    assert repo.get_user(user["id"]) == user
+    assert pages == [[enrollment]]
+    assert repo.aio is repo.aio
+
+# -------------------------
+# SQLITE SPECIFICS
+# -------------------------
+
+def test_sqlite_data_survives_reopen(tmp_path):
+    path = str(tmp_path / "durable.db")
+    first = SQLiteRepository(path)
+    user = first.create_user("A", "a@test.com", "student")
+    first.close()
+
+    second = SQLiteRepository(path)
+    assert second.get_user(user["id"]) == user
+    second.close()
+
+def test_sqlite_uses_wal(tmp_path):
+    path = str(tmp_path / "wal.db")
+    SQLiteRepository(path).close()
+    mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+def test_sqlite_adds_capacity_to_older_files(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                            email TEXT NOT NULL, email_key TEXT NOT NULL, role TEXT NOT NULL);
+        CREATE TABLE courses (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, code TEXT NOT NULL);
+        CREATE TABLE enrollments (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                                  course_id INTEGER NOT NULL);
+        INSERT INTO users (name, email, email_key, role) VALUES ('A', 'a@test.com', 'a@test.com', 'student');
+        INSERT INTO courses (title, code) VALUES ('Math', 'MATH101');
+        INSERT INTO enrollments (user_id, course_id) VALUES (1, 1);
+    """)
+    conn.close()
+
+    repo = SQLiteRepository(path)
+    assert repo.get_course(1)["capacity"] is None
+    assert repo._connect().execute("SELECT enrolled FROM courses WHERE id = 1").fetchone()[0] == 1
+    repo.close()
+
+def test_sqlite_backfills_stats_for_older_files(tmp_path):
+    path = str(tmp_path / "old.db")
+    first = SQLiteRepository(path)
+    users = [first.create_user(f"U{i}", f"u{i}@test.com", "student")["id"] for i in range(3)]
+    course = first.create_course("Math", "MATH101")["id"]
+    first.create_enrollment(users[0], course)
+    expected = first.enrollment_stats()
+    conn = first._connect()
+    conn.execute("DROP TRIGGER stats_user_insert")
+    conn.execute("DELETE FROM counters WHERE name != 'catalog_version'")
+    conn.commit()
+    first.close()
+
+    second = SQLiteRepository(path)
+    assert second.enrollment_stats() == expected
+    assert expected["courses_per_user"] == {0: 2, 1: 1}
+    second.close()
+
+def test_sqlite_indexes_courses_of_older_files_for_search(tmp_path):
+    path = str(tmp_path / "old.db")
+    first = SQLiteRepository(path)
+    course = first.create_course("Intro to Biology", "BIO-101")["id"]
+    conn = first._connect()
+    conn.execute("DROP TABLE course_tokens")
+    conn.commit()
+    first.close()
+
+    second = SQLiteRepository(path)
+    assert [c["id"] for c in second.search_courses("intro bio")] == [course]
+    assert [c["id"] for c in second.search_courses("bio1")] == [course]
+    second.close()
+
+# -------------------------
+# JOURNAL SPECIFICS
+# -------------------------
+
+def fill_journal(repo):
+    users = [repo.create_user(f"U{i}", f"u{i}@test.com", "student")["id"] for i in range(3)]
+    course = repo.create_course("Math", "MATH101", capacity=1)["id"]
+    repo.create_enrollment(users[0], course)
+    for user_id in users[1:]:
+        with pytest.raises(CourseFullError):
+            repo.create_enrollment(user_id, course)
+    return users, course
+
+def journal_files(directory):
+    return sorted(p.name for p in directory.iterdir())
+
+def test_journal_replays_writes_on_reopen(tmp_path):
+    first = JournaledRepository(str(tmp_path))
+    users, course = fill_journal(first)
+    first.delete_enrollment(1)  # promotes users[1]
+    first.close()
+
+    second = JournaledRepository(str(tmp_path))
+    assert [e["user_id"] for e in second.list_enrollments()] == [users[1]]
+    assert second.get_waitlist(course) == [users[2]]
+    assert second.create_user("New", "new@test.com", "student")["id"] == 4
+    with pytest.raises(DuplicateKeyError):
+        second.create_user("Dup", "U0@test.com", "student")
+    second.close()
+
+def test_journal_snapshot_plus_tail(tmp_path):
+    first = JournaledRepository(str(tmp_path))
+    users, course = fill_journal(first)
+    seq = first.snapshot()
+    first.update_course(course, title="Maths")
+    first.close()
+    assert journal_files(tmp_path) == [f"journal-{seq:08d}.log", f"snapshot-{seq:08d}.bin"]
+
+    second = JournaledRepository(str(tmp_path))
+    assert second.get_course(course)["title"] == "Maths"
+    assert second.get_waitlist(course) == users[1:]
+    assert second.catalog_version() == first.catalog_version()
+    assert second.list_users() == first.list_users()
+    assert second.enrollment_stats() == first.enrollment_stats()
+    second.close()
+
+def test_journal_snapshots_every_n_writes(tmp_path):
+    repo = JournaledRepository(str(tmp_path), snapshot_every=5)
+    for i in range(12):
+        repo.create_user(f"U{i}", f"u{i}@test.com", "student")
+    repo.close()
+    assert any(name.startswith("snapshot-") for name in journal_files(tmp_path))
+
+    reopened = JournaledRepository(str(tmp_path))
+    assert len(reopened.list_users()) == 12
+    reopened.close()
+
+def test_journal_drops_torn_tail(tmp_path):
+    first = JournaledRepository(str(tmp_path))
+    first.create_user("A", "a@test.com", "student")
+    first.close()
+    segment = tmp_path / journal_files(tmp_path)[-1]
+    intact = segment.stat().st_size
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00partial")
+
+    second = JournaledRepository(str(tmp_path))
+    assert [u["name"] for u in second.list_users()] == ["A"]
+    assert segment.stat().st_size == intact
+    second.create_user("B", "b@test.com", "student")
+    second.close()
+
+    third = JournaledRepository(str(tmp_path))
+    assert [u["name"] for u in third.list_users()] == ["A", "B"]
+    third.close()
+
+@pytest.mark.parametrize("fsync", ["interval", "off"])
+def test_journal_relaxed_fsync_flushes_on_close(tmp_path, fsync):
+    first = JournaledRepository(str(tmp_path), fsync=fsync, interval=60)
+    first.create_user("A", "a@test.com", "student")
+    assert first.journal.durable == 0  # nothing waited for the disk
+    first.close()
+
+    second = JournaledRepository(str(tmp_path))
+    assert len(second.list_users()) == 1
+    second.close()
+
+def test_journal_rejects_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        JournaledRepository(str(tmp_path), fsync="sometimes")
+
+def test_journal_group_commits_concurrent_writers(tmp_path, monkeypatch):
+    import time
+    from app.storage import journal
+
+    syncs = []
+    real_fsync = journal.os.fsync
+
+    def slow_fsync(fd):
+        syncs.append(fd)
+        time.sleep(0.005)
+        real_fsync(fd)
+
+    repo = JournaledRepository(str(tmp_path))
+    monkeypatch.setattr(journal.os, "fsync", slow_fsync)
+
+    async def writers():
+        await asyncio.gather(*(repo.aio.create_user(f"U{i}", f"u{i}@test.com", "student") for i in range(200)))
+
+    asyncio.run(writers())
+    assert repo.journal.durable == repo.journal.appended == 200
+    assert len(syncs) < 200
+    repo.close()
+
+def test_journal_async_writes_wait_for_the_lock_off_the_loop(tmp_path):
+    import threading
+
+    repo = JournaledRepository(str(tmp_path))
+    repo.create_user("A", "a@test.com", "student")
+    held, release = threading.Event(), threading.Event()
+
+    def snapshotting():
+        # as snapshot() does while it copies the state
+        with repo._write_lock:
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=snapshotting)
+    thread.start()
+    held.wait()
+
+    async def scenario():
+        write = asyncio.ensure_future(repo.aio.create_user("B", "b@test.com", "student"))
+        await asyncio.sleep(0.01)
+        names = [u["name"] for u in await repo.aio.list_users()]
+        done = write.done()
+        release.set()
+        return names, done, await write
+
+    names, done, created = asyncio.run(scenario())
+    thread.join()
+    assert names == ["A"] and not done
+    assert created["name"] == "B"
+    repo.close()
@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+ADMIN = {"X-User-Role": "admin"}
+STUDENT = {"X-User-Role": "student"}
+
+
+def create_user(name, email, role="student"):
+    res = client.post("/api/v1/users/", json={"name": name, "email": email, "role": role})
+    return res.json()["id"]
+
+def create_course(title, code):
+    res = client.post("/api/v1/courses/", json={"title": title, "code": code}, headers=ADMIN)
+    return res.json()["id"]
+
+def enroll(user_id, course_id):
+    res = client.post("/api/v1/enrollments/", json={"user_id": user_id, "course_id": course_id}, headers=STUDENT)
+    assert res.status_code == 201
+
+# -------------------------
+# STATS
+# -------------------------
+
+def test_stats_report_counts_and_top_courses():
+    create_user("Admin", "admin@test.com", "admin")
+    ada = create_user("Ada", "ada@test.com")
+    bob = create_user("Bob", "bob@test.com")
+    math = create_course("Math", "MATH101")
+    art = create_course("Art", "ART101")
+    enroll(ada, math)
+    enroll(bob, math)
+    enroll(ada, art)
+
+    res = client.get("/api/v1/stats", headers=ADMIN)
+    assert res.status_code == 200
+    assert res.json() == {
+        "users": {"total": 3, "by_role": {"admin": 1, "student": 2}},
+        "courses": 2,
+        "enrollments": 3,
+        "courses_per_user": {"0": 1, "1": 1, "2": 1},
+        "top_courses": [
+            {"id": math, "code": "MATH101", "title": "Math", "enrolled": 2},
+            {"id": art, "code": "ART101", "title": "Art", "enrolled": 1},
+        ],
+    }
+    top = client.get("/api/v1/stats", params={"top": 1}, headers=ADMIN).json()["top_courses"]
+    assert [c["id"] for c in top] == [math]
+
+def test_stats_are_admin_only():
+    res = client.get("/api/v1/stats", headers=STUDENT)
+    assert res.status_code == 403
+
+def test_stats_top_is_bounded():
+    assert client.get("/api/v1/stats", params={"top": 0}, headers=ADMIN).status_code == 422
+    assert client.get("/api/v1/stats", params={"top": 101}, headers=ADMIN).status_code == 422
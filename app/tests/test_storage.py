@@ -0,0 +1,232 @@
+import time
+import pytest
+from app.storage import Table, EnrollmentStore, UniqueIndex, DuplicateKeyError, normalize_email
+from app.storage.memory import SortedIndex, CountBuckets
+
+# -------------------------
+# HELPERS
+# -------------------------
+def make_users():
+    return Table(email=UniqueIndex("email", normalize=normalize_email))
+
+# -------------------------
+# UNIQUE INDEXES
+# -------------------------
+
+def test_find_uses_casefolded_email():
+    users = make_users()
+    users.insert({"id": 1, "name": "A", "email": "Ada@Test.com", "role": "student"})
+    assert users.find("email", "ada@test.com")["id"] == 1
+    assert users.find("email", "ADA@TEST.COM")["id"] == 1
+    assert users.find("email", "bob@test.com") is None
+
+def test_insert_rejects_duplicate_key():
+    users = make_users()
+    users.insert({"id": 1, "name": "A", "email": "a@test.com", "role": "student"})
+    with pytest.raises(DuplicateKeyError):
+        users.insert({"id": 2, "name": "B", "email": "A@test.com", "role": "student"})
+    assert len(users) == 1
+
+def test_update_moves_index_entry():
+    users = make_users()
+    users.insert({"id": 1, "name": "A", "email": "a@test.com", "role": "student"})
+    users.update(1, email="new@test.com")
+    assert users.find("email", "a@test.com") is None
+    assert users.find("email", "new@test.com")["id"] == 1
+
+def test_update_to_taken_key_leaves_record_untouched():
+    users = make_users()
+    users.insert({"id": 1, "name": "A", "email": "a@test.com", "role": "student"})
+    users.insert({"id": 2, "name": "B", "email": "b@test.com", "role": "student"})
+    with pytest.raises(DuplicateKeyError):
+        users.update(2, email="a@test.com")
+    assert users[2]["email"] == "b@test.com"
+    assert users.find("email", "b@test.com")["id"] == 2
+
+def test_delete_frees_key():
+    users = make_users()
+    users.insert({"id": 1, "name": "A", "email": "a@test.com", "role": "student"})
+    users.delete(1)
+    assert users.find("email", "a@test.com") is None
+    users.insert({"id": 2, "name": "A", "email": "a@test.com", "role": "student"})
+    assert users.find("email", "a@test.com")["id"] == 2
+
+# -------------------------
+# COMPOSITE & ADJACENCY INDEXES
+# -------------------------
+def make_enrollments():
+    return Table(
+        user_course=UniqueIndex(("user_id", "course_id")),
+        user_id=SortedIndex("user_id"),
+        course_id=SortedIndex("course_id"),
+    )
+
+def test_composite_index_rejects_same_pair():
+    enrollments = make_enrollments()
+    enrollments.insert({"id": 1, "user_id": 1, "course_id": 1})
+    enrollments.insert({"id": 2, "user_id": 1, "course_id": 2})
+    assert enrollments.find("user_course", (1, 2))["id"] == 2
+    with pytest.raises(DuplicateKeyError):
+        enrollments.insert({"id": 3, "user_id": 1, "course_id": 1})
+
+def test_adjacency_lists_follow_deletes():
+    enrollments = make_enrollments()
+    enrollments.insert({"id": 1, "user_id": 1, "course_id": 1})
+    enrollments.insert({"id": 2, "user_id": 1, "course_id": 2})
+    enrollments.insert({"id": 3, "user_id": 2, "course_id": 1})
+
+    assert [e["id"] for e in enrollments.find_all("user_id", 1)] == [1, 2]
+    assert [e["id"] for e in enrollments.find_all("course_id", 1)] == [1, 3]
+
+    enrollments.delete(1)
+    assert [e["id"] for e in enrollments.find_all("user_id", 1)] == [2]
+    assert [e["id"] for e in enrollments.find_all("course_id", 1)] == [3]
+    assert enrollments.find("user_course", (1, 1)) is None
+    assert enrollments.find_all("user_id", 99) == []
+
+def test_delete_many_skips_missing_ids():
+    enrollments = make_enrollments()
+    for i, course_id in enumerate([1, 1, 2], start=1):
+        enrollments.insert({"id": i, "user_id": i, "course_id": course_id})
+    removed = enrollments.delete_many([1, 2, 99])
+    assert [e["id"] for e in removed] == [1, 2]
+    assert enrollments.find_all("course_id", 1) == []
+    assert [e["id"] for e in enrollments.find_all("course_id", 2)] == [3]
+
+# -------------------------
+# KEYSET SCANS
+# -------------------------
+
+def test_scan_seeks_past_cursor_and_skips_deleted():
+    table = Table()
+    for _ in range(10):
+        table.create()
+    table.delete(4)
+    table.delete(5)
+    assert [r["id"] for r in table.scan(after=3, limit=3)] == [6, 7, 8]
+    assert [r["id"] for r in table.scan(after=8)] == [9, 10]
+    assert table.scan(after=10, limit=5) == []
+
+def test_scan_after_compaction():
+    table = Table()
+    for _ in range(3000):
+        table.create()
+    for i in range(1, 2990):
+        table.delete(i)
+    assert len(table.order) < 3000
+    assert [r["id"] for r in table.scan(after=2990, limit=5)] == [2991, 2992, 2993, 2994, 2995]
+
+# -------------------------
+# COMPACT ENROLLMENT STORE
+# -------------------------
+
+def test_enrollment_store_matches_table_interface():
+    store = EnrollmentStore()
+    for user_id, course_id in [(1, 1), (1, 2), (2, 1)]:
+        store.create(user_id=user_id, course_id=course_id)
+    assert store.get(2) == {"id": 2, "user_id": 1, "course_id": 2}
+    assert store.find("user_course", (2, 1))["id"] == 3
+    assert store.count("course_id", 1) == 2
+    assert [e["id"] for e in store.find_all("user_id", 1)] == [1, 2]
+    assert [e["id"] for e in store.find_all("course_id", 1, after=1)] == [3]
+    assert [e["id"] for e in store.scan(after=1, limit=1)] == [2]
+    with pytest.raises(DuplicateKeyError):
+        store.create(user_id=1, course_id=1)
+
+def test_enrollment_store_reuses_freed_rows():
+    store = EnrollmentStore()
+    for course_id in range(1, 4):
+        store.create(user_id=1, course_id=course_id)
+    assert store.delete(2)["course_id"] == 2
+    created = store.create(user_id=2, course_id=2)
+
+    # the freed row is recycled but the id is new; the old id stays gone
+    assert created["id"] == 4
+    assert len(store.ids) == 3
+    assert store.get(2) is None
+    assert 2 not in store
+    assert store.get(4) == created
+    assert [e["id"] for e in store.scan()] == [1, 3, 4]
+    assert [e["id"] for e in store.find_all("course_id", 2)] == [4]
+    assert store.find("user_course", (1, 2)) is None
+
+def test_enrollment_store_delete_many():
+    store = EnrollmentStore()
+    for i in range(3000):
+        store.create(user_id=i, course_id=0 if i < 2900 else 1)
+    removed = store.delete_many(store.find_ids("course_id", 0) + [99999])
+    assert len(removed) == 2900
+    assert len(store) == 100
+    assert store.count("course_id", 0) == 0
+    assert [e["id"] for e in store.scan(after=2995)] == [2996, 2997, 2998, 2999, 3000]
+    with pytest.raises(KeyError):
+        store.delete(1)
+
+def test_enrollment_store_delete_many_keeps_order_and_counts():
+    store = EnrollmentStore()
+    for user_id in range(1, 5):
+        for course_id in range(1, 4):
+            store.create(user_id=user_id, course_id=course_id)
+    # drop every enrollment of user 2 plus one of course 3
+    store.delete_many([e["id"] for e in store.find_all("user_id", 2)] + [12, 12])
+    assert [e["id"] for e in store.find_all("course_id", 3)] == [3, 9]
+    assert [e["id"] for e in store.find_all("course_id", 1, after=1)] == [7, 10]
+    assert store.find_all("user_id", 2) == []
+    assert store.counts(3) == ([(1, 3), (2, 3), (3, 2)], {3: 2, 2: 1})
+    store.delete(7)
+    assert [e["id"] for e in store.find_all("course_id", 1)] == [1, 10]
+
+def cascade_seconds(rows):
+    store = EnrollmentStore()
+    for user_id in range(rows):
+        store.create(user_id=user_id, course_id=1)
+    start = time.perf_counter()
+    store.delete_many(store.find_ids("course_id", 1))
+    elapsed = time.perf_counter() - start
+    assert len(store) == 0 and store.by_user == {} and store.by_course == {}
+    return elapsed
+
+def test_enrollment_store_cascade_is_linear():
+    # one course holding every row: removing rows one at a time from its
+    # adjacency list was quadratic (4x the rows, ~16x the time)
+    small, large = cascade_seconds(20_000), cascade_seconds(80_000)
+    assert large < small * 8
+
+def test_enrollment_store_snapshot_rebuilds_adjacency():
+    store = EnrollmentStore()
+    for user_id, course_id in [(1, 1), (2, 1), (1, 2), (3, 2), (2, 2)]:
+        store.create(user_id=user_id, course_id=course_id)
+    store.delete(2)
+    store.create(user_id=3, course_id=1)  # reuses row 1, with a later id
+    state = store.dump_state()
+    assert "by_user" not in state and "by_course" not in state
+
+    copy = EnrollmentStore()
+    copy.load_state(state)
+    for index, key in [("user_id", 1), ("user_id", 2), ("user_id", 3), ("course_id", 1), ("course_id", 2)]:
+        assert copy.find_all(index, key) == store.find_all(index, key)
+    assert [e["id"] for e in copy.find_all("course_id", 1)] == [1, 6]
+    assert copy.counts(5) == store.counts(5)
+    assert copy.create(user_id=4, course_id=1)["id"] == 7
+
+def test_count_buckets_rank_ties_by_key():
+    counts = CountBuckets()
+    for key, n in [(5, 2), (3, 2), (9, 1), (1, 3), (4, 2)]:
+        counts.move(key, 0, n)
+    assert counts.top(4) == [(1, 3), (3, 2), (4, 2), (5, 2)]
+    counts.move(3, 2, 3)
+    counts.move(1, 3, 2)
+    assert counts.top(10) == [(3, 3), (1, 2), (4, 2), (5, 2), (9, 1)]
+
+def top_seconds(tied):
+    counts = CountBuckets()
+    for key in range(tied, 0, -1):
+        counts.move(key, 0, 30)
+    start = time.perf_counter()
+    for _ in range(2_000):
+        assert counts.top(10)[0] == (1, 30)
+    return time.perf_counter() - start
+
+def test_count_buckets_top_reads_k_keys_however_many_tie():
+    # a full bucket used to be scanned by heapq.nsmallest (100x the ties, ~100x the time)
+    assert top_seconds(200_000) < top_seconds(2_000) * 5
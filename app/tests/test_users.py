@@ -1,86 +1,149 @@
-
-from fastapi.testclient import TestClient
-from app.main import app
-import pytest
-
-client = TestClient(app)
-
-# -------------------------
-# CREATE USERS
-# -------------------------
-
-def test_create_student():
-    res = client.post(
-        "/api/v1/users/",
-        json={"name": "Student One", "email": "student1@test.com", "role": "student"}
-    )
-    assert res.status_code == 201
-    data = res.json()
-    assert data["name"] == "Student One"
-    assert data["email"] == "student1@test.com"
-    assert data["role"] == "student"
-    assert "id" in data
-
-
-def test_create_admin():
-    res = client.post(
-        "/api/v1/users/",
-        json={"name": "Admin User", "email": "admin@test.com", "role": "admin"}
-    )
-    assert res.status_code == 201
-    data = res.json()
-    assert data["role"] == "admin"
-
-
-def test_create_user_invalid_data():
-    # Missing name
-    res = client.post("/api/v1/users/", json={"email": "bad@test.com", "role": "student"})
-    assert res.status_code == 422
-
-    # Missing email
-    res = client.post("/api/v1/users/", json={"name": "NoEmail", "role": "student"})
-    assert res.status_code == 422
-
-    # Invalid role
-    res = client.post("/api/v1/users/", json={"name": "InvalidRole", "email": "role@test.com", "role": "manager"})
-    assert res.status_code == 422
-
-
-def test_create_user_duplicate_email():
-    # Create initial user
-    client.post("/api/v1/users/", json={"name": "DupUser", "email": "dup@test.com", "role": "student"})
-    
-    # Try creating user with same email
-    res = client.post("/api/v1/users/", json={"name": "DupUser2", "email": "dup@test.com", "role": "student"})
-    assert res.status_code == 400
-    assert "email" in res.json()["detail"].lower()
-
-
-# -------------------------
-# GET USERS
-# -------------------------
-
-def test_get_all_users():
-    res = client.get("/api/v1/users/")
-    assert res.status_code == 200
-    data = res.json()
-    assert isinstance(data, list)
-    assert all("id" in user and "name" in user for user in data)
-
-
-def test_get_user_by_id():
-    # First create a user
-    create_res = client.post("/api/v1/users/", json={"name": "SingleUser", "email": "single@test.com", "role": "student"})
-    user_id = create_res.json()["id"]
-
-    res = client.get(f"/api/v1/users/{user_id}")
-    assert res.status_code == 200
-    data = res.json()
-    assert data["id"] == user_id
-    assert data["name"] == "SingleUser"
-
-
-def test_get_user_not_found():
-    res = client.get("/api/v1/users/9999")  # ID that doesn't exist
-    assert res.status_code == 404
-    assert "not found" in res.json()["detail"].lower()
+
+from fastapi.testclient import TestClient
+from app.main import app
+import pytest
+
+client = TestClient(app)
+
+# -------------------------
+# CREATE USERS
+# -------------------------
+
+def test_create_student():
+    res = client.post(
+        "/api/v1/users/",
+        json={"name": "Student One", "email": "student1@test.com", "role": "student"}
+    )
+    assert res.status_code == 201
+    data = res.json()
+    assert data["name"] == "Student One"
+    assert data["email"] == "student1@test.com"
+    assert data["role"] == "student"
+    assert "id" in data
+
+
+def test_create_admin():
+    res = client.post(
+        "/api/v1/users/",
+        json={"name": "Admin User", "email": "admin@test.com", "role": "admin"}
+    )
+    assert res.status_code == 201
+    data = res.json()
+    assert data["role"] == "admin"
+
+
+def test_create_user_invalid_data():
+    # Missing name
+    res = client.post("/api/v1/users/", json={"email": "bad@test.com", "role": "student"})
+    assert res.status_code == 422
+
+    # Missing email
+    res = client.post("/api/v1/users/", json={"name": "NoEmail", "role": "student"})
+    assert res.status_code == 422
+
+    # Invalid role
+    res = client.post("/api/v1/users/", json={"name": "InvalidRole", "email": "role@test.com", "role": "manager"})
+    assert res.status_code == 422
+
+
+def test_create_user_duplicate_email():
+    # Create initial user
+    client.post("/api/v1/users/", json={"name": "DupUser", "email": "dup@test.com", "role": "student"})
+    
+    # Try creating user with same email
+    res = client.post("/api/v1/users/", json={"name": "DupUser2", "email": "dup@test.com", "role": "student"})
+    assert res.status_code == 400
+    assert "email" in res.json()["detail"].lower()
+
+
+def test_create_user_duplicate_email_is_case_insensitive():
+    client.post("/api/v1/users/", json={"name": "Case", "email": "case@test.com", "role": "student"})
+
+    res = client.post("/api/v1/users/", json={"name": "Case2", "email": "CASE@Test.com", "role": "student"})
+    assert res.status_code == 400
+
+
+# -------------------------
+# GET USERS
+# -------------------------
+
+def test_get_all_users():
+    res = client.get("/api/v1/users/")
+    assert res.status_code == 200
+    data = res.json()
+    assert isinstance(data, list)
+    assert all("id" in user and "name" in user for user in data)
+
+
+def test_get_user_by_id():
+    # First create a user
+    create_res = client.post("/api/v1/users/", json={"name": "SingleUser", "email": "single@test.com", "role": "student"})
+    user_id = create_res.json()["id"]
+
+    res = client.get(f"/api/v1/users/{user_id}")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["id"] == user_id
+    assert data["name"] == "SingleUser"
+
+
+def test_get_user_not_found():
+    res = client.get("/api/v1/users/9999")  # ID that doesn't exist
+    assert res.status_code == 404
+    assert "not found" in res.json()["detail"].lower()
+
+
+def test_list_body_matches_response_schema():
+    # rows are encoded as stored, without the response_model pass; the body
+    # must still be exactly what list[User] would have produced
+    from pydantic import TypeAdapter
+    from app.schemas import User
+
+    client.post("/api/v1/users/", json={"name": "Shape", "email": "Shape@Test.com", "role": "admin"})
+    data = client.get("/api/v1/users/").json()
+    assert data
+    assert TypeAdapter(list[User]).dump_python(TypeAdapter(list[User]).validate_python(data), mode="json") == data
+
+
+def test_list_schema_is_still_documented():
+    schema = client.get("/api/v1/openapi.json").json()
+    ok = schema["paths"]["/api/v1/users/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert ok["items"]["$ref"].endswith("/User")
+
+
+# -------------------------
+# FILTER USERS
+# -------------------------
+
+def test_filter_users_by_role_email_and_name():
+    for name, email, role in [
+        ("Ada Lovelace", "ada@uni.edu", "admin"),
+        ("Adam Smith", "Adam@uni.edu", "student"),
+        ("Grace Hopper", "grace@navy.mil", "student"),
+        ("Madame Curie", "marie@uni.edu", "student"),
+    ]:
+        client.post("/api/v1/users/", json={"name": name, "email": email, "role": role})
+
+    def names(**params):
+        res = client.get("/api/v1/users/", params=params)
+        assert res.status_code == 200
+        return [u["name"] for u in res.json()]
+
+    assert names(role="admin") == ["Ada Lovelace"]
+    assert names(email_prefix="AD") == ["Ada Lovelace", "Adam Smith"]
+    assert names(role="student", email_prefix="ad") == ["Adam Smith"]
+    assert names(name_contains="ADA") == ["Ada Lovelace", "Adam Smith", "Madame Curie"]
+    assert names(role="student", name_contains="ada") == ["Adam Smith", "Madame Curie"]
+    assert names(email_prefix="nobody") == []
+    assert names(email_prefix="\U0010ffff") == []
+
+    res = client.get("/api/v1/users/", params={"role": "student", "limit": 2})
+    assert len(res.json()) == 2
+    rest = client.get("/api/v1/users/", params={"role": "student", "after": res.headers["X-Next-Cursor"]})
+    assert [u["name"] for u in rest.json()] == ["Madame Curie"]
+
+
+def test_filter_users_validates_params():
+    assert client.get("/api/v1/users/", params={"role": "teacher"}).status_code == 422
+    assert client.get("/api/v1/users/", params={"email_prefix": ""}).status_code == 422
+
@@ -0,0 +1,114 @@
+"""
+Per-request cost of bearer-token authentication, in-process (no socket).
+
+Times GET /api/v1/enrollments/?limit=20 for a student with a few
+enrollments, authenticated three ways: trusted X-User-Role/X-User-Id
+headers (no verification at all, the old behaviour), a bearer token that's
+already in the verified-token cache, and a bearer token verified from
+scratch on every request (cache cleared first). The modes take turns in
+ROUNDS so drift in machine speed hits them all alike. Then times
+Authenticator.verify() alone, cached and uncached, across many users.
+
+    python -m benchmarks.bench_auth [samples]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from app import storage
+from app.auth import authenticator
+from app.main import app
+from app.ratelimit import limiter
+from benchmarks.client import asgi_request
+
+SAMPLES = 5_000
+ROUNDS = 5
+STUDENTS = 10_000
+COURSES = 100
+PATH = "/api/v1/enrollments/?limit=20"
+
+
+def seed():
+    storage.reset()
+    repo = storage.get_repository()
+    repo.create_users([{"name": f"S{i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(STUDENTS)])
+    repo.create_courses([{"title": f"Course {i}", "code": f"C{i}"} for i in range(COURSES)])
+    repo.create_enrollments([
+        {"user_id": u, "course_id": (u + k) % COURSES + 1} for u in range(1, STUDENTS + 1) for k in range(3)
+    ])
+
+
+def summarize(timings):
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+async def timed(samples, headers, before=None, offset=0):
+    timings = []
+    for i in range(offset, offset + samples):
+        user_id = i % STUDENTS + 1
+        if before:
+            before()
+        start = time.perf_counter()
+        status, _ = await asgi_request(app, "GET", PATH, headers(user_id))
+        timings.append((time.perf_counter() - start) * 1000)
+        assert status == 200, status
+    return timings
+
+
+def verify_timings(tokens, samples, cold):
+    timings = []
+    for i in range(samples):
+        token = tokens[i % len(tokens)]
+        if cold:
+            authenticator.clear()
+        start = time.perf_counter()
+        authenticator.verify(token)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return summarize(timings)
+
+
+def run(samples=SAMPLES):
+    limiter.enabled = False
+    seed()
+    tokens = {u: authenticator.mint(u, "student")[0] for u in range(1, STUDENTS + 1)}
+
+    def trusted(user_id):
+        return {"X-User-Role": "student", "X-User-Id": str(user_id)}
+
+    def token(user_id):
+        return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    print(f"{'request auth':<22} {'median ms':>10} {'p99 ms':>10}")
+    authenticator.trust_headers = True
+    modes = [
+        ("trusted headers", trusted, None),
+        ("bearer, cached", token, None),
+        ("bearer, uncached", token, authenticator.clear),
+    ]
+    timings = {name: [] for name, _, _ in modes}
+    per_round = max(1, samples // ROUNDS)
+    for name, headers, before in modes:
+        asyncio.run(timed(min(samples, STUDENTS), headers, before))  # warm up (and fill the cache)
+    for r in range(ROUNDS):
+        for name, headers, before in modes:
+            timings[name] += asyncio.run(timed(per_round, headers, before, offset=r * per_round))
+    for name, _, _ in modes:
+        median, p99 = summarize(timings[name])
+        print(f"{name:<22} {median:>10.3f} {p99:>10.3f}")
+    authenticator.trust_headers = False
+
+    print(f"\n{'verify()':<22} {'median µs':>10} {'p99 µs':>10}")
+    all_tokens = list(tokens.values())
+    for t in all_tokens:
+        authenticator.verify(t)
+    for name, cold in (("cached", False), ("uncached (HMAC)", True)):
+        median, p99 = verify_timings(all_tokens, samples, cold)
+        print(f"{name:<22} {median:>10.2f} {p99:>10.2f}")
+    authenticator.clear()
+    storage.reset()
+
+
+if __name__ == "__main__":
+    run(*(int(a) for a in sys.argv[1:]))
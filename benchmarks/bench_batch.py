@@ -0,0 +1,68 @@
+"""
+Term registration: K single-course enrollments per student vs. one batch.
+
+Seeds the configured repository directly (STORAGE_BACKEND), then registers
+every student in COURSES_PER_STUDENT courses through the TestClient, once
+with POST /api/v1/enrollments/ per course and once with a single
+POST /api/v1/enrollments/batch per student.
+
+    python -m benchmarks.bench_batch [students] [courses_per_student]
+"""
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+from benchmarks.client import use_header_roles
+
+STUDENTS = 2_000
+COURSES = 200
+COURSES_PER_STUDENT = 6
+
+
+def seed(students):
+    storage.reset()
+    repo = storage.get_repository()
+    repo.create_users([
+        {"name": f"Student {i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(students)
+    ])
+    repo.create_courses([{"title": f"Course {i}", "code": f"C{i}"} for i in range(COURSES)])
+
+
+def schedule(user_id, k):
+    return [(user_id * 7 + j) % COURSES + 1 for j in range(k)]
+
+
+def run(students=STUDENTS, k=COURSES_PER_STUDENT):
+    # one client IP registering everyone; measure the enrollment path, not the limiter
+    use_header_roles()
+    client = TestClient(app)
+    headers = {"X-User-Role": "student"}
+    print(f"{students:,} students x {k} courses, backend={type(storage.get_repository()).__name__}")
+    print(f"{'mode':<8} {'requests':>9} {'seconds':>8} {'ms/student':>11}")
+
+    seed(students)
+    start = time.perf_counter()
+    for user_id in range(1, students + 1):
+        for course_id in schedule(user_id, k):
+            res = client.post("/api/v1/enrollments/", json={"user_id": user_id, "course_id": course_id}, headers=headers)
+            assert res.status_code == 201, res.text
+    seconds = time.perf_counter() - start
+    print(f"{'single':<8} {students * k:>9,} {seconds:>8.2f} {seconds / students * 1000:>11.3f}")
+
+    seed(students)
+    start = time.perf_counter()
+    for user_id in range(1, students + 1):
+        body = {"user_id": user_id, "course_ids": schedule(user_id, k)}
+        res = client.post("/api/v1/enrollments/batch", json=body, headers=headers)
+        assert res.status_code == 201, res.text
+    seconds = time.perf_counter() - start
+    print(f"{'batch':<8} {students:>9,} {seconds:>8.2f} {seconds / students * 1000:>11.3f}")
+    storage.reset()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
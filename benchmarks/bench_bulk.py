@@ -0,0 +1,61 @@
+"""
+Bulk import throughput for POST /api/v1/{users,courses,enrollments}/bulk.
+
+Streams N NDJSON rows per endpoint through the TestClient and reports
+rows/second.
+
+    python -m benchmarks.bench_bulk [N]
+"""
+import json
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+from benchmarks.client import use_header_roles
+
+ROWS = 50_000
+COURSES = 200
+ADMIN = {"X-User-Role": "admin", "Content-Type": "application/x-ndjson"}
+
+
+def ndjson(rows):
+    # yielded in chunks so the body is streamed, not sent as one blob
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row))
+        if len(chunk) == 1000:
+            yield ("\n".join(chunk) + "\n").encode()
+            chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode()
+
+
+def post(client, path, rows, n):
+    start = time.perf_counter()
+    res = client.post(path, content=ndjson(rows), headers=ADMIN)
+    elapsed = time.perf_counter() - start
+    summary = json.loads(res.text.rstrip("\n").rsplit("\n", 1)[-1])["summary"]
+    assert res.status_code == 200 and summary["failed"] == 0, summary
+    print(f"{path:<28} {n:>8,} rows {elapsed:>8.2f} s {n / elapsed:>12,.0f} rows/s")
+
+
+def run(n=ROWS):
+    use_header_roles()
+    client = TestClient(app)
+    storage.reset()
+    post(client, "/api/v1/users/bulk", ({"name": f"S{i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(n)), n)
+    post(client, "/api/v1/courses/bulk", ({"title": f"Course {i}", "code": f"C{i}"} for i in range(COURSES)), COURSES)
+    post(
+        client,
+        "/api/v1/enrollments/bulk",
+        ({"user_id": i + 1, "course_id": i % COURSES + 1} for i in range(n)),
+        n,
+    )
+    storage.reset()
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,73 @@
+"""
+Enroll storm against one capped course.
+
+Fires thousands of concurrent POST /api/v1/enrollments/ at a 30-seat course
+and checks that exactly 30 students got a seat, everyone else was
+waitlisted in distinct positions, and nothing was oversubscribed. Prints
+the latency distribution for the storm.
+
+    python -m benchmarks.bench_capacity [attempts] [threads]
+"""
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+from benchmarks.client import use_header_roles
+
+SEATS = 30
+ATTEMPTS = 5_000
+THREADS = 64
+
+
+def run(attempts=ATTEMPTS, threads=THREADS):
+    storage.reset()
+    repo = storage.get_repository()
+    course_id = repo.create_course("Popular", "POP101", capacity=SEATS)["id"]
+    user_ids = [u["id"] for u in repo.create_users(
+        [{"name": f"S{i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(attempts)]
+    )]
+    # every attempt comes from one test client; this measures the seat logic, not the limiter
+    use_header_roles()
+    client = TestClient(app)
+    barrier = threading.Barrier(threads)
+
+    def attempt(i):
+        if i < threads:
+            barrier.wait()
+        start = time.perf_counter()
+        res = client.post(
+            "/api/v1/enrollments/",
+            json={"user_id": user_ids[i], "course_id": course_id},
+            headers={"X-User-Role": "student"},
+        )
+        return res.status_code, res.json(), (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(attempt, range(attempts)))
+    elapsed = time.perf_counter() - start
+
+    codes = [code for code, _, _ in results]
+    positions = sorted(body["position"] for code, body, _ in results if code == 202)
+    enrolled = len(repo.list_enrollments())
+    assert codes.count(201) == SEATS, codes.count(201)
+    assert enrolled == SEATS, f"oversubscribed: {enrolled} enrolled for {SEATS} seats"
+    assert positions == list(range(1, attempts - SEATS + 1))
+
+    timings = sorted(ms for _, _, ms in results)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{attempts} attempts on {threads} threads in {elapsed:.2f}s ({attempts / elapsed:,.0f} req/s)")
+    print(f"enrolled {enrolled}/{SEATS}, waitlisted {len(positions)}")
+    print(f"median {statistics.median(timings):.3f} ms, p99 {p99:.3f} ms, max {timings[-1]:.3f} ms")
+    storage.reset()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
@@ -0,0 +1,54 @@
+"""
+Catalog read latency: uncached render vs. cached bytes vs. 304 revalidation.
+
+Seeds N courses, then times GET /api/v1/courses/ three ways: right after a
+course write (cache miss, full serialization), repeated (cache hit) and
+with a matching If-None-Match (304, no body).
+
+    python -m benchmarks.bench_catalog [courses ...]
+"""
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+
+SIZES = [100, 1_000, 10_000]
+SAMPLES = 50
+
+
+def timed(fn, samples):
+    timings = []
+    for i in range(samples):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(sizes=SIZES, samples=SAMPLES):
+    client = TestClient(app)
+    print(f"{'courses':>10} {'miss ms':>10} {'hit ms':>10} {'304 ms':>10} {'body KB':>10}")
+    for n in sizes:
+        storage.reset()
+        repo = storage.get_repository()
+        repo.create_courses([{"title": f"Course {i}", "code": f"C{i}", "capacity": 30} for i in range(n)])
+
+        def miss(i):
+            repo.create_course(f"New {n}-{i}", f"NEW{n}-{i}")
+            assert client.get("/api/v1/courses/").status_code == 200
+
+        miss_ms = timed(miss, samples)
+        res = client.get("/api/v1/courses/")
+        hit_ms = timed(lambda i: client.get("/api/v1/courses/"), samples)
+        etag = {"If-None-Match": res.headers["ETag"]}
+        not_modified_ms = timed(lambda i: client.get("/api/v1/courses/", headers=etag), samples)
+        print(f"{n:>10} {miss_ms:>10.3f} {hit_ms:>10.3f} {not_modified_ms:>10.3f} {len(res.content) / 1024:>10.1f}")
+    storage.reset()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or SIZES)
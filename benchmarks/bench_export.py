@@ -0,0 +1,71 @@
+"""
+Memory use of the streaming enrollment export vs. the admin listing.
+
+Seeds N enrollments, then measures under tracemalloc the server-side work
+of each: draining the export's CSV generator (with user and course joins),
+and building + JSON-encoding the full admin listing the way
+GET /api/v1/enrollments/ does. (The TestClient buffers whole response
+bodies, so it can't show streaming memory.) The export's peak should stay
+flat as N grows; the listing's grows with N.
+
+    python -m benchmarks.bench_export [N ...]
+"""
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+
+from app import storage
+from app.export import export_columns, iter_export_rows, csv_chunks
+
+SIZES = [10_000, 100_000]
+COURSES = 100
+JOINS = ("user", "course")
+
+
+def seed(n):
+    storage.reset()
+    repo = storage.get_repository()
+    repo.create_courses([{"title": f"Course {i}", "code": f"C{i}"} for i in range(COURSES)])
+    repo.create_users([{"name": f"S{i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(n)])
+    repo.create_enrollments([{"user_id": i + 1, "course_id": i % COURSES + 1} for i in range(n)])
+    return repo
+
+
+def export(repo):
+    async def drain():
+        size = 0
+        async for chunk in csv_chunks(iter_export_rows(repo.aio, JOINS), export_columns(JOINS)):
+            size += len(chunk)
+        return size
+
+    return asyncio.run(drain())
+
+
+def listing(repo):
+    return len(json.dumps(repo.list_enrollments()).encode())
+
+
+def measure(fn, repo):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn(repo)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def run(sizes=SIZES):
+    print(f"{'rows':>10} {'mode':<10} {'seconds':>8} {'bytes out':>14} {'peak MiB':>9}")
+    for n in sizes:
+        repo = seed(n)
+        for label, fn in (("export", export), ("listing", listing)):
+            elapsed, size, peak = measure(fn, repo)
+            print(f"{n:>10} {label:<10} {elapsed:>8.2f} {size:>14,} {peak / 2**20:>9.1f}")
+    storage.reset()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,69 @@
+"""
+Cost of Idempotency-Key handling, in-process (no socket).
+
+Times POST /api/v1/enrollments/ three ways on one event loop: with no key,
+first attempts with a fresh key (the request runs and its response is
+kept), and retries of a kept key (the stored bytes are replayed without
+reaching the route). Retries should be far cheaper than either.
+
+    python -m benchmarks.bench_idempotency [samples]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from app import storage
+from app.idempotency import idempotency_cache
+from app.main import app
+from benchmarks.client import asgi_request, use_header_roles
+
+SAMPLES = 5_000
+COURSES = 100
+HEADERS = {"X-User-Role": "student", "Content-Type": "application/json"}
+
+
+def seed(students):
+    storage.reset()
+    idempotency_cache.clear()
+    repo = storage.get_repository()
+    repo.create_users([{"name": f"S{i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(students)])
+    repo.create_courses([{"title": f"Course {i}", "code": f"C{i}"} for i in range(COURSES)])
+
+
+def body(i):
+    return json.dumps({"user_id": i // COURSES + 1, "course_id": i % COURSES + 1}).encode()
+
+
+async def timed(requests):
+    timings = []
+    for headers, payload in requests:
+        start = time.perf_counter()
+        status, _ = await asgi_request(app, "POST", "/api/v1/enrollments/", headers, payload)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert status == 201, status
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def run(samples=SAMPLES):
+    use_header_roles()
+    students = samples // COURSES + 1
+    print(f"{'mode':<10} {'median ms':>10} {'p99 ms':>10}")
+    modes = [
+        ("no key", lambda i: HEADERS),
+        ("first", lambda i: {**HEADERS, "Idempotency-Key": f"k{i}"}),
+        ("retry", lambda i: {**HEADERS, "Idempotency-Key": f"k{i}"}),
+    ]
+    for name, headers in modes:
+        if name != "retry":
+            seed(students)
+        median, p99 = asyncio.run(timed((headers(i), body(i)) for i in range(samples)))
+        print(f"{name:<10} {median:>10.3f} {p99:>10.3f}")
+    storage.reset()
+    idempotency_cache.clear()
+
+
+if __name__ == "__main__":
+    run(*(int(a) for a in sys.argv[1:]))
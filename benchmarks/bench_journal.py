@@ -0,0 +1,127 @@
+"""
+Cost of durability for the journaled in-memory store (STORAGE_BACKEND=journal).
+
+write   concurrent single-row writes through the async facade (the route
+        path), per fsync policy, against the plain in-memory store
+restart seed N records (users + courses + enrollments, default 10M in
+        total), snapshot, append a journal tail, then time reopening: snapshot
+        load plus tail replay
+
+    python -m benchmarks.bench_journal write [writes] [concurrency]
+    python -m benchmarks.bench_journal restart [records] [tail]
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.storage import MemoryRepository, JournaledRepository
+
+WRITES = 20_000
+CONCURRENCY = 64
+RECORDS = 10_000_000
+TAIL = 100_000
+BATCH = 10_000
+COURSES = 1_000
+ENROLLMENTS_PER_USER = 9  # so records = users * (1 + 9) + courses
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+# ---------------- WRITE PATH ----------------
+
+async def hammer(repo, writes, concurrency):
+    counter = iter(range(writes))
+
+    async def worker():
+        for i in counter:
+            await repo.aio.create_user(f"U{i}", f"u{i}@bench.com", "student")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def write_path(writes=WRITES, concurrency=CONCURRENCY):
+    print(f"{writes:,} writes from {concurrency} concurrent coroutines")
+    print(f"{'store':<18} {'writes/s':>10} {'µs/write':>9} {'fsyncs':>7}")
+    seconds = asyncio.run(hammer(MemoryRepository(), writes, concurrency))
+    print(f"{'memory':<18} {writes / seconds:>10,.0f} {seconds / writes * 1e6:>9.1f} {'-':>7}")
+    for fsync in ("off", "interval", "always"):
+        root = tempfile.mkdtemp(prefix="bench-journal-")
+        try:
+            repo = JournaledRepository(root, fsync=fsync, snapshot_every=writes * 2)
+            seconds = asyncio.run(hammer(repo, writes, concurrency))
+            repo.close()
+            print(f"{'journal ' + fsync:<18} {writes / seconds:>10,.0f} {seconds / writes * 1e6:>9.1f} {repo.journal.syncs:>7,}")
+        finally:
+            shutil.rmtree(root)
+
+
+# ---------------- RESTART ----------------
+
+def seed(repo, records):
+    users = max(1, (records - COURSES) // (1 + ENROLLMENTS_PER_USER))
+    for start in range(0, users, BATCH):
+        repo.create_users([
+            {"name": f"Student {i}", "email": f"s{i}@bench.com", "role": "student"}
+            for i in range(start, min(users, start + BATCH))
+        ])
+    repo.create_courses([{"title": f"Course {i}", "code": f"C{i}"} for i in range(COURSES)])
+    pairs = ((u, (u + k) % COURSES + 1) for k in range(ENROLLMENTS_PER_USER) for u in range(1, users + 1))
+    batch = []
+    for user_id, course_id in pairs:
+        batch.append({"user_id": user_id, "course_id": course_id})
+        if len(batch) == BATCH:
+            repo.create_enrollments(batch)
+            batch = []
+    if batch:
+        repo.create_enrollments(batch)
+    return users
+
+
+def restart(records=RECORDS, tail=TAIL):
+    root = tempfile.mkdtemp(prefix="bench-journal-")
+    try:
+        repo = JournaledRepository(root, fsync="off", snapshot_every=sys.maxsize)
+        start = time.perf_counter()
+        users = seed(repo, records)
+        print(f"seeded {users:,} users, {COURSES:,} courses, {len(repo.enrollments):,} enrollments "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        # writes are held off only while the state is copied, not while it's pickled
+        start = time.perf_counter()
+        with repo._write_lock:
+            repo.dump_state()
+        print(f"snapshot write pause (state copy): {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        repo.snapshot()
+        print(f"snapshot written in {time.perf_counter() - start:.1f}s ({directory_size(root) / 1e6:,.0f} MB)")
+        for i in range(tail):
+            repo.create_user(f"Tail {i}", f"tail{i}@bench.com", "student")
+        repo.close()
+        del repo
+
+        start = time.perf_counter()
+        reopened = JournaledRepository(root)
+        elapsed = time.perf_counter() - start
+        print(f"restart: snapshot + {tail:,} journal records in {elapsed:.1f}s "
+              f"({len(reopened.users):,} users, {len(reopened.enrollments):,} enrollments)")
+        reopened.close()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    command, *args = sys.argv[1:] or ["write"]
+    if command == "write":
+        write_path(int(args[0]) if args else WRITES, int(args[1]) if len(args) > 1 else CONCURRENCY)
+    elif command == "restart":
+        restart(int(args[0]) if args else RECORDS, int(args[1]) if len(args) > 1 else TAIL)
+    else:
+        sys.exit(__doc__)
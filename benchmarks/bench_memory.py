@@ -0,0 +1,109 @@
+"""
+Bytes per enrollment: the dict-per-row Table the in-memory store used to
+keep enrollments in, vs. the compact EnrollmentStore.
+
+Inserts N enrollments (default 1,000,000) spread over students and courses
+the way a real term looks, with tracemalloc measuring everything the table
+and its indexes allocate, then times point reads and walks of
+courses' enrollment lists on each. Insert time includes tracemalloc's
+overhead, so compare it only between the two stores.
+
+    python -m benchmarks.bench_memory [N]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from app.storage import Table, EnrollmentStore, Index, UniqueIndex
+
+ROWS = 1_000_000
+STUDENTS_PER_ROW = 5  # N / 5 students, 5 courses each
+COURSES = 2_000
+READS = 100_000
+WALKS = 100
+
+
+class MultiIndex(Index):
+    """
+    Adjacency index mapping a key to the record ids that share it, in a
+    dict used as an insertion-ordered set: the per-row shape the
+    enrollments Table had before EnrollmentStore.
+    """
+
+    def __init__(self, field, normalize=None):
+        super().__init__(field, normalize)
+        self._ids = {}
+
+    def lookup(self, value):
+        return self._ids.get(self.key(value), {}).keys()
+
+    def count(self, value):
+        return len(self._ids.get(self.key(value), ()))
+
+    def add(self, record):
+        self._ids.setdefault(self.record_key(record), {})[record["id"]] = None
+
+    def discard(self, record):
+        key = self.record_key(record)
+        ids = self._ids.get(key)
+        if ids is not None:
+            ids.pop(record["id"], None)
+            if not ids:
+                del self._ids[key]
+
+    def clear(self):
+        self._ids.clear()
+
+
+def dict_table():
+    # the enrollments Table as MemoryRepository built it before EnrollmentStore
+    return Table(
+        user_course=UniqueIndex(("user_id", "course_id")),
+        user_id=MultiIndex("user_id"),
+        course_id=MultiIndex("course_id"),
+    )
+
+
+def fill(table, n):
+    students = max(1, n // STUDENTS_PER_ROW)
+    for i in range(n):
+        table.create(user_id=i % students + 1, course_id=(i % students + i // students) % COURSES + 1)
+
+
+def measure(factory, n):
+    gc.collect()
+    tracemalloc.start()
+    table = factory()
+    start = time.perf_counter()
+    fill(table, n)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # reads only; keep the collector's full passes over a million dicts out of the timings
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for i in range(1, READS + 1):
+            table.get(i * (n // READS or 1))
+        get_us = (time.perf_counter() - start) / READS * 1e6
+
+        start = time.perf_counter()
+        walked = sum(len(table.find_all("course_id", course_id)) for course_id in range(1, WALKS + 1))
+        walk_us = (time.perf_counter() - start) / walked * 1e6
+    finally:
+        gc.enable()
+    return size / n, elapsed, get_us, walk_us
+
+
+def run(n=ROWS):
+    print(f"{n:,} enrollments")
+    print(f"{'store':<16} {'bytes/row':>10} {'insert s':>9} {'get µs':>7} {'walk µs/row':>12}")
+    for name, factory in (("dict Table", dict_table), ("EnrollmentStore", EnrollmentStore)):
+        per_row, insert_s, get_us, walk_us = measure(factory, n)
+        print(f"{name:<16} {per_row:>10.0f} {insert_s:>9.2f} {get_us:>7.2f} {walk_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
@@ -0,0 +1,61 @@
+"""
+Full listing vs. keyset-paginated listing of GET /api/v1/users/.
+
+Seeds N users (default 1,000,000) straight into the repository, then times
+one unpaginated request against pages of `limit` rows taken at the start,
+middle and end of the table. Page latency should not depend on N.
+
+    python -m benchmarks.bench_pagination [N] [limit]
+"""
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+from app.pagination import encode_cursor
+
+ROWS = 1_000_000
+LIMIT = 100
+SAMPLES = 50
+
+
+def seed(n):
+    storage.reset()
+    repo = storage.get_repository()
+    for i in range(n):
+        repo.create_user(f"Seed {i}", f"seed{i}@bench.com", "student")
+
+
+def timed(client, params):
+    start = time.perf_counter()
+    res = client.get("/api/v1/users/", params=params)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert res.status_code == 200, res.text
+    return elapsed, len(res.content)
+
+
+def run(n=ROWS, limit=LIMIT):
+    client = TestClient(app)
+    print(f"seeding {n:,} users...")
+    seed(n)
+
+    full_ms, full_bytes = timed(client, {})
+    print(f"{'full listing':<22} {full_ms:>10.1f} ms {full_bytes:>14,} bytes")
+
+    for label, after in (("page @ start", None), ("page @ middle", n // 2), ("page @ end", n - limit - 1)):
+        params = {"limit": limit}
+        if after is not None:
+            params["after"] = encode_cursor(after)
+        samples = [timed(client, params) for _ in range(SAMPLES)]
+        median = statistics.median(ms for ms, _ in samples)
+        print(f"{label:<22} {median:>10.3f} ms {samples[0][1]:>14,} bytes")
+
+    storage.reset()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
@@ -0,0 +1,82 @@
+"""
+Overhead of the token-bucket rate limiter (app.ratelimit).
+
+Times RateLimiter.hit() on one hot key, on a stream of distinct keys
+that keeps the LRU evicting, and from several threads at once; then an
+in-process route (DELETE /api/v1/enrollments/{id}, which 404s straight
+after the limit check) with the limiter off vs. on, cycling through
+USERS student ids with limits high enough that nothing is refused.
+
+    python -m benchmarks.bench_ratelimit [seconds]
+"""
+import asyncio
+import itertools
+import sys
+import threading
+import time
+
+from app.main import app
+from app.ratelimit import RateLimiter, limiter
+from app.routers.enrollments import ENROLLMENT_WRITES
+from benchmarks.client import drive, asgi_connect, use_header_roles
+
+HITS = 1_000_000
+THREADS = 4
+USERS = 10_000
+DURATION = 3.0
+
+
+def per_hit(buckets, keys):
+    start = time.perf_counter()
+    for key in keys:
+        buckets.hit(key, 1e9, 1e9)
+    return (time.perf_counter() - start) / HITS * 1e9
+
+
+def threaded(buckets):
+    def run(offset):
+        for i in range(HITS // THREADS):
+            buckets.hit(offset + i % 1000, 1e9, 1e9)
+
+    threads = [threading.Thread(target=run, args=(t * 1000,)) for t in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) / HITS * 1e9
+
+
+def route(enabled, duration):
+    limiter.reset()
+    use_header_roles(rate_limit=enabled)
+    users = itertools.cycle(range(1, USERS + 1))
+
+    def make_request():
+        headers = {"X-User-Role": "student", "X-User-Id": str(next(users))}
+        return "DELETE", "/api/v1/enrollments/999999", headers, b""
+
+    return asyncio.run(drive(asgi_connect(app), make_request, duration, 32))
+
+
+def run(duration=DURATION):
+    print(f"{'RateLimiter.hit':<34} {'ns/hit':>8}")
+    print(f"{'  one hot key':<34} {per_hit(RateLimiter(), itertools.repeat('k', HITS)):>8,.0f}")
+    churn = RateLimiter(max_buckets=10_000)
+    print(f"{'  distinct keys (LRU evicting)':<34} {per_hit(churn, range(HITS)):>8,.0f}   {len(churn):,} buckets kept")
+    print(f"{f'  {THREADS} threads, 1k keys each':<34} {threaded(RateLimiter()):>8,.0f}")
+
+    saved = ENROLLMENT_WRITES.per_role, ENROLLMENT_WRITES.per_ip
+    ENROLLMENT_WRITES.per_role = {"student": (1e9, 1e9)}
+    ENROLLMENT_WRITES.per_ip = (1e9, 1e9)
+    try:
+        print(f"\nDELETE /enrollments/{{id}} in-process, {USERS:,} users")
+        for enabled in (False, True):
+            result = route(enabled, duration)
+            print(f"  limiter {'on ' if enabled else 'off'}  {result['rps']:>8,.0f} req/s  p99 {result['p99_ms']:.2f} ms")
+    finally:
+        ENROLLMENT_WRITES.per_role, ENROLLMENT_WRITES.per_ip = saved
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else DURATION)
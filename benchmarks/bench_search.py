@@ -0,0 +1,78 @@
+"""
+Catalog search latency vs. catalog size.
+
+Seeds the configured repository (STORAGE_BACKEND) with N courses spread
+over 300 departments (a few real ones, the rest synthetic), then times
+repo.search_courses() for a few typical queries, first page of 20. The
+in-memory store answers from its title-token and code-prefix indexes and
+SQLite from its course_tokens table, so latency should stay under a
+millisecond at 100k courses on both.
+
+    python -m benchmarks.bench_search [courses ...]
+"""
+import random
+import statistics
+import sys
+import time
+
+from app import storage
+
+SIZES = [1_000, 10_000, 100_000]
+SAMPLES = 200
+PAGE = 20
+QUERIES = ["MATH", "intro bio", "cs-1", "advanced quantum", "hist"]
+
+SUBJECTS = {
+    "MATH": ["Calculus", "Algebra", "Geometry", "Statistics", "Topology", "Number Theory"],
+    "BIO": ["Biology", "Genetics", "Ecology", "Microbiology", "Biochemistry"],
+    "CS": ["Programming", "Algorithms", "Databases", "Networks", "Compilers", "Machine Learning"],
+    "PHYS": ["Mechanics", "Optics", "Quantum Physics", "Thermodynamics"],
+    "HIST": ["History of Europe", "World History", "Ancient Rome", "Modern Asia"],
+}
+LEVELS = ["Intro to", "Advanced", "Topics in", "Seminar in", "Applied", "Foundations of"]
+DEPARTMENTS = 300
+WORDS_PER_DEPARTMENT = 12
+SYLLABLES = ["ka", "lo", "mi", "ter", "zan", "pho", "ru", "vel", "dri", "son", "gra", "nu", "tis", "bel"]
+
+
+def departments(rng):
+    """The SUBJECTS above plus synthetic ones, so a department is a realistic slice of the catalog."""
+    found = dict(SUBJECTS)
+    while len(found) < DEPARTMENTS:
+        code = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rng.choice([3, 4])))
+        words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.choice([2, 3]))).title() for _ in range(WORDS_PER_DEPARTMENT)]
+        found.setdefault(code, words)
+    return found
+
+
+def catalog(n, rng):
+    subjects = departments(rng)
+    prefixes = list(subjects)
+    for i in range(n):
+        prefix = prefixes[i % len(prefixes)]
+        title = f"{rng.choice(LEVELS)} {rng.choice(subjects[prefix])} {rng.choice(['I', 'II', 'III', 'Lab'])}"
+        yield {"title": title, "code": f"{prefix}-{100 + i // len(prefixes)}"}
+
+
+def run(sizes=SIZES, samples=SAMPLES):
+    rng = random.Random(7)
+    print(f"{'courses':>10} {'query':<18} {'hits':>7} {'median ms':>10} {'p99 ms':>10}")
+    for n in sizes:
+        storage.reset()
+        repo = storage.get_repository()
+        repo.create_courses(list(catalog(n, rng)))
+        for q in QUERIES:
+            hits = len(repo.search_courses(q))
+            timings = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                repo.search_courses(q, limit=PAGE)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p99 = timings[int(len(timings) * 0.99) - 1]
+            print(f"{n:>10} {q:<18} {hits:>7} {statistics.median(timings):>10.3f} {p99:>10.3f}")
+    storage.reset()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,79 @@
+"""
+Encoding a list of N stored user records (default 100,000) into a JSON
+response body, old path vs. new:
+
+  response_model   what FastAPI does for a route returning bare rows with
+                   response_model=list[User]: validate every row against the
+                   schema (EmailStr included), dump to JSON-able Python,
+                   then json.dumps
+  TypeAdapter      validate_python + dump_json, as the catalog used to
+  RecordResponse   app.responses: pydantic-core to_json on the rows as
+                   stored, no validation
+  orjson           orjson.dumps, for reference, if it's installed
+
+    python -m benchmarks.bench_serialize [N]
+"""
+import asyncio
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from app.responses import RecordResponse
+from app.schemas import User
+
+ROWS = 100_000
+REPEATS = 5
+
+
+def rows(n):
+    return [{"id": i, "name": f"Student {i}", "email": f"s{i}@bench.com", "role": "student"} for i in range(1, n + 1)]
+
+
+def encoders():
+    field = create_model_field(name="Response_get_users", type_=list[User], mode="serialization")
+    adapter = TypeAdapter(list[User])
+
+    def response_model(records):
+        content = asyncio.run(serialize_response(field=field, response_content=records, is_coroutine=True))
+        return JSONResponse(content).body
+
+    found = {
+        "response_model": response_model,
+        "TypeAdapter": lambda records: adapter.dump_json(adapter.validate_python(records)),
+        "RecordResponse": lambda records: RecordResponse(records).body,
+    }
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        found["orjson"] = orjson.dumps
+    return found
+
+
+def best_of(encode, records):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = encode(records)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def run(n=ROWS):
+    records = rows(n)
+    print(f"{n:,} rows, best of {REPEATS}")
+    print(f"{'path':<16} {'ms':>9} {'MB':>7} {'speedup':>8}")
+    baseline = None
+    for name, encode in encoders().items():
+        seconds, size = best_of(encode, records)
+        baseline = baseline or seconds
+        print(f"{name:<16} {seconds * 1000:>9.1f} {size / 1e6:>7.2f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
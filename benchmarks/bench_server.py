@@ -0,0 +1,84 @@
+"""
+Requests/second and tail latency against a real uvicorn server.
+
+Starts `uvicorn app.main:app` in a subprocess (with whatever STORAGE_BACKEND
+is set), seeds it over HTTP, then drives each scenario for a fixed time
+from CONCURRENCY keep-alive connections and prints throughput and
+p50/p99 latency. The client (benchmarks.client) is a minimal asyncio
+HTTP/1.1 loop rather than httpx so it isn't the bottleneck. Rate limits
+are off (RATE_LIMIT_ENABLED=0): every request comes from one client;
+roles come from X-User-Role headers (AUTH_TRUST_HEADERS=1).
+
+    python -m benchmarks.bench_server [seconds] [concurrency]
+"""
+import asyncio
+import itertools
+import json
+import os
+import sys
+
+from benchmarks.client import HOST, free_port, start_server, drive, socket_connect
+
+DURATION = 5.0
+CONCURRENCY = 64
+STUDENTS = 2_000
+COURSES = 100
+STUDENT = {"X-User-Role": "student"}
+
+
+async def seed(port):
+    users = "".join(
+        json.dumps({"name": f"S{i}", "email": f"s{i}@bench.com", "role": "student"}) + "\n" for i in range(STUDENTS)
+    )
+    # the bulk endpoints stream their results; read them with Connection: close
+    for path, body in (
+        ("/api/v1/users/bulk", users),
+        ("/api/v1/courses/bulk", "".join(json.dumps({"title": f"C{i}", "code": f"C{i}"}) + "\n" for i in range(COURSES))),
+    ):
+        reader, writer = await asyncio.open_connection(HOST, port)
+        data = body.encode()
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {HOST}\r\nX-User-Role: admin\r\nContent-Type: application/x-ndjson\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+        )
+        await reader.read()
+        writer.close()
+
+
+def scenarios():
+    pairs = itertools.count()
+
+    def enroll():
+        n = next(pairs)
+        body = json.dumps({"user_id": n % STUDENTS + 1, "course_id": n // STUDENTS % COURSES + 1}).encode()
+        return "POST", "/api/v1/enrollments/", {**STUDENT, "Content-Type": "application/json"}, body
+
+    return {
+        "get user": lambda: ("GET", f"/api/v1/users/{next(pairs) % STUDENTS + 1}", None, b""),
+        "get course": lambda: ("GET", f"/api/v1/courses/{next(pairs) % COURSES + 1}", None, b""),
+        "list page": lambda: ("GET", "/api/v1/users/?limit=20", None, b""),
+        "enroll": enroll,
+    }
+
+
+def run(duration=DURATION, concurrency=CONCURRENCY):
+    port = free_port()
+    server = start_server(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(port), "--log-level", "warning"],
+        port,
+        env={**os.environ, "RATE_LIMIT_ENABLED": "0", "AUTH_TRUST_HEADERS": "1"},
+    )
+    try:
+        asyncio.run(seed(port))
+        print(f"{'scenario':<12} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'5xx':>5}")
+        for name, make_request in scenarios().items():
+            result = asyncio.run(drive(socket_connect(port), make_request, duration, concurrency))
+            print(f"{name:<12} {result['rps']:>10,.0f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['5xx']:>5}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(float(args[0]) if args else DURATION, int(args[1]) if len(args) > 1 else CONCURRENCY)
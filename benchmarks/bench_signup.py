@@ -0,0 +1,51 @@
+"""
+Signup latency vs. table size.
+
+Seeds the configured repository directly, then times POST /api/v1/users/ through the
+TestClient. With the email index the median should stay flat as the table grows.
+
+    python -m benchmarks.bench_signup
+"""
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+from app.ratelimit import limiter
+
+SIZES = [1_000, 10_000, 100_000]
+SAMPLES = 200
+
+
+def seed(n):
+    storage.reset()
+    repo = storage.get_repository()
+    for i in range(n):
+        repo.create_user(f"Seed {i}", f"seed{i}@bench.com", "student")
+
+
+def run(sizes=SIZES, samples=SAMPLES):
+    # all signups come from one client IP; measure the index, not the limiter
+    limiter.enabled = False
+    client = TestClient(app)
+    print(f"{'rows':>10} {'median ms':>10} {'p99 ms':>10}")
+    for n in sizes:
+        seed(n)
+        timings = []
+        for i in range(samples):
+            body = {"name": "New", "email": f"new{i}@bench.com", "role": "student"}
+            start = time.perf_counter()
+            res = client.post("/api/v1/users/", json=body)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert res.status_code == 201, res.text
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{n:>10} {statistics.median(timings):>10.3f} {p99:>10.3f}")
+    storage.reset()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,174 @@
+"""
+Load-generation helpers shared by the benchmarks: a minimal keep-alive
+HTTP/1.1 client, a direct in-process ASGI caller, and a timed driver that
+runs one request generator from many concurrent workers.
+"""
+import asyncio
+import socket
+import subprocess
+import time
+
+from app.auth import authenticator
+from app.ratelimit import limiter
+
+HOST = "127.0.0.1"
+
+
+def use_header_roles(rate_limit=False):
+    """
+    Set the app up the way the load benchmarks drive it: roles come from
+    X-User-Role (bench_auth is the one that measures tokens), and the rate
+    limiter stays off unless `rate_limit`, since every request comes from
+    one client address.
+    """
+    limiter.enabled = rate_limit
+    authenticator.trust_headers = True
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def start_server(command, port, timeout=600.0, env=None):
+    """Run `command` (which must end up listening on `port`) and wait until it accepts connections."""
+    server = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode}")
+        try:
+            socket.create_connection((HOST, port), timeout=0.1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; responses must carry Content-Length."""
+
+    def __init__(self, port):
+        self.port = port
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+        return self
+
+    async def request(self, method, path, headers=None, body=b""):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {HOST}", f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self):
+        self.writer.close()
+
+
+async def asgi_request(app, method, path, headers=None, body=b""):
+    """Call an ASGI app directly, with no socket or HTTP parsing. Returns (status, body)."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (HOST, 0),
+        "server": (HOST, 80),
+    }
+    delivered = False
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # nothing more to send; disconnect listeners just wait to be cancelled
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(len(sorted_values) * q + 0.5) - 1))]
+
+
+async def drive(connect, make_request, duration, concurrency):
+    """
+    Issue requests from `make_request()` for `duration` seconds from
+    `concurrency` workers. `connect()` returns a worker's
+    (request coroutine function, close callable) pair.
+    """
+    timings = []
+    client_errors = server_errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal client_errors, server_errors
+        request, close = await connect()
+        try:
+            while time.perf_counter() < deadline:
+                method, path, headers, body = make_request()
+                start = time.perf_counter()
+                status, _ = await request(method, path, headers, body)
+                timings.append((time.perf_counter() - start) * 1000)
+                client_errors += 400 <= status < 500
+                server_errors += status >= 500
+        finally:
+            close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "rps": len(timings) / elapsed,
+        "p50_ms": percentile(timings, 0.50),
+        "p90_ms": percentile(timings, 0.90),
+        "p99_ms": percentile(timings, 0.99),
+        "max_ms": timings[-1] if timings else 0.0,
+        "4xx": client_errors,
+        "5xx": server_errors,
+    }
+
+
+def socket_connect(port):
+    async def connect():
+        conn = await Connection(port).open()
+        return conn.request, conn.close
+    return connect
+
+
+def asgi_connect(app):
+    async def connect():
+        async def request(method, path, headers, body):
+            return await asgi_request(app, method, path, headers, body)
+        return request, lambda: None
+    return connect
@@ -0,0 +1,289 @@
+"""
+Per-endpoint benchmark suite with machine-readable results.
+
+Seeds users, courses and enrollments straight through the storage layer
+(bulk methods, so millions of rows are practical), then drives every
+request/response endpoint for a fixed time and records throughput and
+latency percentiles in two modes:
+
+  inprocess  the ASGI app called directly on one event loop: no socket, no
+             HTTP parsing, i.e. the cost of our own code
+  socket     a uvicorn server on a local port, seeded the same way in its
+             own process, driven over keep-alive HTTP/1.1
+
+Streaming endpoints (bulk import, export) have their own benchmarks
+(bench_bulk, bench_export) and aren't included here, nor is GET
+/profiles/{id}, which needs a captured profile. Rate limits are off
+unless --rate-limit is given, since all the load comes from one client,
+and callers are identified by X-User-Role headers (bench_auth measures
+bearer tokens).
+
+    python -m benchmarks.suite --users 100000 --output results.json
+    python -m benchmarks.suite --baseline results.json    # exit 1 on regression
+
+Results are JSON: {"meta": {...}, "results": {mode: {endpoint: stats}}}.
+A comparison flags an endpoint whose req/s fell, or whose p99 rose, by
+more than --tolerance (default 20%) relative to the baseline; p99 rises
+under --p99-floor-ms are ignored as noise.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import uvicorn
+
+from app import storage
+from app.main import app
+from benchmarks.client import HOST, free_port, start_server, drive, socket_connect, asgi_connect, use_header_roles
+
+BATCH = 10_000
+ADMIN = {"X-User-Role": "admin"}
+STUDENT = {"X-User-Role": "student"}
+JSON_BODY = {"Content-Type": "application/json"}
+
+
+# ---------------- SEEDING ----------------
+
+def seed(users, courses, enrollments):
+    """Fill the configured repository in bulk batches; returns the repository."""
+    storage.reset()
+    repo = storage.get_repository()
+    for start in range(0, users, BATCH):
+        repo.create_users([
+            {"name": f"Student {i}", "email": f"s{i}@bench.com", "role": "student"}
+            for i in range(start, min(users, start + BATCH))
+        ])
+    repo.create_courses([{"title": f"Course {i}", "code": f"C{i}"} for i in range(courses)])
+    # enrollment i pairs student i % users with the i // users-th course after
+    # the student's own offset, so pairs never repeat
+    for start in range(0, enrollments, BATCH):
+        repo.create_enrollments([
+            {"user_id": i % users + 1, "course_id": (i % users + i // users) % courses + 1}
+            for i in range(start, min(enrollments, start + BATCH))
+        ])
+    return repo
+
+
+# ---------------- ENDPOINTS ----------------
+
+def endpoints(users, courses, enrollments):
+    """
+    name -> make_request() for every request/response endpoint. Generators
+    only build valid requests for seeded ids; writes use fresh keys so they
+    exercise the success path until the seeded data runs out. DELETE
+    /courses/{id} removes the courses POST /courses/ added before it, so
+    run alone (--only) it only measures 404s; the 4xx count shows it.
+    """
+    rand = random.Random(42)
+    fresh = itertools.count()
+    batched = itertools.count()
+    deletable = itertools.count(1)
+    deletable_courses = itertools.count(courses + 1)
+
+    def body(payload):
+        return json.dumps(payload).encode()
+
+    def enroll():
+        # a course this student isn't seeded into (while one exists)
+        n = next(fresh)
+        user = n % users
+        per_user = enrollments // users + (user < enrollments % users)
+        course = (user + per_user + n // users) % courses + 1
+        return "POST", "/api/v1/enrollments/", {**STUDENT, **JSON_BODY}, body({"user_id": user + 1, "course_id": course})
+
+    def enroll_batch():
+        # three courses counting down from the student's seeded offset, so
+        # they don't meet the ones enroll() counts up to
+        n = next(batched)
+        user = n % users
+        course_ids = [(user - 1 - 3 * (n // users) - k) % courses + 1 for k in range(3)]
+        return "POST", "/api/v1/enrollments/batch", {**STUDENT, **JSON_BODY}, body({"user_id": user + 1, "course_ids": course_ids})
+
+    def replace_course():
+        # a full PUT body that keeps the course's own code
+        course = rand.randint(1, courses)
+        return (
+            "PUT", f"/api/v1/courses/{course}", {**ADMIN, **JSON_BODY},
+            body({"title": f"Replaced {next(fresh)}", "code": f"C{course - 1}"}),
+        )
+
+    return {
+        "POST /users/": lambda: (
+            "POST", "/api/v1/users/", JSON_BODY,
+            body({"name": "New", "email": f"new{next(fresh)}@bench.com", "role": "student"}),
+        ),
+        "GET /users/{id}": lambda: ("GET", f"/api/v1/users/{rand.randint(1, users)}", None, b""),
+        "GET /users/?limit=50": lambda: ("GET", "/api/v1/users/?limit=50", None, b""),
+        "GET /courses/": lambda: ("GET", "/api/v1/courses/?limit=50", None, b""),
+        "GET /courses/{id}": lambda: ("GET", f"/api/v1/courses/{rand.randint(1, courses)}", None, b""),
+        "POST /courses/": lambda: (
+            "POST", "/api/v1/courses/", {**ADMIN, **JSON_BODY},
+            body({"title": "New", "code": f"NEW{next(fresh)}"}),
+        ),
+        "DELETE /courses/{id}": lambda: ("DELETE", f"/api/v1/courses/{next(deletable_courses)}", ADMIN, b""),
+        "PUT /courses/{id}": replace_course,
+        "PATCH /courses/{id}": lambda: (
+            "PATCH", f"/api/v1/courses/{rand.randint(1, courses)}", {**ADMIN, **JSON_BODY},
+            body({"title": f"Renamed {next(fresh)}"}),
+        ),
+        "GET /courses/search": lambda: (
+            "GET", f"/api/v1/courses/search?q=course+{rand.randint(1, courses)}&limit=20", None, b"",
+        ),
+        "GET /courses/{id}/roster": lambda: (
+            "GET", f"/api/v1/courses/{rand.randint(1, courses)}/roster?limit=50", ADMIN, b"",
+        ),
+        "GET /courses/{id}/waitlist": lambda: (
+            "GET", f"/api/v1/courses/{rand.randint(1, courses)}/waitlist", ADMIN, b"",
+        ),
+        "GET /enrollments/ (admin)": lambda: ("GET", "/api/v1/enrollments/?limit=50", ADMIN, b""),
+        "GET /enrollments/ (student)": lambda: (
+            "GET", "/api/v1/enrollments/", {**STUDENT, "X-User-Id": str(rand.randint(1, users))}, b"",
+        ),
+        "POST /enrollments/": enroll,
+        "POST /enrollments/batch": enroll_batch,
+        "DELETE /enrollments/{id}": lambda: ("DELETE", f"/api/v1/enrollments/{next(deletable)}", STUDENT, b""),
+        "GET /stats": lambda: ("GET", "/api/v1/stats", ADMIN, b""),
+        "POST /auth/token": lambda: (
+            "POST", "/api/v1/auth/token", {**ADMIN, **JSON_BODY}, body({"user_id": rand.randint(1, users)}),
+        ),
+        "GET /profiles/": lambda: ("GET", "/api/v1/profiles/", ADMIN, b""),
+        "GET /metrics": lambda: ("GET", "/api/v1/metrics", None, b""),
+        "GET /": lambda: ("GET", "/", None, b""),
+    }
+
+
+# ---------------- MODES ----------------
+
+async def bench(connect, args):
+    results = {}
+    for name, make_request in endpoints(args.users, args.courses, args.enrollments).items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        await drive(connect, make_request, args.warmup, args.concurrency)
+        results[name] = await drive(connect, make_request, args.duration, args.concurrency)
+        print(f"  {name:<30} {results[name]['rps']:>9,.0f} req/s  p99 {results[name]['p99_ms']:>8.2f} ms", file=sys.stderr)
+    return results
+
+
+def run_inprocess(args):
+    use_header_roles(rate_limit=args.rate_limit)
+    seed(args.users, args.courses, args.enrollments)
+    return asyncio.run(bench(asgi_connect(app), args))
+
+
+def run_socket(args):
+    port = free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.suite", "serve", "--port", str(port),
+        "--users", str(args.users), "--courses", str(args.courses), "--enrollments", str(args.enrollments),
+        *(["--rate-limit"] if args.rate_limit else []),
+    ]
+    server = start_server(command, port)
+    try:
+        return asyncio.run(bench(socket_connect(port), args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def serve(args):
+    use_header_roles(rate_limit=args.rate_limit)
+    seed(args.users, args.courses, args.enrollments)
+    uvicorn.run(app, host=HOST, port=args.port, log_level="warning")
+
+
+# ---------------- BASELINES ----------------
+
+def compare(current, baseline, tolerance, p99_floor_ms):
+    """Print a per-endpoint comparison; returns the regressed (mode, endpoint) pairs."""
+    regressions = []
+    print(f"{'mode':<10} {'endpoint':<30} {'req/s':>9} {'base':>9} {'p99 ms':>8} {'base':>8}", file=sys.stderr)
+    for mode, endpoints_ in current["results"].items():
+        for name, now in endpoints_.items():
+            then = baseline.get("results", {}).get(mode, {}).get(name)
+            if then is None:
+                continue
+            slower = now["rps"] < then["rps"] * (1 - tolerance)
+            # sub-millisecond tails are mostly scheduler noise; also require an absolute change
+            tail = (
+                now["p99_ms"] > then["p99_ms"] * (1 + tolerance)
+                and now["p99_ms"] - then["p99_ms"] > p99_floor_ms
+            )
+            flag = "  REGRESSION" if slower or tail else ""
+            if flag:
+                regressions.append((mode, name))
+            print(
+                f"{mode:<10} {name:<30} {now['rps']:>9,.0f} {then['rps']:>9,.0f} "
+                f"{now['p99_ms']:>8.2f} {then['p99_ms']:>8.2f}{flag}",
+                file=sys.stderr,
+            )
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "serve"])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--enrollments", type=int, default=20_000)
+    parser.add_argument("--modes", default="inprocess,socket")
+    parser.add_argument("--only", nargs="*", help="Run endpoints whose name contains any of these")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=0.5, help="Unmeasured seconds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--p99-floor-ms", type=float, default=1.0, help="Ignore p99 increases smaller than this")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the per-route rate limits on")
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        return serve(args)
+
+    runners = {"inprocess": run_inprocess, "socket": run_socket}
+    results = {}
+    for mode in args.modes.split(","):
+        print(f"{mode}:", file=sys.stderr)
+        results[mode] = runners[mode](args)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "backend": os.environ.get("STORAGE_BACKEND", "memory"),
+            "python": platform.python_version(),
+            "users": args.users,
+            "courses": args.courses,
+            "enrollments": args.enrollments,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance, args.p99_floor_ms):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())